@@ -0,0 +1,60 @@
+"""add indexes for the hot query paths
+
+Revision ID: 7c3e1f9a2b64
+Revises: 53859d2001bc
+Create Date: 2026-10-18 09:12:40.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e1f9a2b64'
+down_revision: Union[str, None] = '53859d2001bc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# init_db() also creates these indexes from the models when the app starts,
+# so the ones that already exist are skipped
+INDEXES = [
+    # Mis asistentes: WHERE user_id = ? ORDER BY updated_at DESC
+    ('ix_assistants_user_updated', 'assistants', ['user_id', 'updated_at']),
+    # /explore: WHERE is_public ORDER BY <orden>, id (paginación por cursor)
+    ('ix_assistants_public_created', 'assistants', ['is_public', 'created_at', 'id']),
+    ('ix_assistants_public_likes', 'assistants', ['is_public', 'likes', 'id']),
+    ('ix_assistants_public_collections', 'assistants', ['is_public', 'in_collections', 'id']),
+    ('ix_assistants_public_downloads', 'assistants', ['is_public', 'downloads', 'id']),
+    # Linaje: WHERE forked_from = ?
+    ('ix_assistants_forked_from', 'assistants', ['forked_from']),
+    # Likes y colecciones de un asistente; las búsquedas por usuario usan las restricciones únicas
+    ('ix_assistant_likes_assistant', 'assistant_likes', ['assistant_id']),
+    ('ix_user_assistant_collections_assistant', 'user_assistant_collections', ['assistant_id']),
+]
+
+
+def _index_state(table: str, columns: list):
+    """Names of the indexes of a table, or None if the table or one of the columns is missing"""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    existing_columns = {column['name'] for column in inspector.get_columns(table)}
+    if not set(columns) <= existing_columns:
+        return None
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        existing = _index_state(table, columns)
+        if existing is not None and name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, columns in reversed(INDEXES):
+        existing = _index_state(table, columns)
+        if existing is not None and name in existing:
+            op.drop_index(name, table_name=table)
@@ -8,4 +8,26 @@ EDUCATIONAL_LEVELS = [
     'Primary Education',
     'Pre-School / Early Childhood Education',
     'Other'
-] 
\ No newline at end of file
+] 
+
+# Orden de presentación de los niveles educativos en /explore
+ORDERED_EDUCATIONAL_LEVELS = [
+    "Postgraduate Higher Education",
+    "Undergraduate Higher Education",
+    "Technical / Vocational Education",
+    "Upper Secondary Education",
+    "Lower Secondary Education",
+    "Primary Education",
+    "Pre-School / Early Childhood Education",
+    "Professional Development / Continuing Education",
+    "other"
+]
+
+# Mapping of possible variations to standardized names
+EDUCATIONAL_LEVEL_MAPPING = {
+    "Educación Universitaria": "Undergraduate Higher Education",
+    "Universidad": "Undergraduate Higher Education",
+    "University": "Undergraduate Higher Education",
+    "Higher Education": "Undergraduate Higher Education",
+    # Add more mappings as needed
+}
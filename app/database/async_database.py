@@ -0,0 +1,72 @@
+"""
+Async access to the application database through aiosqlite.
+
+Every aiosqlite connection runs its queries in its own thread, so a route that
+awaits them leaves the event loop free for other requests. The models, the
+ORM listeners of the blob store and the helpers of app.utils are synchronous:
+routes call them with AsyncSession.run_sync(), which hands them the Session
+behind the AsyncSession; lazy loads and flush events keep working there while
+the I/O underneath is awaited.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from typing import Any, AsyncIterator, Callable
+import asyncio
+import os
+
+from .database import DB_PATH
+from .sqlite_tuning import configure_sqlite_engine
+from .query_counter import install_query_counter
+from .slow_query_log import install_slow_query_log
+
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///./{DB_PATH}"
+
+# Conexiones abiertas reutilizables; cada una es un hilo de aiosqlite
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "5"))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "10"))
+
+
+def create_async_db_engine(url: str = ASYNC_DATABASE_URL):
+    """AsyncEngine with a connection pool, the SQLite PRAGMAs of sqlite_tuning, the query counter and the slow query log"""
+    # Sin poolclass, aiosqlite usa NullPool: un hilo nuevo y los PRAGMAs en cada sesión
+    engine = create_async_engine(
+        url,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=ASYNC_DB_POOL_SIZE,
+        max_overflow=ASYNC_DB_MAX_OVERFLOW
+    )
+    configure_sqlite_engine(engine.sync_engine)
+    install_query_counter(engine.sync_engine)
+    install_slow_query_log(engine.sync_engine)
+    return engine
+
+
+async_engine = create_async_db_engine()
+# expire_on_commit=False: tras un commit los atributos siguen legibles sin otra consulta
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Dependency with an AsyncSession, closed at the end of the request"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _call_with_session(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    # Se resuelve en cada llamada para seguir a database.SessionLocal si se reemplaza
+    from . import database
+    with database.SessionLocal() as db:
+        return fn(db, *args, **kwargs)
+
+
+async def run_in_session_thread(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Call fn(db, *args, **kwargs) with a blocking Session in a worker thread.
+
+    For read paths made of several heavy statements (search with facets):
+    AsyncSession.run_sync() runs fn on the event loop and hops to the aiosqlite
+    thread for every statement, so under load each request is interleaved with
+    all the others. Here the whole path runs back to back in one thread, and
+    the event loop only waits for it.
+    """
+    return await asyncio.to_thread(_call_with_session, fn, *args, **kwargs)
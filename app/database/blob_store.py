@@ -0,0 +1,199 @@
+"""
+Content-addressed storage of assistant documents.
+
+Assistant.yaml_content is a property: setting it only records the new text.
+On flush, the text is hashed (sha256), stored compressed in assistant_blobs
+if that hash is not there yet, and the assistant points at it. Every blob
+counts the assistants that reference it and is deleted when none is left.
+Blobs are inserted with INSERT ... ON CONFLICT DO NOTHING and counted with
+ref_count = ref_count +/- n, so concurrent saves of the same content do not
+collide.
+Each change of content also adds a revision (revisions.py).
+"""
+from collections import defaultdict
+from typing import Dict, Iterable
+from sqlalchemy import event, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+import argparse
+import hashlib
+import logging
+
+from .models import Assistant, AssistantBlob, compress_content
+from .revisions import record_revision
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _get_or_create_blob(session: Session, content: str, blobs: Dict[str, AssistantBlob]) -> AssistantBlob:
+    """Blob of a content, inserted with ref_count 0 if it is not stored yet"""
+    digest = content_hash(content)
+    blob = blobs.get(digest)
+    if blob is None:
+        # Si otro guardado inserta el mismo contenido a la vez, este INSERT no hace nada
+        session.execute(
+            sqlite_insert(AssistantBlob).values(
+                hash=digest, data=compress_content(content), size=len(content.encode('utf-8'))
+            ).on_conflict_do_nothing(index_elements=['hash'])
+        )
+        blob = session.get(AssistantBlob, digest)
+        blob.__dict__.setdefault('_text', content)
+        blobs[digest] = blob
+    return blob
+
+
+def _apply_ref_deltas(session: Session, deltas: Dict[str, int]) -> None:
+    """Add and remove references in SQL: no document is loaded and no concurrent count is lost"""
+    for digest, delta in deltas.items():
+        if delta:
+            session.execute(
+                update(AssistantBlob).where(AssistantBlob.hash == digest)
+                .values(ref_count=AssistantBlob.ref_count + delta)
+            )
+
+
+def _delete_released_blobs(session: Session, digests: Iterable[str]) -> None:
+    """Delete, among the given blobs, the ones no assistant references any more"""
+    digests = list(digests)
+    if digests:
+        session.execute(
+            AssistantBlob.__table__.delete().where(
+                AssistantBlob.hash.in_(digests),
+                AssistantBlob.ref_count <= 0
+            )
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _store_pending_contents(session: Session, flush_context, instances) -> None:
+    deltas = defaultdict(int)
+    blobs: Dict[str, AssistantBlob] = {}
+
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Assistant) or '_pending_content' not in obj.__dict__:
+            continue
+        content = obj.__dict__.pop('_pending_content')
+        old_hash = obj.content_hash
+        blob = _get_or_create_blob(session, content, blobs)
+        if blob.hash != old_hash:
+            with session.no_autoflush:
+                previous = obj.blob.text if old_hash and obj.blob is not None else None
+            record_revision(session, obj, content, blob.hash, previous, old_hash)
+            obj.blob = blob
+            deltas[blob.hash] += 1
+            if old_hash:
+                deltas[old_hash] -= 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Assistant) and obj.content_hash:
+            deltas[obj.content_hash] -= 1
+
+    if deltas:
+        _apply_ref_deltas(session, deltas)
+        session.info.setdefault('released_blobs', set()).update(
+            digest for digest, delta in deltas.items() if delta < 0
+        )
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_released_blobs(session: Session, flush_context) -> None:
+    released = session.info.pop('released_blobs', None)
+    if released:
+        _delete_released_blobs(session, released)
+
+
+def release_contents(db: Session, assistant_ids: Iterable[int]) -> None:
+    """Drop the references of assistants that are about to be deleted in bulk"""
+    assistant_ids = list(assistant_ids)
+    if not assistant_ids:
+        return
+    rows = db.query(Assistant.content_hash, func.count(Assistant.id)).filter(
+        Assistant.id.in_(assistant_ids),
+        Assistant.content_hash.isnot(None)
+    ).group_by(Assistant.content_hash).all()
+    _apply_ref_deltas(db, {digest: -count for digest, count in rows})
+    _delete_released_blobs(db, [digest for digest, _ in rows])
+
+
+def migrate_legacy_contents(db: Session) -> int:
+    """
+    Move documents still stored in assistants.yaml_content into the blob store.
+    updated_at is kept as is. Returns the number of assistants migrated.
+    """
+    table = Assistant.__table__
+    rows = db.execute(
+        select(table.c.id, table.c.yaml_content).where(
+            table.c.content_hash.is_(None),
+            table.c.yaml_content.isnot(None)
+        )
+    ).fetchall()
+
+    blobs: Dict[str, AssistantBlob] = {}
+    deltas = defaultdict(int)
+    for assistant_id, content in rows:
+        blob = _get_or_create_blob(db, content, blobs)
+        db.execute(
+            update(table).where(table.c.id == assistant_id).values(
+                content_hash=blob.hash,
+                yaml_content=None,
+                updated_at=table.c.updated_at
+            )
+        )
+        deltas[blob.hash] += 1
+    _apply_ref_deltas(db, deltas)
+    db.commit()
+    return len(rows)
+
+
+def recount_references(db: Session) -> int:
+    """Recompute every ref_count from the assistants table and delete unreferenced blobs"""
+    counts = dict(
+        db.query(Assistant.content_hash, func.count(Assistant.id))
+        .filter(Assistant.content_hash.isnot(None))
+        .group_by(Assistant.content_hash).all()
+    )
+    for (digest,) in db.query(AssistantBlob.hash).all():
+        db.execute(
+            update(AssistantBlob).where(AssistantBlob.hash == digest)
+            .values(ref_count=counts.get(digest, 0))
+        )
+    deleted = db.query(AssistantBlob).filter(AssistantBlob.ref_count <= 0).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def storage_stats(db: Session) -> Dict[str, int]:
+    blobs, stored, original = db.query(
+        func.count(AssistantBlob.hash),
+        func.coalesce(func.sum(func.length(AssistantBlob.data)), 0),
+        func.coalesce(func.sum(AssistantBlob.size), 0)
+    ).one()
+    references = db.query(func.count(Assistant.id)).filter(Assistant.content_hash.isnot(None)).scalar()
+    return {"blobs": blobs, "references": references, "stored_bytes": stored, "original_bytes": original}
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description='Assistant document blob store maintenance')
+    parser.add_argument('--recount', action='store_true',
+                        help='Recompute reference counts and delete unreferenced blobs')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        migrated = migrate_legacy_contents(db)
+        if migrated:
+            print(f"✓ {migrated} assistants moved to the blob store")
+        if args.recount:
+            deleted = recount_references(db)
+            print(f"✓ Reference counts recomputed, {deleted} unreferenced blobs deleted")
+        stats = storage_stats(db)
+        print(f"Blobs: {stats['blobs']} for {stats['references']} assistants, "
+              f"{stats['stored_bytes']} bytes stored for {stats['original_bytes']} bytes of YAML")
+    finally:
+        db.close()
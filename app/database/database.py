@@ -1,18 +1,70 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from .models import Base, Setting
+from .blob_store import migrate_legacy_contents
+from .sqlite_tuning import configure_sqlite_engine
+from .query_counter import install_query_counter
+from .slow_query_log import install_slow_query_log
+from ..utils.search_index import create_search_index, rebuild_search_index
+from ..utils.assistant_summary import backfill_summaries
+from ..utils.facets import rebuild_facets
+from ..utils.remixes import migrate_remixed_by
 from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Definir la ruta de la base de datos
 DB_PATH = Path("assistants.db")
 DATABASE_URL = f"sqlite:///./{DB_PATH}"
 
 engine = create_engine(DATABASE_URL)
+# WAL, caché, mmap y busy_timeout en cada conexión (ver sqlite_tuning.py)
+configure_sqlite_engine(engine)
+# Sentencias y tiempo por petición y registro de consultas lentas
+install_query_counter(engine)
+install_slow_query_log(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def ensure_columns(connection) -> None:
+    """Add the nullable columns declared in the models that an existing table is missing, with their server default"""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                logger.error(f"Cannot add NOT NULL column {table.name}.{column.name} to an existing table")
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            default = ""
+            if column.server_default is not None:
+                default = f" DEFAULT {column.server_default.arg.text}"
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}"))
+            logger.info(f"Added column {table.name}.{column.name}")
+
+def ensure_indexes(connection) -> None:
+    """Create the indexes declared in the models that an existing database is missing"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+
 def init_db():
+    facets_table_exists = inspect(engine).has_table("assistant_facets")
     Base.metadata.create_all(bind=engine)
     
+    # create_all no añade columnas ni índices nuevos a tablas que ya existen
+    with engine.begin() as connection:
+        ensure_columns(connection)
+        ensure_indexes(connection)
+    
+    # Índice de búsqueda de texto completo (FTS5)
+    with engine.begin() as connection:
+        search_index_created = create_search_index(connection)
+    
     # Inicializar settings por defecto
     db = SessionLocal()
     default_settings = [
@@ -75,6 +127,27 @@ def init_db():
             db.add(setting)
     
     db.commit()
+    
+    # Mover al almacén de blobs los documentos guardados en la columna antigua
+    migrated = migrate_legacy_contents(db)
+    if migrated:
+        logger.info(f"{migrated} assistants moved to the blob store")
+    
+    # Pasar las listas remixed_by antiguas a assistant_remixes
+    remixed = migrate_remixed_by(db)
+    if remixed:
+        logger.info(f"Remixes of {remixed} assistants moved to assistant_remixes")
+    
+    # Calcular los resúmenes de los asistentes que aún no lo tienen
+    backfill_summaries(db)
+    
+    # Indexar los asistentes existentes la primera vez que se crea el índice
+    if search_index_created:
+        rebuild_search_index(db)
+    
+    # Calcular las facetas de los resúmenes existentes la primera vez que se crea la tabla
+    if not facets_table_exists:
+        rebuild_facets(db)
     db.close()
 
 def get_db():
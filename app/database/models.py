@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, Text, Boolean, TIMESTAMP, ForeignKey, text, String, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, Text, Boolean, TIMESTAMP, ForeignKey, text, String, DateTime, UniqueConstraint, JSON, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import validates, object_session
+from sqlalchemy.orm import validates, object_session, relationship, deferred
+from sqlalchemy.orm.attributes import flag_dirty
 from cryptography.fernet import Fernet
 from pathlib import Path
 from datetime import datetime
+import zlib
 
 Base = declarative_base()
 
@@ -37,16 +39,166 @@ class Assistant(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     title = Column(String(255))
-    yaml_content = Column(Text)
+    # El YAML vive en assistant_blobs (ver la propiedad yaml_content). La columna
+    # original solo se lee para migrar bases de datos antiguas
+    legacy_yaml_content = deferred(Column("yaml_content", Text))
+    content_hash = Column(String(64), ForeignKey("assistant_blobs.hash"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     downloads = Column(Integer, default=0)
+    views = Column(Integer, default=0, server_default=text('0'))
     is_public = Column(Boolean, default=True)
     in_collections = Column(Integer, default=0)
     likes = Column(Integer, default=0)
     created_by = Column(Text)
+    # Lista "usuario, usuario, " antigua: solo se lee para migrarla a assistant_remixes
     remixed_by = Column(Text)
-    forked_from = Column(Integer, ForeignKey("assistants.id"), nullable=True)
+    remix_count = Column(Integer, default=0, server_default=text('0'))
+    forked_from = Column(Integer, ForeignKey("assistants.id"), nullable=True, index=True)
+    
+    summary = relationship("AssistantSummary", uselist=False, back_populates="assistant",
+                           cascade="all, delete-orphan")
+    # Los listados leen assistant_summaries; el documento se carga solo al usarlo
+    blob = relationship("AssistantBlob", lazy="select")
+    revisions = relationship("AssistantRevision", back_populates="assistant",
+                             cascade="all, delete-orphan", order_by="AssistantRevision.number")
+    # Remezclas de este asistente; al borrar un derivado su fila se conserva con derived_id a NULL
+    remixes = relationship("AssistantRemix", foreign_keys="AssistantRemix.source_id",
+                           cascade="all, delete-orphan")
+    remix_origin = relationship("AssistantRemix", foreign_keys="AssistantRemix.derived_id",
+                                back_populates="derived")
+    
+    @property
+    def yaml_content(self) -> str:
+        """The YAML document, decompressed from the blob store"""
+        pending = self.__dict__.get('_pending_content')
+        if pending is not None:
+            return pending
+        if self.blob is not None:
+            return self.blob.text
+        return self.legacy_yaml_content
+    
+    @yaml_content.setter
+    def yaml_content(self, value: str) -> None:
+        # El blob se busca o se crea en el siguiente flush (app/database/blob_store.py)
+        self.__dict__['_pending_content'] = value or ''
+        flag_dirty(self)
+    
+    # Índices para la paginación por cursor de /explore: (is_public, clave de orden, id)
+    __table_args__ = (
+        Index('ix_assistants_public_created', 'is_public', 'created_at', 'id'),
+        Index('ix_assistants_public_likes', 'is_public', 'likes', 'id'),
+        Index('ix_assistants_public_collections', 'is_public', 'in_collections', 'id'),
+        Index('ix_assistants_public_downloads', 'is_public', 'downloads', 'id'),
+        # Lista "Mis asistentes": los del usuario por fecha de actualización
+        Index('ix_assistants_user_updated', 'user_id', 'updated_at'),
+    )
+
+BLOB_COMPRESSION = "zlib"
+
+def compress_content(content: str) -> bytes:
+    return zlib.compress(content.encode('utf-8'), 9)
+
+def decompress_content(data: bytes, compression: str) -> str:
+    if compression != BLOB_COMPRESSION:
+        raise ValueError(f"Unsupported blob compression: {compression}")
+    return zlib.decompress(data).decode('utf-8')
+
+class AssistantBlob(Base):
+    """Documento YAML comprimido, direccionado por su hash y compartido entre asistentes"""
+    __tablename__ = "assistant_blobs"
+    
+    hash = Column(String(64), primary_key=True)
+    compression = Column(String(16), nullable=False, default=BLOB_COMPRESSION)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    @property
+    def text(self) -> str:
+        """Decompressed document, memoized on the instance"""
+        if '_text' not in self.__dict__:
+            self.__dict__['_text'] = decompress_content(self.data, self.compression)
+        return self.__dict__['_text']
+
+class AssistantRevision(Base):
+    """
+    Una versión guardada del YAML de un asistente: una instantánea completa o
+    un delta contra la revisión anterior (ver app/database/revisions.py)
+    """
+    __tablename__ = "assistant_revisions"
+    
+    id = Column(Integer, primary_key=True)
+    assistant_id = Column(Integer, ForeignKey("assistants.id"), nullable=False)
+    number = Column(Integer, nullable=False)
+    is_snapshot = Column(Boolean, nullable=False, default=False)
+    data = deferred(Column(LargeBinary, nullable=False))
+    content_hash = Column(String(64), nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    assistant = relationship("Assistant", back_populates="revisions")
+    
+    __table_args__ = (
+        UniqueConstraint('assistant_id', 'number', name='uq_assistant_revision_number'),
+    )
+
+class AssistantRemix(Base):
+    """Un usuario ha creado derived_id a partir de source_id (importación, nueva versión o fork)"""
+    __tablename__ = "assistant_remixes"
+    
+    id = Column(Integer, primary_key=True)
+    source_id = Column(Integer, ForeignKey("assistants.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    derived_id = Column(Integer, ForeignKey("assistants.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    derived = relationship("Assistant", foreign_keys=[derived_id], back_populates="remix_origin")
+    
+    __table_args__ = (
+        Index('ix_assistant_remixes_source', 'source_id', 'created_at'),
+        Index('ix_assistant_remixes_user', 'user_id'),
+        Index('ix_assistant_remixes_derived', 'derived_id'),
+    )
+
+class AssistantSummary(Base):
+    """Campos de presentación extraídos del YAML, calculados en cada escritura"""
+    __tablename__ = "assistant_summaries"
+    
+    assistant_id = Column(Integer, ForeignKey("assistants.id"), primary_key=True)
+    title = Column(String(255))
+    summary = Column(Text)
+    author_name = Column(Text)
+    author_role = Column(Text)
+    author_organization = Column(Text)
+    coverage = Column(Text)
+    language = Column(Text)
+    rights = Column(Text)
+    keywords = Column(JSON, default=list)
+    educational_levels = Column(JSON, default=list)
+    tools = Column(JSON, default=list)
+    history = Column(JSON, default=list)
+    creation_date = Column(Text)
+    last_update = Column(Text)
+    
+    assistant = relationship("Assistant", back_populates="summary")
+    facets = relationship("AssistantFacet", cascade="all, delete-orphan")
+
+class AssistantFacet(Base):
+    """Valores normalizados de nivel educativo, idioma y palabras clave, una fila por valor"""
+    __tablename__ = "assistant_facets"
+    
+    id = Column(Integer, primary_key=True)
+    assistant_id = Column(Integer, ForeignKey("assistant_summaries.assistant_id"), nullable=False)
+    facet = Column(String(32), nullable=False)
+    value = Column(Text, nullable=False)
+    label = Column(Text)
+    
+    __table_args__ = (
+        UniqueConstraint('assistant_id', 'facet', 'value', name='unique_assistant_facet_value'),
+        Index('ix_assistant_facets_facet_value', 'facet', 'value', 'assistant_id'),
+    )
 
 class AssistantLike(Base):
     __tablename__ = "assistant_likes"
@@ -59,6 +211,8 @@ class AssistantLike(Base):
     # Aseguramos que un usuario solo pueda dar like una vez a cada asistente
     __table_args__ = (
         UniqueConstraint('user_id', 'assistant_id', name='unique_user_assistant_like'),
+        # La restricción única empieza por user_id: los likes de un asistente necesitan su propio índice
+        Index('ix_assistant_likes_assistant', 'assistant_id'),
     )
 
     @validates('assistant_id')
@@ -66,7 +220,8 @@ class AssistantLike(Base):
         # Obtener el assistant para verificar su user_id
         session = object_session(self)
         if session is not None:
-            assistant = session.query(Assistant).get(assistant_id)
+            # session.get() usa el mapa de identidad: sin consulta si el asistente ya está cargado
+            assistant = session.get(Assistant, assistant_id)
             if assistant and assistant.user_id == self.user_id:
                 raise ValueError("Users cannot like their own assistants")
         return assistant_id
@@ -116,4 +271,5 @@ class UserAssistantCollection(Base):
     # Aseguramos que un usuario solo pueda añadir una vez cada asistente a su colección
     __table_args__ = (
         UniqueConstraint('user_id', 'assistant_id', name='unique_user_assistant_collection'),
+        Index('ix_user_assistant_collections_assistant', 'assistant_id'),
     )
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""
+SQL statement counter.
+
+Every statement run by an instrumented engine is counted, with its time,
+against the request being served. QueryCounterMiddleware opens the count of
+each request; in debug mode (DEBUG=1) it is returned in the X-Query-Count
+and X-Query-Time response headers, and it is always logged at debug level.
+Writes handed to the WriteQueue run on its thread and are not counted against
+the request that submitted them.
+
+For tests, query_budget() counts every statement of a block, whatever
+request or thread runs it, and fails if there are more than allowed:
+
+    with query_budget(3, "GET /explore"):
+        client.get("/explore")
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras de depuración en las respuestas
+QUERY_COUNT_HEADERS = os.getenv("DEBUG", "0").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    # Solo se guardan las sentencias cuando se piden (query_budget)
+    statements: Optional[List[str]] = None
+    # Scope ASGI de la petición; tras el enrutado incluye el endpoint
+    scope: Optional[dict] = field(default=None, repr=False)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        if self.statements is not None:
+            self.statements.append(statement)
+
+
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+_captures: List[QueryStats] = []
+_captures_lock = threading.Lock()
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Statistics of the request being served, or None outside a request"""
+    return _request_stats.get()
+
+
+def install_query_counter(engine) -> None:
+    """Count the statements of a (sync) engine; for an AsyncEngine pass engine.sync_engine"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        # En el contexto de la ejecución: si la sentencia falla se descarta con él
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._query_start
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.record(statement, duration)
+        if _captures:
+            with _captures_lock:
+                for capture in _captures:
+                    capture.record(statement, duration)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Count, with their SQL, all the statements run in the process while the block runs"""
+    stats = QueryStats(statements=[])
+    with _captures_lock:
+        _captures.append(stats)
+    try:
+        yield stats
+    finally:
+        with _captures_lock:
+            _captures.remove(stats)
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "Block") -> Iterator[QueryStats]:
+    """Test helper: fail with the statements run if the block exceeds max_queries"""
+    with capture_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        listing = "\n".join(f"  {i}. {' '.join(sql.split())}" for i, sql in enumerate(stats.statements, 1))
+        raise AssertionError(f"{label} ran {stats.count} queries, budget is {max_queries}:\n{listing}")
+
+
+class QueryCounterMiddleware:
+    """ASGI middleware that opens the statement count of every HTTP request"""
+
+    def __init__(self, app, headers: bool = QUERY_COUNT_HEADERS):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope=scope)
+        token = _request_stats.set(stats)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and self.headers:
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Query-Count", str(stats.count))
+                headers.append("X-Query-Time", f"{stats.duration * 1000:.1f}ms")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _request_stats.reset(token)
+            logger.debug(f"{scope['method']} {scope['path']}: {stats.count} queries in {stats.duration * 1000:.1f} ms")
@@ -0,0 +1,166 @@
+"""
+Revision history of assistant documents.
+
+Every save that changes the content of an assistant adds a row to
+assistant_revisions. Most rows hold a line diff against the previous revision;
+every REVISION_SNAPSHOT_INTERVAL revisions a full snapshot is stored instead, so
+rebuilding any revision applies at most REVISION_SNAPSHOT_INTERVAL - 1 deltas.
+Revisions are recorded by the blob store flush listener (blob_store.py).
+"""
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.orm import Session
+import hashlib
+import json
+import logging
+
+from .models import Assistant, AssistantRevision, compress_content, decompress_content, BLOB_COMPRESSION
+
+logger = logging.getLogger(__name__)
+
+# Número de revisiones entre dos instantáneas completas
+REVISION_SNAPSHOT_INTERVAL = 20
+
+
+def encode_delta(base: str, content: str) -> str:
+    """
+    Line diff from base to content, as JSON: a list where [start, end] copies
+    lines of base and a string inserts new text.
+    """
+    base_lines = base.splitlines(keepends=True)
+    new_lines = content.splitlines(keepends=True)
+    ops = []
+    matcher = SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(new_lines[j1:j2]))
+    return json.dumps(ops, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_delta(base: str, delta: str) -> str:
+    """Rebuild a document from the previous one and a delta made by encode_delta()"""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in json.loads(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(base_lines[op[0]:op[1]])
+    return ''.join(parts)
+
+
+def _new_revision(number: int, content: str, digest: str, base: Optional[str] = None,
+                  created_at: Optional[datetime] = None) -> AssistantRevision:
+    is_snapshot = base is None
+    payload = content if is_snapshot else encode_delta(base, content)
+    return AssistantRevision(
+        number=number,
+        is_snapshot=is_snapshot,
+        data=compress_content(payload),
+        content_hash=digest,
+        size=len(content.encode('utf-8')),
+        created_at=created_at or datetime.utcnow()
+    )
+
+
+def record_revision(session: Session, assistant: Assistant, content: str, digest: str,
+                    previous_content: Optional[str] = None, previous_hash: Optional[str] = None) -> None:
+    """
+    Add the revision for a new content of an assistant. Called during flush,
+    before the assistant points at its new blob.
+    """
+    latest = None
+    if assistant.id is not None:
+        with session.no_autoflush:
+            latest = session.query(AssistantRevision).filter(
+                AssistantRevision.assistant_id == assistant.id
+            ).order_by(AssistantRevision.number.desc()).first()
+
+    # Asistentes guardados antes de existir el historial: su contenido actual es la revisión 1
+    if latest is None and previous_content is not None:
+        latest = _new_revision(1, previous_content, previous_hash, created_at=assistant.updated_at)
+        latest.assistant = assistant
+        session.add(latest)
+
+    number = latest.number + 1 if latest else 1
+    # Instantánea al empezar cada tramo, o si la última revisión no es el contenido anterior
+    chained = latest is not None and latest.content_hash == previous_hash
+    if not chained or (number - 1) % REVISION_SNAPSHOT_INTERVAL == 0:
+        revision = _new_revision(number, content, digest)
+    else:
+        revision = _new_revision(number, content, digest, base=previous_content)
+    revision.assistant = assistant
+    session.add(revision)
+
+
+def list_revisions(db: Session, assistant_id: int) -> List[Dict]:
+    """Revisions of an assistant, newest first, without their contents"""
+    rows = db.query(
+        AssistantRevision.number,
+        AssistantRevision.is_snapshot,
+        AssistantRevision.content_hash,
+        AssistantRevision.size,
+        AssistantRevision.created_at
+    ).filter(
+        AssistantRevision.assistant_id == assistant_id
+    ).order_by(AssistantRevision.number.desc()).all()
+    return [
+        {
+            'number': row.number,
+            'is_snapshot': row.is_snapshot,
+            'content_hash': row.content_hash,
+            'size': row.size,
+            'created_at': row.created_at.isoformat() if row.created_at else None
+        }
+        for row in rows
+    ]
+
+
+def get_revision_hash(db: Session, assistant_id: int, number: int) -> Optional[str]:
+    """SHA-256 of the document of one revision, or None if it does not exist"""
+    return db.query(AssistantRevision.content_hash).filter(
+        AssistantRevision.assistant_id == assistant_id,
+        AssistantRevision.number == number
+    ).scalar()
+
+
+def get_revision_content(db: Session, assistant_id: int, number: int) -> Optional[str]:
+    """
+    Rebuild the document of one revision from the closest snapshot at or before it.
+    Returns None if the revision does not exist.
+    """
+    snapshot_number = db.query(AssistantRevision.number).filter(
+        AssistantRevision.assistant_id == assistant_id,
+        AssistantRevision.number <= number,
+        AssistantRevision.is_snapshot.is_(True)
+    ).order_by(AssistantRevision.number.desc()).limit(1).scalar()
+    if snapshot_number is None:
+        return None
+
+    rows = db.query(AssistantRevision.number, AssistantRevision.data, AssistantRevision.content_hash).filter(
+        AssistantRevision.assistant_id == assistant_id,
+        AssistantRevision.number.between(snapshot_number, number)
+    ).order_by(AssistantRevision.number).all()
+    if not rows or rows[-1].number != number:
+        return None
+
+    content = decompress_content(rows[0].data, BLOB_COMPRESSION)
+    for row in rows[1:]:
+        content = apply_delta(content, decompress_content(row.data, BLOB_COMPRESSION))
+
+    if hashlib.sha256(content.encode('utf-8')).hexdigest() != rows[-1].content_hash:
+        raise ValueError(f"Revision {number} of assistant {assistant_id} does not match its hash")
+    return content
+
+
+def remove_revisions(db: Session, assistant_ids: Iterable[int]) -> None:
+    """Remove the revisions of assistants deleted in bulk"""
+    assistant_ids = list(assistant_ids)
+    if not assistant_ids:
+        return
+    db.query(AssistantRevision).filter(
+        AssistantRevision.assistant_id.in_(assistant_ids)
+    ).delete(synchronize_session=False)
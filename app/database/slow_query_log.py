@@ -0,0 +1,113 @@
+"""
+Slow query log.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are written to their own
+rotating log (logs/slow_queries.log) with:
+
+- the SQL, whose bound parameters are replaced by their type and length, so
+  search terms, e-mails or password hashes never reach the log;
+- the request that ran it (method, path and route function), taken from the
+  query counter of the request;
+- the EXPLAIN QUERY PLAN of the statement, captured on the same connection
+  right after it ran.
+
+A negative threshold disables the log. The setting is read when the process
+starts.
+"""
+from typing import Any, List, Optional
+from sqlalchemy import event
+import os
+import time
+import logging
+import logging.handlers
+
+from .query_counter import current_query_stats
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_LOG_FILE = "slow_queries.log"
+
+
+def configure_slow_query_log(log_dir: str) -> None:
+    """Send the slow query records to their own rotating file instead of the app log"""
+    os.makedirs(log_dir, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, SLOW_QUERY_LOG_FILE),
+        maxBytes=10*1024*1024,  # 10MB
+        backupCount=5,
+        encoding='utf-8'
+    )
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Replace every bound value by its type (and length for text and bytes)"""
+    if isinstance(parameters, dict):
+        return {key: redact_parameters(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return type(parameters)(redact_parameters(value) for value in parameters)
+    if parameters is None:
+        return None
+    if isinstance(parameters, (str, bytes)):
+        return f"<{type(parameters).__name__}:{len(parameters)}>"
+    return f"<{type(parameters).__name__}>"
+
+
+def describe_request() -> str:
+    """Method, path and route function of the request being served"""
+    stats = current_query_stats()
+    if stats is None or stats.scope is None:
+        return "outside a request"
+    scope = stats.scope
+    description = f"{scope.get('method', '')} {scope.get('path', '')}".strip()
+    endpoint = scope.get("endpoint")
+    if endpoint is not None:
+        description += f" ({endpoint.__module__}.{endpoint.__qualname__})"
+    return description
+
+
+def explain_query_plan(dbapi_connection, statement: str, parameters: Any) -> List[str]:
+    """EXPLAIN QUERY PLAN lines of a statement, on a raw DB-API connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [str(row[3]) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def install_slow_query_log(engine, threshold_ms: Optional[float] = None) -> None:
+    """Log the slow statements of a (sync) engine; for an AsyncEngine pass engine.sync_engine"""
+    threshold_ms = SLOW_QUERY_THRESHOLD_MS if threshold_ms is None else threshold_ms
+    if threshold_ms < 0 or engine.dialect.name != "sqlite":
+        return
+    threshold = threshold_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        # En el contexto de la ejecución: si la sentencia falla se descarta con él
+        context._slow_query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - context._slow_query_start
+        if duration < threshold:
+            return
+        plan = []
+        # executemany no tiene un único plan; las sentencias del propio SQLite (PRAGMA) tampoco
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")):
+            try:
+                # Cursor DB-API sin eventos de SQLAlchemy: el EXPLAIN no se cuenta ni se registra
+                plan = explain_query_plan(conn.connection, statement, parameters)
+            except Exception as e:
+                plan = [f"(EXPLAIN failed: {e})"]
+        lines = [
+            f"{duration * 1000:.1f} ms - {describe_request()}",
+            f"  SQL: {' '.join(statement.split())}",
+            f"  Parameters: {redact_parameters(parameters)}",
+        ] + [f"  Plan: {line}" for line in plan]
+        logger.warning("\n".join(lines))
@@ -0,0 +1,117 @@
+"""
+SQLite connection tuning.
+
+Every new connection of the engine gets the PRAGMAs of the selected profile.
+The profile is chosen with SQLITE_PROFILE and any single PRAGMA can be
+overridden with SQLITE_<NAME> (for example SQLITE_SYNCHRONOUS=FULL). The
+settings table lives in the same database, so the tuning can only come from
+the environment.
+
+Profiles:
+
+- production (default): WAL journal, so readers never block the writer and
+  the writer never blocks readers; synchronous=NORMAL, which in WAL mode only
+  risks the last transactions on a power loss, never corruption; 64 MB page
+  cache, 256 MB memory map, temporary tables in memory and a 5 s busy timeout
+  so concurrent writers wait for the lock instead of failing with
+  "database is locked".
+- safe: SQLite's rollback journal with synchronous=FULL and the same busy
+  timeout, for file systems where WAL is not supported (network shares).
+"""
+from typing import Dict, Optional
+from sqlalchemy import event
+import argparse
+import os
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Orden de aplicación: journal_mode primero, synchronous depende de él
+SQLITE_PRAGMAS = ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout")
+
+SQLITE_PROFILES: Dict[str, Dict[str, str]] = {
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": "-65536",       # en KiB cuando es negativo: 64 MB
+        "mmap_size": "268435456",     # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": "5000",       # ms
+    },
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": "-16384",
+        "mmap_size": "0",
+        "temp_store": "DEFAULT",
+        "busy_timeout": "5000",
+    },
+}
+DEFAULT_SQLITE_PROFILE = "production"
+
+_VALUE_PATTERN = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+
+def get_sqlite_pragmas(profile: Optional[str] = None, environ=os.environ) -> Dict[str, str]:
+    """PRAGMAs of a profile with the SQLITE_<NAME> overrides of the environment applied"""
+    profile = profile or environ.get("SQLITE_PROFILE", DEFAULT_SQLITE_PROFILE)
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile '{profile}', expected one of {', '.join(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in SQLITE_PRAGMAS:
+        value = environ.get(f"SQLITE_{name.upper()}")
+        if value is not None:
+            pragmas[name] = value.strip()
+    for name, value in pragmas.items():
+        # Los valores se interpolan en la sentencia PRAGMA: solo palabras o números
+        if not _VALUE_PATTERN.match(value):
+            raise ValueError(f"Invalid value for PRAGMA {name}: {value}")
+    return pragmas
+
+
+def configure_sqlite_engine(engine, pragmas: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Apply the PRAGMAs on every new connection of a SQLite engine. Returns the PRAGMAs used"""
+    if engine.dialect.name != "sqlite":
+        return {}
+    pragmas = get_sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name in SQLITE_PRAGMAS:
+                if name in pragmas:
+                    cursor.execute(f"PRAGMA {name}={pragmas[name]}")
+        finally:
+            cursor.close()
+
+    return pragmas
+
+
+def read_pragmas(connection) -> Dict[str, str]:
+    """Values of the tuned PRAGMAs as seen by a DB-API connection"""
+    cursor = connection.cursor()
+    try:
+        values = {}
+        for name in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            values[name] = str(row[0]) if row else ""
+        return values
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    parser = argparse.ArgumentParser(description='Show the SQLite PRAGMAs applied to the application database')
+    parser.parse_args()
+
+    connection = engine.raw_connection()
+    try:
+        for name, value in read_pragmas(connection).items():
+            print(f"{name:14} {value}")
+    finally:
+        connection.close()
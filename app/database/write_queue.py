@@ -0,0 +1,172 @@
+"""
+Single writer for the short write transactions of the web routes.
+
+SQLite has one write lock per database. When every request opens its own
+write transaction, a burst of likes or collection changes turns into requests
+queueing on busy_timeout, and into "database is locked" errors when the wait
+runs out. Routes instead submit the write to the WriteQueue: one thread takes
+the pending operations, runs them in a single transaction and commits once,
+so N concurrent writes cost one lock acquisition and one fsync. Reads do not
+go through the queue and stay concurrent.
+
+An operation is a function called as operation(db, *args) with the writer's
+Session. It must only use that session, return plain values (not ORM objects,
+which belong to the writer's session) and not commit. Operations run in the
+order they were submitted and see the writes of the previous ones. If one raises
+or the commit fails, the batch is rolled back and every operation is run again
+on its own, so one failing write does not fail the others.
+"""
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+import asyncio
+import os
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Operaciones como máximo por transacción y espera en segundos para agrupar más
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+WRITE_QUEUE_MAX_DELAY = float(os.getenv("WRITE_QUEUE_MAX_DELAY", "0"))
+
+_STOP = object()
+
+Operation = Tuple[Callable[..., Any], tuple, Future]
+
+
+class WriteQueue:
+    """Serializes and batches write operations on a dedicated thread"""
+
+    def __init__(self, session_factory: Optional[Callable] = None,
+                 max_batch: int = WRITE_QUEUE_MAX_BATCH, max_delay: float = WRITE_QUEUE_MAX_DELAY):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.operations = 0
+        self.retried_batches = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Write what is queued and stop the thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit_nowait(self, operation: Callable[..., Any], *args) -> Future:
+        """Queue an operation; the returned Future holds its result once committed"""
+        future: Future = Future()
+        self.start()
+        self._queue.put((operation, args, future))
+        return future
+
+    async def submit(self, operation: Callable[..., Any], *args) -> Any:
+        """Queue an operation and wait for its result without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit_nowait(operation, *args))
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch, stop = self._collect([item])
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _collect(self, batch: List[Operation]) -> Tuple[List[Operation], bool]:
+        """Add the operations already waiting, up to max_batch"""
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _new_session(self):
+        if self.session_factory is not None:
+            return self.session_factory()
+        # Se resuelve en cada lote para seguir a database.SessionLocal si se reemplaza
+        from . import database
+        return database.SessionLocal()
+
+    def _execute(self, batch: List[Operation]) -> List[Any]:
+        """Run the operations in one transaction. Returns their results"""
+        db = self._new_session()
+        try:
+            results = []
+            for operation, args, _ in batch:
+                results.append(operation(db, *args))
+                # Cada operación ve las escrituras de las anteriores del lote
+                db.flush()
+            db.commit()
+            return results
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_batch(self, batch: List[Operation]) -> None:
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        self.batches += 1
+        self.operations += len(batch)
+        try:
+            results = self._execute(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+                return
+            # Una operación ha fallado: cada una se repite en su propia transacción
+            self.retried_batches += 1
+            logger.warning(f"Write batch of {len(batch)} operations failed, retrying them one by one: {str(e)}")
+            for operation, args, future in batch:
+                try:
+                    result = self._execute([(operation, args, future)])[0]
+                except Exception as single_error:
+                    future.set_exception(single_error)
+                else:
+                    future.set_result(result)
+            return
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "operations": self.operations,
+            "retried_batches": self.retried_batches,
+            "average_batch": round(self.operations / self.batches, 2) if self.batches else 0.0
+        }
+
+
+# Singleton instance
+_write_queue = None
+
+def get_write_queue() -> WriteQueue:
+    """Get or create the WriteQueue singleton"""
+    global _write_queue
+    if _write_queue is None:
+        _write_queue = WriteQueue()
+    return _write_queue
@@ -30,16 +30,25 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.responses import FileResponse
 from pathlib import Path
+from typing import Optional
 import os
 from contextlib import asynccontextmanager
+import asyncio
 from .database.database import init_db, get_db, engine, Base
+from .database.async_database import async_engine
+from .database.write_queue import get_write_queue
+from .database.query_counter import QueryCounterMiddleware
+from .database.slow_query_log import configure_slow_query_log
+from .utils.settings_cache import get_settings_cache
 from .database.models import Setting, User
 from sqlalchemy.orm import Session
 from .utils.config_ok import check_configuration
-from .routers.auth import get_current_user
+from .routers.auth import get_current_user_optional
 from .routers import auth, profile, settings, users, assistants, explore, email, collection
 from .utils.filters import datetime_filter, shortdate_filter
 from .utils.defaults_manager import get_defaults_manager
+from .utils.counter_buffer import get_counter_buffer
+from .utils.counter_reconcile import run_reconciliation
 from urllib.parse import urljoin
 import logging
 import logging.handlers
@@ -83,6 +92,9 @@ def setup_logging():
     logger.addHandler(file_handler)
     logger.addHandler(console_handler)
     
+    # Las consultas lentas van a su propio fichero rotativo
+    configure_slow_query_log(log_dir)
+    
     return logger
 
 # Obtener la ruta base del proyecto
@@ -104,9 +116,23 @@ async def lifespan(app: FastAPI):
     config_status = check_configuration()
     if not config_status["database_initialized"]:
         raise RuntimeError("Failed to initialize database")
+    
+    # Volcar periódicamente los contadores de descargas y visitas y reconciliar likes y colecciones
+    background_tasks = [
+        asyncio.create_task(get_counter_buffer().run()),
+        asyncio.create_task(run_reconciliation()),
+    ]
     yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    # Escribir lo que quede en la cola del escritor antes de cerrar
+    await asyncio.to_thread(get_write_queue().stop)
+    await async_engine.dispose()
 
 app = FastAPI(title="Modular Web App", lifespan=lifespan)
+# Número y tiempo de las consultas SQL de cada petición (cabeceras con DEBUG=1)
+app.add_middleware(QueryCounterMiddleware)
 
 # Agregar la ruta del favicon aquí
 @app.get('/favicon.ico')
@@ -167,32 +193,28 @@ templates.env.globals['secure_url_for'] = secure_url_for
 templates.env.globals['secure_static_url'] = secure_static_url
 
 @app.get("/")
-async def home(request: Request, db: Session = Depends(get_db)):
-    current_user = get_current_user(db, request.cookies.get("session"))
+async def home(request: Request, current_user: Optional[User] = Depends(get_current_user_optional)):
     return templates.TemplateResponse(
         "pages/home.html",
         {"request": request, "current_user": current_user}
     )
 
 @app.get("/learn-more")
-async def learn_more(request: Request, db: Session = Depends(get_db)):
-    current_user = get_current_user(db, request.cookies.get("session"))
+async def learn_more(request: Request, current_user: Optional[User] = Depends(get_current_user_optional)):
     return templates.TemplateResponse(
         "pages/learn-more.html",
         {"request": request, "current_user": current_user}
     )
 
 @app.get("/adl")
-async def adl_page(request: Request, db: Session = Depends(get_db)):
-    current_user = get_current_user(db, request.cookies.get("session"))
+async def adl_page(request: Request, current_user: Optional[User] = Depends(get_current_user_optional)):
     return templates.TemplateResponse(
         "pages/adl.html",
         {"request": request, "current_user": current_user}
     )
 
 @app.get("/adl_reference")
-async def adl_reference_page(request: Request, db: Session = Depends(get_db)):
-    current_user = get_current_user(db, request.cookies.get("session"))
+async def adl_reference_page(request: Request, current_user: Optional[User] = Depends(get_current_user_optional)):
     return templates.TemplateResponse(
         "pages/adl_reference.html",
         {"request": request, "current_user": current_user}
@@ -210,6 +232,7 @@ async def create_setting(db: Session = Depends(get_db)):
         )
         db.add(setting)
         db.commit()
+        get_settings_cache().invalidate()
         return {"message": "Setting created", "value": setting.get_value()}
     except Exception as e:
         return {"error": str(e)}
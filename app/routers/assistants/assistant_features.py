@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from ...database.database import get_db
-from ...database.models import Setting, User
-from ..auth import get_current_user
+from ...database.models import User
+from ..auth import get_request_user
+from ...utils.settings_cache import get_settings_cache
 import logging
 import openai
 from pydantic import BaseModel, Field, validator
@@ -43,21 +44,15 @@ async def get_ollama_url(
     logger.info(f"Received request for ollama_url")
     
     # Verificar autenticación
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user:
         logger.warning("Unauthorized attempt to access ollama_url")
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     try:
-        url = db.query(Setting).filter(
-            Setting.category == "ollama",
-            Setting.key == "ollama_url"
-        ).first()
-        
-        port = db.query(Setting).filter(
-            Setting.category == "ollama",
-            Setting.key == "ollama_port"
-        ).first()
+        settings = get_settings_cache()
+        url = settings.get(db, "ollama", "ollama_url")
+        port = settings.get(db, "ollama", "ollama_port")
         
         logger.info(f"Retrieved settings - URL: {url and url.value}, Port: {port and port.value}")
         
@@ -86,10 +81,7 @@ async def get_ollama_url(
 async def get_license(db: Session = Depends(get_db)):
     """Get default IP license from settings"""
     try:
-        license_setting = db.query(Setting).filter(
-            Setting.category == "license",
-            Setting.key == "default_license"
-        ).first()
+        license_setting = get_settings_cache().get(db, "license", "default_license")
         
         if not license_setting:
             return {"default_license": None}
@@ -116,11 +108,11 @@ async def improve_prompt(
             logger.error("Empty prompt received")
             raise HTTPException(status_code=400, detail="Prompt is required")
             
+        # Todos los ajustes salen de la caché: una consulta como mucho y la API key ya descifrada
+        settings = get_settings_cache()
+        
         # Get default LLM setting
-        default_llm = db.query(Setting).filter(
-            Setting.category == "general",
-            Setting.key == "default_LLM"
-        ).first()
+        default_llm = settings.get(db, "general", "default_LLM")
         
         if not default_llm:
             logger.error("Default LLM setting not found")
@@ -129,10 +121,7 @@ async def improve_prompt(
         logger.info(f"Using LLM: {default_llm.value}")
         
         # Get improve role prompt from settings
-        improve_role_setting = db.query(Setting).filter(
-            Setting.category == "improve",
-            Setting.key == "improve_role"
-        ).first()
+        improve_role_setting = settings.get(db, "improve", "improve_role")
         
         if not improve_role_setting:
             logger.error("Improve role prompt setting not found")
@@ -143,22 +132,13 @@ async def improve_prompt(
         try:
             if default_llm.value.lower() == "local":
                 # Use Ollama with OpenAI compatibility
-                url = db.query(Setting).filter(
-                    Setting.category == "ollama",
-                    Setting.key == "ollama_url"
-                ).first()
+                url = settings.get(db, "ollama", "ollama_url")
                 logger.info(f"Ollama URL setting: {url.value if url else 'Not found'}")
                 
-                port = db.query(Setting).filter(
-                    Setting.category == "ollama",
-                    Setting.key == "ollama_port"
-                ).first()
+                port = settings.get(db, "ollama", "ollama_port")
                 logger.info(f"Ollama port setting: {port.value if port else 'Not found'}")
                 
-                model = db.query(Setting).filter(
-                    Setting.category == "ollama",
-                    Setting.key == "ollama_model"
-                ).first()
+                model = settings.get(db, "ollama", "ollama_model")
                 logger.info(f"Ollama model setting: {model.value if model else 'Not found'}")
                 
                 if not url or not port or not model:
@@ -182,28 +162,21 @@ async def improve_prompt(
                 
             else:
                 # Use OpenAI
-                api_key = db.query(Setting).filter(
-                    Setting.category == "openapi",
-                    Setting.key == "openapi_apikey"
-                ).first()
+                api_key = settings.get(db, "openapi", "openapi_apikey")
                 logger.info("Found OpenAI API key setting")
                 
                 if not api_key:
                     logger.error("OpenAI API key not found")
                     raise HTTPException(status_code=404, detail="OpenAI API key not found")
                     
-                decrypted_key = api_key.get_value()
-                logger.info("Decrypted OpenAI API key")
+                decrypted_key = api_key.value
                 
                 if not decrypted_key or decrypted_key == "<encrypted>":
                     logger.error("Invalid OpenAI API key state")
                     raise HTTPException(status_code=400, detail="Invalid OpenAI API key")
 
                 # Get OpenAI model from settings
-                openai_model = db.query(Setting).filter(
-                    Setting.category == "openapi",
-                    Setting.key == "openapi_model"
-                ).first()
+                openai_model = settings.get(db, "openapi", "openapi_model")
                 logger.info(f"OpenAI model setting: {openai_model.value if openai_model else 'Not found'}")
 
                 if not openai_model:
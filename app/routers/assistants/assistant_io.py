@@ -1,11 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, File, UploadFile
-from fastapi.responses import Response, RedirectResponse
+from fastapi.responses import Response, RedirectResponse, JSONResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ...database.database import get_db
-from ...database.models import Assistant, User
-from ..auth import get_current_user
+from ...database.async_database import get_async_db
+from ...database.models import Assistant, User, UserAssistantCollection
+from ..auth import get_current_user_required, get_request_user
 from ...utils.assistant_loader import create_assistant_from_yaml
-import yaml
+from ...utils.search_index import index_assistant
+from ...utils.yaml_cache import get_yaml_cache
+from ...utils.counter_buffer import get_counter_buffer
+from ...database.revisions import list_revisions, get_revision_content, get_revision_hash
+from ...utils import yaml_codec
 import logging
 from datetime import datetime
 from pathlib import Path
@@ -20,7 +26,7 @@ async def import_assistant(
     request: Request,
     db: Session = Depends(get_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user:
         return {"status": "error", "message": "Not authenticated"}
     
@@ -30,13 +36,15 @@ async def import_assistant(
         
         # Validate YAML format
         try:
-            yaml_data = yaml.safe_load(yaml_content)
-        except yaml.YAMLError as e:
+            yaml_data = yaml_codec.load(yaml_content)
+        except yaml_codec.YAMLError as e:
             logger.error(f"Invalid YAML format: {str(e)}")
             return {"status": "error", "message": "Invalid YAML format"}
             
         assistant = create_assistant_from_yaml(db, current_user.id, yaml_content)
         db.add(assistant)
+        db.flush()
+        index_assistant(db, assistant)
         db.commit()
         
         return {"status": "success", "message": "Assistant imported successfully", "id": assistant.id}
@@ -49,7 +57,7 @@ async def try_demo(
     request: Request,
     db: Session = Depends(get_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user:
         return {"status": "error", "message": "Not authenticated"}
     
@@ -64,6 +72,8 @@ async def try_demo(
             
         assistant = create_assistant_from_yaml(db, current_user.id, yaml_content)
         db.add(assistant)
+        db.flush()
+        index_assistant(db, assistant)
         db.commit()
         
         return {"status": "success", "message": "Demo assistant imported successfully"}
@@ -75,53 +85,125 @@ async def try_demo(
 async def export_assistant(
     assistant_id: int,
     request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
     assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not assistant:
         raise HTTPException(status_code=404, detail="Assistant not found")
         
     try:
-        yaml_data = yaml.safe_load(assistant.yaml_content)
+        yaml_data = get_yaml_cache().get_document(assistant)
         return yaml_data
     except Exception as e:
         logger.error(f"Error exporting assistant {assistant_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Error exporting assistant")
 
-@router.get("/assistant/{assistant_id}/yaml")
-async def get_assistant_yaml(
-    assistant_id: int,
-    request: Request,
-    db: Session = Depends(get_db)
-):
-    current_user = get_current_user(db, request.cookies.get("session"))
+def can_read_content(db: Session, assistant: Assistant, user: User) -> bool:
+    """The YAML of an assistant is readable if it is public, owned by the user or in their collection"""
+    if assistant.is_public or assistant.user_id == user.id:
+        return True
+    return db.query(UserAssistantCollection.id).filter(
+        UserAssistantCollection.user_id == user.id,
+        UserAssistantCollection.assistant_id == assistant.id
+    ).first() is not None
+
+def content_etag(assistant: Assistant) -> str:
+    # El hash del blob identifica el contenido; los documentos aún sin migrar usan updated_at
+    if assistant.content_hash:
+        return f'"{assistant.content_hash}"'
+    updated = assistant.updated_at.isoformat() if assistant.updated_at else ''
+    return f'"{assistant.id}-{updated}"'
+
+def get_readable_assistant(db: Session, request: Request, assistant_id: int) -> Assistant:
+    current_user = get_request_user(request, db)
     if not current_user:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
     assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not assistant:
         raise HTTPException(status_code=404, detail="Assistant not found")
+    if not can_read_content(db, assistant, current_user):
+        raise HTTPException(status_code=403, detail="You don't have permission to view this assistant")
+    return assistant
+
+def _yaml_response(db: Session, request: Request, assistant_id: int) -> Response:
+    assistant = get_readable_assistant(db, request, assistant_id)
+    
+    # yaml_content es diferido: si el cliente ya tiene esta versión no se lee de la base de datos
+    etag = content_etag(assistant)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
         
-    return {"yaml_content": assistant.yaml_content}
+    return JSONResponse(content={"yaml_content": assistant.yaml_content}, headers=headers)
 
-@router.get("/assistant/{assistant_id}/download")
-async def download_assistant_yaml(
+@router.get("/assistant/{assistant_id}/yaml")
+async def get_assistant_yaml(
     assistant_id: int,
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
+    # El blob se carga de forma perezosa: todo el acceso al ORM va en run_sync
+    return await db.run_sync(_yaml_response, request, assistant_id)
+
+def _revision_list(db: Session, request: Request, assistant_id: int) -> list:
+    get_readable_assistant(db, request, assistant_id)
+    return list_revisions(db, assistant_id)
+
+@router.get("/assistant/{assistant_id}/revisions")
+async def get_assistant_revisions(
+    assistant_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List the saved revisions of an assistant, newest first"""
+    return {"revisions": await db.run_sync(_revision_list, request, assistant_id)}
+
+def _revision_response(db: Session, request: Request, assistant_id: int, number: int) -> Response:
+    get_readable_assistant(db, request, assistant_id)
+    digest = get_revision_hash(db, assistant_id, number)
+    if digest is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    
+    # La ETag es el hash del contenido, no la URL: si SQLite reutiliza el id de un
+    # asistente borrado, su revisión N tiene otra ETag y el navegador no sirve la antigua
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        yaml_content = get_revision_content(db, assistant_id, number)
+    except ValueError as e:
+        logger.error(str(e))
+        raise HTTPException(status_code=500, detail="Revision could not be rebuilt")
+    return JSONResponse(content={"number": number, "yaml_content": yaml_content}, headers=headers)
 
+@router.get("/assistant/{assistant_id}/revisions/{number}")
+async def get_assistant_revision(
+    assistant_id: int,
+    number: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Return the YAML of one revision of an assistant"""
+    return await db.run_sync(_revision_response, request, assistant_id, number)
+
+@router.get("/assistant/{assistant_id}/download")
+async def download_assistant_yaml(
+    assistant_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
+):
     assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not assistant:
         raise HTTPException(status_code=404, detail="Assistant not found")
-        
+    if not can_read_content(db, assistant, current_user):
+        raise HTTPException(status_code=403, detail="You don't have permission to view this assistant")
+
+    # Una descarga por usuario y asistente en cada ventana del buffer de contadores
+    get_counter_buffer().increment("downloads", assistant_id, counted_by=current_user.id)
     response = Response(content=assistant.yaml_content)
     response.headers["Content-Disposition"] = f'attachment; filename="{assistant.title}.yaml"'
     response.headers["Content-Type"] = "application/x-yaml"
@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Request, Depends, Cookie, Form, HTTPException, Body
+from fastapi import APIRouter, Request, Depends, Form, HTTPException, Body
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from typing import Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-import yaml
+from ...utils import yaml_codec
 import os
 import logging
 from datetime import datetime
 
 from ...database.database import get_db
+from ...database.write_queue import get_write_queue
 from ...database.models import Assistant, User
-from ...routers.auth import get_current_user
+from ...routers.auth import get_current_user_required, get_request_user
 from ...utils.history_utils import format_history_entry, clean_redundant_history_fields
+from ...utils.search_index import index_assistant, remove_from_index
+from ...utils.assistant_summary import sync_assistant_summary, build_summary
+from ...utils.yaml_cache import get_yaml_cache
+from ...utils.counter_buffer import get_counter_buffer
+from ...utils.remixes import record_remix
+from .assistant_io import can_read_content
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +27,7 @@ router = APIRouter()
 
 def create_assistant_from_yaml(db: Session, user_id: int, yaml_content: str):
     try:
-        yaml_data = yaml.safe_load(yaml_content)
+        yaml_data = yaml_codec.load(yaml_content)
         metadata = yaml_data.get('metadata', {})
         description = metadata.get('description', {})
         
@@ -52,7 +59,7 @@ def create_assistant_from_yaml(db: Session, user_id: int, yaml_content: str):
         yaml_data = clean_redundant_history_fields(yaml_data)
         
         # Convert back to YAML
-        updated_yaml = yaml.dump(yaml_data, allow_unicode=True)
+        updated_yaml = yaml_codec.dump(yaml_data)
         
         assistant = Assistant(
             user_id=user_id,
@@ -60,7 +67,8 @@ def create_assistant_from_yaml(db: Session, user_id: int, yaml_content: str):
             yaml_content=updated_yaml,
             is_public=metadata.get('visibility', {}).get('is_public', True),
             created_by=metadata.get('author', {}).get('name'),
-            forked_from=forked_from
+            forked_from=forked_from,
+            summary=build_summary(yaml_data)
         )
         
         return assistant
@@ -70,17 +78,13 @@ def create_assistant_from_yaml(db: Session, user_id: int, yaml_content: str):
 
 @router.post("/create-from-template")
 async def create_assistant_from_template(
-    request: Request,
     yaml_content: dict = Body(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
     try:
         # Load the YAML and update it with the current user's information
-        yaml_data = yaml.safe_load(yaml_content["yaml_content"])
+        yaml_data = yaml_codec.load(yaml_content["yaml_content"])
         
         # Update metadata
         current_date = datetime.utcnow()
@@ -104,7 +108,7 @@ async def create_assistant_from_template(
         yaml_data = clean_redundant_history_fields(yaml_data)
         
         # Convert back to YAML
-        updated_yaml = yaml.dump(yaml_data, allow_unicode=True)
+        updated_yaml = yaml_codec.dump(yaml_data)
         
         # Create the assistant
         assistant = Assistant(
@@ -115,6 +119,7 @@ async def create_assistant_from_template(
         )
         
         db.add(assistant)
+        sync_assistant_summary(db, assistant, yaml_data)
         db.commit()
         db.refresh(assistant)
         
@@ -127,14 +132,10 @@ async def create_assistant_from_template(
 
 @router.post("/create")
 async def create_assistant(
-    request: Request,
     yaml_content: dict = Body(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-        
     try:
         # The YAML content comes in the yaml_content field of the JSON
         yaml_str = yaml_content.get("yaml_content")
@@ -143,21 +144,22 @@ async def create_assistant(
             
         # Validate YAML format
         try:
-            yaml_data = yaml.safe_load(yaml_str)
-        except yaml.YAMLError as e:
+            yaml_data = yaml_codec.load(yaml_str)
+        except yaml_codec.YAMLError as e:
             raise HTTPException(status_code=400, detail=f"Invalid YAML format: {str(e)}")
             
         assistant = create_assistant_from_yaml(db, current_user.id, yaml_str)
         if assistant:
             db.add(assistant)
-            db.commit()
+            db.flush()
+            index_assistant(db, assistant)
             
-            # If it's a new version, increment the version counter of the original
+            # If it's a new version, record the remix of the original
             if assistant.forked_from:
-                original_assistant = db.query(Assistant).filter(Assistant.id == assistant.forked_from).first()
-                if original_assistant:
-                    original_assistant.remixed_by = (original_assistant.remixed_by or '') + f"{current_user.username}, "
-                    db.commit()
+                original_exists = db.query(Assistant.id).filter(Assistant.id == assistant.forked_from).first()
+                if original_exists:
+                    record_remix(db, assistant.forked_from, current_user.id, assistant.id)
+            db.commit()
             
             return {"message": "Assistant created successfully", "assistant_id": assistant.id}
         else:
@@ -170,12 +172,9 @@ async def create_assistant(
 async def update_assistant(
     assistant_id: int,
     request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
     assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not assistant:
         raise HTTPException(status_code=404, detail="Assistant not found")
@@ -193,8 +192,8 @@ async def update_assistant(
             
         # Validate YAML format
         try:
-            yaml_data = yaml.safe_load(yaml_content)
-        except yaml.YAMLError as e:
+            yaml_data = yaml_codec.load(yaml_content)
+        except yaml_codec.YAMLError as e:
             raise HTTPException(status_code=400, detail=f"Invalid YAML format: {str(e)}")
             
         # Update the is_public value according to the YAML
@@ -218,11 +217,12 @@ async def update_assistant(
             yaml_data = clean_redundant_history_fields(yaml_data)
             
             # Update YAML content with updated history
-            yaml_content = yaml.dump(yaml_data, sort_keys=False)
+            yaml_content = yaml_codec.dump(yaml_data)
         
         assistant.yaml_content = yaml_content
         assistant.updated_at = datetime.utcnow()
         assistant.is_public = is_public
+        sync_assistant_summary(db, assistant, yaml_data)
         db.commit()
         
         return {"message": "Assistant updated successfully"}
@@ -236,7 +236,7 @@ async def delete_assistant_redirect(
     request: Request,
     db: Session = Depends(get_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user:
         return RedirectResponse(url="/auth/login")
 
@@ -247,24 +247,32 @@ async def delete_assistant_redirect(
     if assistant.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this assistant")
         
+    remove_from_index(db, [assistant.id])
     db.delete(assistant)
     db.commit()
     
     return RedirectResponse(url="/assistants")
 
+def _remove_from_collection(db: Session, user_id: int, assistant_id: int) -> None:
+    """Write operation of the WriteQueue: remove an assistant from a user's collection"""
+    delete_sql = text("""
+        DELETE FROM user_assistant_collections 
+        WHERE user_id = :user_id AND assistant_id = :assistant_id
+    """)
+    result = db.execute(delete_sql, {"user_id": user_id, "assistant_id": assistant_id})
+    
+    # Decrement the collection counter
+    if result.rowcount:
+        assistant = db.get(Assistant, assistant_id)
+        if assistant is not None:
+            assistant.in_collections = max(0, (assistant.in_collections or 0) - 1)
+
 @router.delete("/{assistant_id}")
 async def delete_assistant(
     assistant_id: int,
     db: Session = Depends(get_db),
-    session: Optional[str] = Cookie(None)
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, session)
-    if not current_user:
-        return JSONResponse(
-            status_code=401,
-            content={"detail": "Not authenticated"}
-        )
-
     # Get the assistant
     assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not assistant:
@@ -277,23 +285,12 @@ async def delete_assistant(
         # Check if the assistant belongs to the user
         if assistant.user_id == current_user.id:
             # If it's the owner, delete the assistant completely
+            remove_from_index(db, [assistant.id])
             db.delete(assistant)
+            db.commit()
         else:
-            # If not the owner, only delete from the collection
-            delete_sql = text("""
-                DELETE FROM user_assistant_collections 
-                WHERE user_id = :user_id AND assistant_id = :assistant_id
-            """)
-            result = db.execute(
-                delete_sql,
-                {"user_id": current_user.id, "assistant_id": assistant_id}
-            )
-            
-            # Decrement the collection counter
-            assistant.in_collections = max(0, assistant.in_collections - 1)
-            db.add(assistant)
-
-        db.commit()
+            # If not the owner, only delete from the collection, through the single writer
+            await get_write_queue().submit(_remove_from_collection, current_user.id, assistant_id)
         return JSONResponse(
             status_code=200,
             content={"status": "success", "message": "Assistant removed successfully"}
@@ -308,20 +305,16 @@ async def delete_assistant(
 @router.post("/{assistant_id}/clone")
 async def clone_assistant(
     assistant_id: int,
-    request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
     source_assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not source_assistant:
         raise HTTPException(status_code=404, detail="Assistant not found")
         
     try:
         # Load the current YAML
-        yaml_data = yaml.safe_load(source_assistant.yaml_content)
+        yaml_data = get_yaml_cache().get_document(source_assistant)
         
         # Get the title and author of the original assistant
         original_title = yaml_data.get('metadata', {}).get('description', {}).get('title', 'Untitled Assistant')
@@ -349,7 +342,7 @@ async def clone_assistant(
         yaml_data = clean_redundant_history_fields(yaml_data)
         
         # Convert back to YAML
-        new_yaml_content = yaml.dump(yaml_data, allow_unicode=True)
+        new_yaml_content = yaml_codec.dump(yaml_data)
         
         # Create a new assistant
         new_assistant = Assistant(
@@ -362,6 +355,7 @@ async def clone_assistant(
         )
         
         db.add(new_assistant)
+        sync_assistant_summary(db, new_assistant, yaml_data)
         db.commit()
         
         return {"message": "Assistant cloned successfully", "id": new_assistant.id}
@@ -372,20 +366,16 @@ async def clone_assistant(
 @router.post("/{assistant_id}/import")
 async def import_assistant(
     assistant_id: int,
-    request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
     source_assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not source_assistant:
         raise HTTPException(status_code=404, detail="Assistant not found")
         
     try:
         # Load the current YAML
-        yaml_data = yaml.safe_load(source_assistant.yaml_content)
+        yaml_data = get_yaml_cache().get_document(source_assistant)
         
         # Set import timestamp
         current_date = datetime.utcnow()
@@ -404,7 +394,7 @@ async def import_assistant(
         yaml_data = clean_redundant_history_fields(yaml_data)
         
         # Convert back to YAML
-        updated_yaml = yaml.dump(yaml_data, allow_unicode=True)
+        updated_yaml = yaml_codec.dump(yaml_data)
         
         # Create a new assistant
         new_assistant = Assistant(
@@ -417,13 +407,8 @@ async def import_assistant(
         )
         
         db.add(new_assistant)
-        db.commit()
-        
-        # Update the original assistant's remixed_by field
-        if source_assistant.remixed_by:
-            source_assistant.remixed_by += f"{current_user.username}, "
-        else:
-            source_assistant.remixed_by = f"{current_user.username}, "
+        sync_assistant_summary(db, new_assistant, yaml_data)
+        record_remix(db, source_assistant.id, current_user.id, new_assistant.id)
         db.commit()
         
         return {"message": "Assistant imported successfully", "id": new_assistant.id}
@@ -434,18 +419,22 @@ async def import_assistant(
 @router.post("/{assistant_id}/increment-downloads")
 async def increment_downloads(
     assistant_id: int,
-    request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
     try:
         assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
         if not assistant:
             raise HTTPException(status_code=404, detail="Assistant not found")
+        if not can_read_content(db, assistant, current_user):
+            raise HTTPException(status_code=403, detail="You don't have permission to view this assistant")
             
-        assistant.downloads += 1
-        db.commit()
+        # Se escribe en el siguiente volcado del buffer; repetir la petición en la misma ventana no suma
+        get_counter_buffer().increment("downloads", assistant_id, counted_by=current_user.id)
         
         return {"message": "Downloads incremented successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error incrementing downloads for assistant {assistant_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -453,15 +442,11 @@ async def increment_downloads(
 @router.put("/{assistant_id}/yaml")
 async def update_assistant_yaml(
     assistant_id: int,
-    request: Request,
     yaml_data: dict = Body(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
     """Update an assistant's YAML content"""
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
     assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not assistant:
         raise HTTPException(status_code=404, detail="Assistant not found")
@@ -473,7 +458,7 @@ async def update_assistant_yaml(
     try:
         # Get the YAML content and title
         yaml_content = yaml_data['yaml_content']
-        parsed_yaml = yaml.safe_load(yaml_content)
+        parsed_yaml = yaml_codec.load(yaml_content)
         new_title = parsed_yaml.get('metadata', {}).get('description', {}).get('title', 'Untitled Assistant')
         
         # Update the is_public value according to the YAML
@@ -489,7 +474,7 @@ async def update_assistant_yaml(
         parsed_yaml = clean_redundant_history_fields(parsed_yaml)
         
         # Update the YAML
-        updated_yaml = yaml.dump(parsed_yaml, allow_unicode=True)
+        updated_yaml = yaml_codec.dump(parsed_yaml)
         
         # Create a new assistant if requested
         if yaml_data.get('create_new_version'):
@@ -500,7 +485,7 @@ async def update_assistant_yaml(
             )
             
             # Update the YAML with the new history entry
-            updated_yaml = yaml.dump(parsed_yaml, allow_unicode=True)
+            updated_yaml = yaml_codec.dump(parsed_yaml)
             
             new_assistant = Assistant(
                 user_id=current_user.id,
@@ -511,13 +496,8 @@ async def update_assistant_yaml(
                 forked_from=assistant_id
             )
             db.add(new_assistant)
-            db.commit()
-            
-            # Update the original assistant's remixed_by field
-            if assistant.remixed_by:
-                assistant.remixed_by += f"{current_user.username}, "
-            else:
-                assistant.remixed_by = f"{current_user.username}, "
+            sync_assistant_summary(db, new_assistant, parsed_yaml)
+            record_remix(db, assistant.id, current_user.id, new_assistant.id)
             db.commit()
             
             return {"message": "New version created successfully", "id": new_assistant.id}
@@ -526,6 +506,7 @@ async def update_assistant_yaml(
         assistant.yaml_content = updated_yaml
         assistant.title = new_title
         assistant.is_public = is_public
+        sync_assistant_summary(db, assistant, parsed_yaml)
         db.commit()
         
         return {"message": "Assistant updated successfully"}
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Cookie, Form, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Request, Form, File, UploadFile
 from fastapi.responses import RedirectResponse, PlainTextResponse, HTMLResponse, JSONResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.templating import Jinja2Templates
 from ...database.database import get_db
-from ...database.models import Assistant, User, Setting
-from ..auth import get_current_user
+from ...database.async_database import get_async_db
+from ...database.models import Assistant, AssistantSummary, User
+from ..auth import get_current_user_optional, get_current_user_required, get_request_user_async
 from ...utils.filters import datetime_filter, shortdate_filter
 from ...utils.history_utils import extract_dates_from_history
+from ...utils.assistant_summary import sync_assistant_summary, summary_card
+from ...utils.yaml_cache import get_yaml_cache
+from ...utils.counter_buffer import get_counter_buffer
+from ...utils.remixes import get_remixers
+from ...utils.lineage import get_ancestors, get_descendants
+from ...utils.settings_cache import get_settings_cache
 import logging
-import yaml
+from ...utils import yaml_codec
 import os
 from typing import Optional
 
@@ -22,70 +31,38 @@ templates.env.filters["shortdate"] = shortdate_filter
 @router.get("/")
 async def list_assistants(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = await get_request_user_async(request, db)
     if not current_user:
         return RedirectResponse(url="/auth/login")
     
-    # Obtener asistentes ordenados por fecha de actualización
-    db_assistants = db.query(Assistant).filter(
+    # Obtener asistentes ordenados por fecha de actualización,
+    # proyectando los datos de la tarjeta desde assistant_summaries
+    rows = (await db.execute(select(
+        Assistant.id,
+        Assistant.title,
+        Assistant.created_at,
+        Assistant.updated_at,
+        Assistant.downloads,
+        AssistantSummary
+    ).join(
+        AssistantSummary, AssistantSummary.assistant_id == Assistant.id
+    ).where(
         Assistant.user_id == current_user.id
-    ).order_by(Assistant.updated_at.desc()).all()
+    ).order_by(Assistant.updated_at.desc()))).all()
     
-    # Procesar los asistentes para incluir la metadata
     assistants = []
-    for assistant in db_assistants:
-        try:
-            yaml_data = yaml.safe_load(assistant.yaml_content)
-            
-            # Extraer fechas del historial
-            history = yaml_data.get('metadata', {}).get('history', [])
-            dates = extract_dates_from_history(history)
-            
-            # Extract tool display names
-            tools = []
-            tools_data = yaml_data.get('assistant_instructions', {}).get('tools', {})
-            
-            # Add command display names
-            for cmd_name, cmd_data in tools_data.get('commands', {}).items():
-                if isinstance(cmd_data, dict) and 'display_name' in cmd_data:
-                    tools.append({
-                        'name': cmd_data['display_name'],
-                        'type': 'command'
-                    })
-            
-            # Add option display names
-            for opt_name, opt_data in tools_data.get('options', {}).items():
-                if isinstance(opt_data, dict) and 'display_name' in opt_data:
-                    tools.append({
-                        'name': opt_data['display_name'],
-                        'type': 'option'
-                    })
-            
-            # Add decorator display names
-            for dec_name, dec_data in tools_data.get('decorators', {}).items():
-                if isinstance(dec_data, dict) and 'display_name' in dec_data:
-                    tools.append({
-                        'name': dec_data['display_name'],
-                        'type': 'decorator'
-                    })
-            
-            assistants.append({
-                'id': assistant.id,
-                'title': assistant.title,
-                'created_at': assistant.created_at,
-                'updated_at': assistant.updated_at,
-                'downloads': assistant.downloads,
-                'metadata': yaml_data.get('metadata', {}),
-                'yaml_content': assistant.yaml_content,
-                'tools': tools,
-                'creation_date': dates['creation_date'],
-                'last_update': dates['last_update']
-            })
-        except Exception as e:
-            logger.error(f"Error processing assistant {assistant.id}: {str(e)}")
-            continue
+    for row in rows:
+        assistant_dict = summary_card(row.AssistantSummary)
+        assistant_dict.update({
+            'id': row.id,
+            'title': row.title,
+            'created_at': row.created_at,
+            'updated_at': row.updated_at,
+            'downloads': row.downloads
+        })
+        assistants.append(assistant_dict)
     
     return templates.TemplateResponse(
         "pages/assistants/base.html",
@@ -96,16 +73,42 @@ async def list_assistants(
         }
     )
 
+def _build_detail_view(yaml_data: dict) -> dict:
+    """Campos de la vista de detalle que se obtienen del YAML"""
+    metadata = yaml_data.get('metadata', {})
+    description = metadata.get('description', {})
+    
+    # Extraer fechas del historial
+    history = metadata.get('history', [])
+    dates = extract_dates_from_history(history)
+    
+    # Extraer información de las herramientas
+    tools = yaml_data.get('tools', [])
+    tool_names = []
+    for tool in tools:
+        if isinstance(tool, dict) and 'name' in tool:
+            tool_names.append(tool['name'])
+        elif isinstance(tool, str):
+            tool_names.append(tool)
+    
+    return {
+        'author': metadata.get('author', {}).get('name'),
+        'summary': description.get('summary', ''),
+        'tools': tool_names,
+        # Extraer palabras clave
+        'keywords': metadata.get('keywords', []),
+        'creation_date': dates['creation_date'],
+        'last_update': dates['last_update']
+    }
+
 @router.get("/{assistant_id}", response_class=HTMLResponse)
 async def get_assistant(
     assistant_id: int,
     request: Request,
     db: Session = Depends(get_db),
-    session: Optional[str] = Cookie(None)
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Get a specific assistant by ID"""
-    current_user = get_current_user(db, session)
-    
     assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
     if not assistant:
         return templates.TemplateResponse(
@@ -122,29 +125,12 @@ async def get_assistant(
         )
     
     try:
-        yaml_data = yaml.safe_load(assistant.yaml_content)
-        metadata = yaml_data.get('metadata', {})
-        description = metadata.get('description', {})
-        
-        # Extraer fechas del historial
-        history = metadata.get('history', [])
-        dates = extract_dates_from_history(history)
-        
-        # Extraer información de las herramientas
-        tools = yaml_data.get('tools', [])
-        tool_names = []
-        for tool in tools:
-            if isinstance(tool, dict) and 'name' in tool:
-                tool_names.append(tool['name'])
-            elif isinstance(tool, str):
-                tool_names.append(tool)
+        # La vista derivada del YAML se calcula una vez por versión del documento
+        view = get_yaml_cache().get_derived(assistant, "detail_view", _build_detail_view)
         
-        # Extraer palabras clave
-        keywords = metadata.get('keywords', [])
-        
-        # Incrementar contador de visualizaciones
-        assistant.views += 1
-        db.commit()
+        # Incrementar contador de visualizaciones (se escribe en el siguiente volcado del buffer)
+        counters = get_counter_buffer()
+        counters.increment("views", assistant.id)
         
         # Obtener información del propietario
         owner = db.query(User).filter(User.id == assistant.user_id).first()
@@ -157,21 +143,22 @@ async def get_assistant(
                 "assistant": {
                     'id': assistant.id,
                     'title': assistant.title,
-                    'author': metadata.get('author', {}).get('name', assistant.created_by or 'Unknown'),
-                    'summary': description.get('summary', ''),
-                    'tools': tool_names,
-                    'keywords': keywords,
+                    'author': view['author'] or assistant.created_by or 'Unknown',
+                    'summary': view['summary'],
+                    'tools': view['tools'],
+                    'keywords': view['keywords'],
                     'is_public': assistant.is_public,
                     'created_at': assistant.created_at,
                     'updated_at': assistant.updated_at,
                     'created_by': assistant.created_by,
-                    'creation_date': dates['creation_date'],
-                    'last_update': dates['last_update'],
+                    'creation_date': view['creation_date'],
+                    'last_update': view['last_update'],
                     'yaml_content': assistant.yaml_content,
-                    'views': assistant.views,
-                    'downloads': assistant.downloads,
+                    'views': (assistant.views or 0) + counters.pending("views", assistant.id),
+                    'downloads': (assistant.downloads or 0) + counters.pending("downloads", assistant.id),
                     'forked_from': assistant.forked_from,
-                    'remixed_by': assistant.remixed_by.split(', ') if assistant.remixed_by else []
+                    'remix_count': assistant.remix_count or 0,
+                    'remixed_by': get_remixers(db, assistant.id)
                 },
                 "current_user": current_user,
                 "is_owner": is_owner,
@@ -185,16 +172,42 @@ async def get_assistant(
             {"request": request, "error_message": f"Error loading assistant: {str(e)}", "status_code": 500}
         )
 
+def get_visible_assistant(db: Session, assistant_id: int, current_user: Optional[User]) -> Assistant:
+    assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
+    if not assistant:
+        raise HTTPException(status_code=404, detail="Assistant not found")
+    if not assistant.is_public and not (current_user and assistant.user_id == current_user.id):
+        raise HTTPException(status_code=403, detail="You don't have permission to view this assistant")
+    return assistant
+
+@router.get("/{assistant_id}/lineage")
+async def get_assistant_lineage(
+    assistant_id: int,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """Assistants this one descends from, nearest first"""
+    assistant = get_visible_assistant(db, assistant_id, current_user)
+    ancestors = get_ancestors(db, assistant.id, current_user.id if current_user else None)
+    return {"id": assistant.id, "ancestors": ancestors}
+
+@router.get("/{assistant_id}/descendants")
+async def get_assistant_descendants(
+    assistant_id: int,
+    db: Session = Depends(get_db),
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    """Whole fork subtree of an assistant, with the depth of each node"""
+    assistant = get_visible_assistant(db, assistant_id, current_user)
+    descendants = get_descendants(db, assistant.id, current_user.id if current_user else None)
+    return {"id": assistant.id, "descendants": descendants}
+
 @router.get("/{assistant_id}/yaml")
 async def get_assistant_yaml(
     assistant_id: int,
-    request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
     assistant = db.query(Assistant).filter(
         Assistant.id == assistant_id,
         Assistant.user_id == current_user.id
@@ -209,7 +222,7 @@ async def get_assistant_yaml(
     
     # Parse the YAML to check if assistant_instructions exists
     try:
-        parsed_yaml = yaml.safe_load(assistant.yaml_content)
+        parsed_yaml = get_yaml_cache().get_document(assistant)
         logger.info(f"Parsed YAML for assistant {assistant_id}:")
         logger.info(f"Has assistant key: {('assistant' in parsed_yaml)}")
         logger.info(f"Has instructions key: {('instructions' in parsed_yaml.get('assistant', {}))}")
@@ -223,13 +236,9 @@ async def get_assistant_yaml(
 async def update_assistant_yaml(
     assistant_id: int,
     yaml_data: dict,
-    request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
     assistant = db.query(Assistant).filter(
         Assistant.id == assistant_id,
         Assistant.user_id == current_user.id
@@ -246,10 +255,11 @@ async def update_assistant_yaml(
             raise HTTPException(status_code=400, detail="No YAML content provided")
             
         # Intentar cargar el YAML para validarlo
-        yaml.safe_load(yaml_content)
+        parsed_yaml = yaml_codec.load(yaml_content)
         
         # Actualizar el asistente
         assistant.yaml_content = yaml_content
+        sync_assistant_summary(db, assistant, parsed_yaml)
         db.commit()
         
         return {"message": "YAML updated successfully"}
@@ -259,32 +269,21 @@ async def update_assistant_yaml(
 
 @router.get("/user/data")
 async def get_current_user_data(
-    request: Request,
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
     return {"username": current_user.username}
 
 @router.get("/defaults")
 async def get_defaults(
-    request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-
     try:
         defaults_manager = get_defaults_manager()
         defaults = defaults_manager.get_defaults()
         
         # Get license from settings
-        license_setting = db.query(Setting).filter(
-            Setting.category == "license",
-            Setting.key == "default_license"
-        ).first()
+        license_setting = get_settings_cache().get(db, "license", "default_license")
         
         if license_setting:
             defaults['license'] = license_setting.value
@@ -308,7 +307,7 @@ async def get_schema():
             schema_content = schema_file.read()
             
         # Convertir el YAML a un diccionario Python
-        schema_dict = yaml.safe_load(schema_content)
+        schema_dict = yaml_codec.load(schema_content)
         
         # Devolver el esquema como JSON
         return JSONResponse(content=schema_dict)
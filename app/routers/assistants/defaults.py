@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import PlainTextResponse
-import yaml
+from ...utils import yaml_codec
 import os
 from pathlib import Path
 from typing import Dict, Any
@@ -16,7 +16,7 @@ async def get_defaults():
         defaults = defaults_manager.load_defaults()
         
         # Convertir a formato YAML
-        yaml_content = yaml.safe_dump(defaults, default_flow_style=False, sort_keys=False)
+        yaml_content = yaml_codec.dump(defaults)
         
         return yaml_content
     except Exception as e:
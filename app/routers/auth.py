@@ -1,13 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, Response, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.templating import Jinja2Templates
 from ..database.database import get_db
+from ..database.async_database import get_async_db
 from ..database.models import User
 from ..schemas.auth import UserCreate, UserLogin, UserResponse
+from ..utils.user_cache import get_user_cache
+import asyncio
+import os
 import logging
 
 # Configuración
@@ -17,10 +24,23 @@ ACCESS_TOKEN_EXPIRE_DAYS = 7
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 templates = Jinja2Templates(directory="app/templates")
+# Coste de bcrypt (2^rounds iteraciones). Los hashes con otro coste se rehacen al iniciar sesión
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Hilos dedicados a bcrypt; con 0 se calcula en el propio event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
 pwd_context = CryptContext(
     schemes=["bcrypt"],
     deprecated="auto",
-    bcrypt__rounds=12  # Número de rondas de hashing
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_desired_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_desired_rounds=BCRYPT_ROUNDS
+)
+
+# bcrypt libera el GIL: un pool acotado evita bloquear el event loop sin saturar la CPU
+_password_executor = (
+    ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    if PASSWORD_HASH_WORKERS > 0 else None
 )
 
 logger = logging.getLogger(__name__)
@@ -32,6 +52,26 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+async def _run_password_task(func, *args):
+    if _password_executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+
+async def hash_password_async(password: str) -> str:
+    """get_password_hash() in the password thread pool"""
+    return await _run_password_task(pwd_context.hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() in the password thread pool"""
+    return await _run_password_task(pwd_context.verify, plain_password, hashed_password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the thread pool. When it is valid but was hashed with
+    another cost, also return the new hash to store.
+    """
+    return await _run_password_task(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
@@ -46,17 +86,51 @@ def get_current_user(db: Session, session: Optional[str] = None) -> Optional[Use
         username = payload.get("sub")
         if not username:
             return None
-        user = db.query(User).filter(User.username == username).first()
-        return user
+        # Caché con TTL: la mayoría de las peticiones no consultan la tabla users
+        return get_user_cache().get(db, username)
     except JWTError:
         return None
 
+def get_request_user(request: Request, db: Session) -> Optional[User]:
+    """
+    User of the session cookie, resolved at most once per request: later calls
+    reuse it. Without a cookie, or on a user cache hit, no query is made, and the
+    Session only checks out a connection on its first query.
+    """
+    if not hasattr(request.state, "current_user"):
+        request.state.current_user = get_current_user(db, request.cookies.get("session"))
+    return request.state.current_user
+
 def get_current_user_optional(
     request: Request,
     db: Session = Depends(get_db)
 ) -> Optional[User]:
-    session = request.cookies.get("session")
-    return get_current_user(db, session)
+    """Dependency with the current user, or None for anonymous requests"""
+    return get_request_user(request, db)
+
+def get_current_user_required(
+    request: Request,
+    db: Session = Depends(get_db)
+) -> User:
+    """Dependency with the current user; anonymous requests get a 401"""
+    user = get_request_user(request, db)
+    if not user:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return user
+
+async def get_request_user_async(request: Request, db: AsyncSession) -> Optional[User]:
+    """get_request_user() for routes on the async session"""
+    if not hasattr(request.state, "current_user"):
+        session = request.cookies.get("session")
+        request.state.current_user = await db.run_sync(get_current_user, session) if session else None
+    return request.state.current_user
+
+async def get_current_user_optional_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+) -> Optional[User]:
+    """get_current_user_optional() on the async session"""
+    return await get_request_user_async(request, db)
 
 # Rutas
 @router.get("/login")
@@ -74,36 +148,39 @@ async def register_page(request: Request):
     )
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     if user.password != user.password_confirm:
         raise HTTPException(status_code=400, detail="Passwords don't match")
     
-    if db.query(User).filter(User.username == user.username).first():
+    if (await db.execute(select(User.id).where(User.username == user.username))).first():
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    if db.query(User).filter(User.email == user.email).first():
+    if (await db.execute(select(User.id).where(User.email == user.email))).first():
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    is_first_user = db.query(User).first() is None
+    is_first_user = (await db.execute(select(User.id).limit(1))).first() is None
     
     db_user = User(
         username=user.username,
         email=user.email,
         full_name=user.full_name,
-        password_hash=get_password_hash(user.password),
+        password_hash=await hash_password_async(user.password),
         is_admin=is_first_user
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 @router.post("/login")
-async def login(user_data: UserLogin, response: Response, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == user_data.username).first()
-    if not user or not verify_password(user_data.password, user.password_hash):
+async def login(user_data: UserLogin, response: Response, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).where(User.username == user_data.username))).scalars().first()
+    valid, new_hash = (False, None)
+    if user:
+        valid, new_hash = await verify_and_update_password(user_data.password, user.password_hash)
+    if not valid:
         logger.info(f"Failed login attempt for username: {user_data.username}")
         # Usamos 200 para indicar que la petición se procesó correctamente,
         # aunque las credenciales sean inválidas
@@ -113,6 +190,11 @@ async def login(user_data: UserLogin, response: Response, db: Session = Depends(
         }
     
     logger.info(f"Successful login for user: {user_data.username}")
+    if new_hash:
+        # El hash tenía otro coste de bcrypt: se guarda con el actual
+        user.password_hash = new_hash
+        await db.commit()
+        get_user_cache().invalidate(user_id=user.id)
     token = create_access_token({"sub": user.username})
     response.set_cookie(
         key="session",
@@ -5,9 +5,9 @@ from pydantic import BaseModel
 
 from ..database.database import get_db
 from ..schemas.email import EmailSchema
-from ..utils.email_sender import send_email
-from .auth import get_current_user
-from ..database.models import User, Setting
+from ..utils.email_sender import send_email, get_mail_settings
+from .auth import get_request_user
+from ..database.models import User
 
 router = APIRouter(
     prefix="/api/email",
@@ -27,7 +27,7 @@ async def send_email_endpoint(
     Envía un email con los datos del usuario.
     Requiere estar autenticado y ser administrador.
     """
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -37,8 +37,7 @@ async def send_email_endpoint(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Obtener la configuración del sistema
-    settings = db.query(Setting).filter(Setting.category == "mail").all()
-    settings_dict = {s.key: s.get_value() for s in settings}
+    settings_dict = get_mail_settings(db)
     
     # Construir el email
     email = EmailSchema(
@@ -1,45 +1,32 @@
-from fastapi import APIRouter, Request, Depends, Query, Cookie
+from fastapi import APIRouter, Request, Depends, Query
 from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
 from fastapi.templating import Jinja2Templates
-from typing import List, Optional
-from sqlalchemy.orm import Session
-import yaml
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, asdict
+from urllib.parse import urlencode
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from sqlalchemy import func, text
+from sqlalchemy import false, select, text
 
-from ..database.database import get_db
-from ..database.models import Assistant, AssistantLike, User, UserAssistantCollection
+from ..database.async_database import get_async_db, run_in_session_thread
+from ..database.write_queue import get_write_queue
+from ..constants import ORDERED_EDUCATIONAL_LEVELS
+from ..database.models import Assistant, AssistantLike, AssistantSummary, User, UserAssistantCollection
 from ..utils.filters import datetime_filter
-from .auth import get_current_user, get_current_user_optional
-from ..utils.history_utils import extract_dates_from_history
+from .auth import get_current_user_optional_async
+from ..utils.search_index import search_filter, search_ranking, search_snippets
+from ..utils.assistant_summary import summary_card
+from ..utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_page
+from ..utils.facets import FACET_EDUCATIONAL_LEVEL, FACET_KEYWORD, FACET_LANGUAGE, facet_counts, facet_filter, normalize_facet_value
 
 router = APIRouter(prefix="/explore", tags=["explore"])
 
 templates = Jinja2Templates(directory="app/templates")
 templates.env.filters["datetime"] = datetime_filter
 
-# Define the ordered list of educational levels
-ORDERED_EDUCATIONAL_LEVELS = [
-    "Postgraduate Higher Education",
-    "Undergraduate Higher Education",
-    "Technical / Vocational Education",
-    "Upper Secondary Education",
-    "Lower Secondary Education",
-    "Primary Education",
-    "Pre-School / Early Childhood Education",
-    "Professional Development / Continuing Education",
-    "other"
-]
-
-# Mapping of possible variations to standardized names
-EDUCATIONAL_LEVEL_MAPPING = {
-    "Educación Universitaria": "Undergraduate Higher Education",
-    "Universidad": "Undergraduate Higher Education",
-    "University": "Undergraduate Higher Education",
-    "Higher Education": "Undergraduate Higher Education",
-    # Add more mappings as needed
-}
-
 def normalize_text(text: str) -> str:
     """Normaliza el texto para búsqueda insensible a mayúsculas/minúsculas y acentos"""
     if not isinstance(text, str):
@@ -57,148 +44,178 @@ def normalize_text(text: str) -> str:
         text = text.replace(acc, normal)
     return text
 
-@router.get("")  # Ruta base para /explore
-async def explore(
-    request: Request,
-    search: Optional[str] = None,
-    language: Optional[str] = None,
-    db: Session = Depends(get_db),
-    session: Optional[str] = Cookie(None)
-):
+# Modos de orden de /explore y la columna de la clave del cursor
+SORT_MODES = {
+    "newest": Assistant.created_at,
+    "liked": Assistant.likes,
+    "collected": Assistant.in_collections,
+    "downloaded": Assistant.downloads
+}
+RELEVANCE_SORT = "relevance"
+EXPLORE_PAGE_SIZE = 24
+EXPLORE_MAX_PAGE_SIZE = 100
+VIEWER_STATE_MAX_IDS = 200
+
+def _clean_param(value: Optional[str]) -> Optional[str]:
+    """The templates send the string 'None' for empty filters"""
+    if not value or value.lower() == "none":
+        return None
+    return value
+
+@dataclass
+class ExploreFilters:
+    """Filtros de /explore: búsqueda de texto y facetas"""
+    search: Optional[str] = None
+    language: Optional[str] = None
+    level: Optional[str] = None
+    keyword: Optional[str] = None
+    
+    @classmethod
+    def from_params(cls, search=None, language=None, level=None, keyword=None) -> "ExploreFilters":
+        return cls(_clean_param(search), _clean_param(language), _clean_param(level), _clean_param(keyword))
+    
+    def query_params(self) -> Dict[str, str]:
+        return {name: value for name, value in asdict(self).items() if value}
+    
+    def url(self, sort: Optional[str] = None, **changes) -> str:
+        """URL of /explore with these filters, some of them changed (None removes one)"""
+        params = self.query_params()
+        params.update(changes)
+        if sort:
+            params['sort'] = sort
+        params = {name: value for name, value in params.items() if value}
+        return f"/explore?{urlencode(params)}" if params else "/explore"
+
+def _resolve_sort(sort: Optional[str], search: Optional[str]) -> str:
+    if sort in SORT_MODES or (sort == RELEVANCE_SORT and search):
+        return sort
+    return RELEVANCE_SORT if search else "newest"
+
+def _apply_filters(query, filters: ExploreFilters, ranking=None):
     """
-    Explore page with search functionality
+    Restrict a query on assistants to the public ones matching the filters.
+    The search is applied with a MATCH subquery, or by joining the bm25
+    ranking subquery when the relevance order needs it.
     """
-    current_user = get_current_user(db, session) if session else None
-    
-    # Join with users table to ensure we only show assistants from existing users
-    query = db.query(Assistant).join(
+    query = query.join(
         User, Assistant.user_id == User.id
     ).filter(
         Assistant.is_public == True  # Only show public assistants
     )
+    if ranking is not None:
+        query = query.join(ranking, ranking.c.rowid == Assistant.id)
+    elif filters.search:
+        matching = search_filter(filters.search)
+        query = query.filter(Assistant.id.in_(matching) if matching is not None else false())
+    # Las facetas se filtran sobre el índice assistant_facets
+    for facet, value in ((FACET_LANGUAGE, filters.language),
+                         (FACET_EDUCATIONAL_LEVEL, filters.level),
+                         (FACET_KEYWORD, filters.keyword)):
+        if value:
+            query = query.filter(Assistant.id.in_(facet_filter(facet, value)))
+    return query
+
+def _card_from_row(row, snippet=None) -> dict:
+    assistant_dict = summary_card(row.AssistantSummary)
+    assistant_dict.update({
+        'id': row.id,
+        'user_id': row.user_id,
+        'in_collections': row.in_collections,
+        'likes': row.likes,
+        'downloads': row.downloads,
+        'created_at': row.created_at,
+        'updated_at': row.updated_at,
+        'snippet': snippet
+    })
+    return assistant_dict
+
+def get_explore_page(
+    db: Session,
+    filters: ExploreFilters,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = EXPLORE_PAGE_SIZE,
+    with_facets: bool = False
+) -> Dict[str, Any]:
+    """
+    Return one page of public assistant cards ('items'), the cursor of the next
+    page ('next_cursor', None on the last one), the sort mode actually applied
+    and, if requested, the facet counts of the whole filtered set.
+    Raises InvalidCursor if the cursor cannot be decoded.
+    """
+    sort = _resolve_sort(sort, filters.search)
     
-    if search and search.lower() != "none":
-        search_normalized = normalize_text(search)
-        # Usar la función lower() de SQL para hacer la búsqueda insensible a mayúsculas/minúsculas
-        query = query.filter(
-            func.lower(Assistant.yaml_content).like(f"%{search_normalized}%")
-        )
-    if language and language.lower() != "none":
-        query = query.filter(Assistant.yaml_content.ilike(f"%language: {language}%"))
-        
-    assistants = query.all()
+    # Búsqueda de texto completo sobre el índice FTS5: el orden por relevancia
+    # une el ranking bm25 de todas las coincidencias y pagina sobre él en SQL
+    ranking = search_ranking(filters.search) if sort == RELEVANCE_SORT else None
     
-    # Procesar el YAML de cada asistente
-    processed_assistants = []
-    found_educational_levels = set()
+    # Los datos de las tarjetas salen de assistant_summaries, sin leer el YAML
+    columns = [
+        Assistant.id,
+        Assistant.user_id,
+        Assistant.in_collections,
+        Assistant.likes,
+        Assistant.downloads,
+        Assistant.created_at,
+        Assistant.updated_at,
+        AssistantSummary
+    ]
+    if ranking is not None:
+        columns.append(ranking.c.rank)
+    query = _apply_filters(db.query(*columns).join(
+        AssistantSummary, AssistantSummary.assistant_id == Assistant.id
+    ), filters, ranking)
     
-    for assistant in assistants:
-        try:
-            yaml_data = yaml.safe_load(assistant.yaml_content)
-            metadata = yaml_data.get('metadata', {})
-            description = metadata.get('description', {})
-            author = metadata.get('author', {})
-            
-            # Get and standardize educational levels
-            raw_levels = description.get('educational_level', [])
-            if isinstance(raw_levels, str):
-                raw_levels = [raw_levels]
-            
-            # Map educational levels to standard format
-            educational_levels = []
-            for level in raw_levels:
-                standardized_level = EDUCATIONAL_LEVEL_MAPPING.get(level, level)
-                if standardized_level in ORDERED_EDUCATIONAL_LEVELS:
-                    educational_levels.append(standardized_level)
-                    found_educational_levels.add(standardized_level)
-            
-            # Extraer fechas del historial
-            history = metadata.get('history', [])
-            dates = extract_dates_from_history(history)
-            
-            assistant_dict = {
-                'id': assistant.id,
-                'user_id': assistant.user_id,
-                'metadata': metadata,
-                'description': description,
-                'title': description.get('title', 'Untitled'),
-                'summary': description.get('summary', ''),
-                'author': {
-                    'name': author.get('name', 'Unknown'),
-                    'role': author.get('role', ''),
-                    'organization': author.get('organization', '')
-                },
-                'educational_levels': educational_levels,
-                'keywords': description.get('keywords', []),
-                'coverage': description.get('coverage', ''),
-                'in_collections': assistant.in_collections,
-                'likes': assistant.likes,
-                'tools': [],
-                'created_at': assistant.created_at,
-                'updated_at': assistant.updated_at,
-                'creation_date': dates['creation_date'],
-                'last_update': dates['last_update']
-            }
-
-            # Extract tool display names
-            tools = yaml_data.get('assistant_instructions', {}).get('tools', {})
-            
-            # Add command display names
-            for cmd_name, cmd_data in tools.get('commands', {}).items():
-                if isinstance(cmd_data, dict) and 'display_name' in cmd_data:
-                    assistant_dict['tools'].append({
-                        'name': cmd_data['display_name'],
-                        'type': 'command'
-                    })
-            
-            # Add option display names
-            for opt_name, opt_data in tools.get('options', {}).items():
-                if isinstance(opt_data, dict) and 'display_name' in opt_data:
-                    assistant_dict['tools'].append({
-                        'name': opt_data['display_name'],
-                        'type': 'option'
-                    })
-                    
-            # Add decorator display names
-            for dec_name, dec_data in tools.get('decorators', {}).items():
-                if isinstance(dec_data, dict) and 'display_name' in dec_data:
-                    assistant_dict['tools'].append({
-                        'name': dec_data['display_name'],
-                        'type': 'decorator'
-                    })
-
-            processed_assistants.append(assistant_dict)
-        except Exception as e:
-            print(f"Error processing YAML for assistant {assistant.id}: {e}")
-            continue
+    if sort == RELEVANCE_SORT and ranking is None:
+        # Búsqueda sin términos: no hay coincidencias que ordenar
+        page, has_more = [], False
+    elif sort == RELEVANCE_SORT:
+        # bm25: menor es mejor, así que se pagina por (rank, id) ascendente
+        sort_column = ranking.c.rank
+        after = decode_cursor(cursor) if cursor else None
+        page, has_more = keyset_page(query, sort_column, Assistant.id, after, limit, descending=False)
+    else:
+        sort_column = SORT_MODES[sort]
+        after = decode_cursor(cursor, is_datetime=(sort == "newest")) if cursor else None
+        page, has_more = keyset_page(query, sort_column, Assistant.id, after, limit)
+    
+    snippets = search_snippets(db, filters.search, [row.id for row in page]) if filters.search else {}
+    
+    result = {
+        'items': [_card_from_row(row, snippets.get(row.id)) for row in page],
+        'next_cursor': encode_cursor(getattr(page[-1], sort_column.key), page[-1].id) if has_more else None,
+        'sort': sort
+    }
+    if with_facets:
+        # Recuentos sobre todas las coincidencias, no solo las de la página
+        matching_ids = _apply_filters(db.query(Assistant.id), filters)
+        result['facets'] = facet_counts(db, matching_ids.scalar_subquery())
+    return result
 
-    if search and search.lower() != "none":
-        search_terms = search.lower().split()
-        filtered_assistants = []
-        
-        for assistant in processed_assistants:
-            matches = False
-            search_text = (
-                assistant['title'].lower() + ' ' +
-                ' '.join(assistant['keywords']).lower() + ' ' +
-                assistant['author']['name'].lower() + ' ' +
-                assistant['author']['organization'].lower() + ' ' +
-                assistant['author']['role'].lower()
-            )
-            
-            # Un asistente coincide si contiene todos los términos de búsqueda
-            if all(term in search_text for term in search_terms):
-                matches = True
-            
-            if matches:
-                filtered_assistants.append(assistant)
-        
-        processed_assistants = filtered_assistants
+@router.get("")  # Ruta base para /explore
+async def explore(
+    request: Request,
+    search: Optional[str] = None,
+    language: Optional[str] = None,
+    level: Optional[str] = None,
+    keyword: Optional[str] = None,
+    sort: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[User] = Depends(get_current_user_optional_async)
+):
+    """
+    Explore page with search functionality and facet filters.
+    Only the first page is rendered; the rest is loaded from /explore/api/assistants
+    """
+    filters = ExploreFilters.from_params(search, language, level, keyword)
+    
+    page = await run_in_session_thread(get_explore_page, filters, sort, with_facets=True)
+    processed_assistants = page['items']
 
-    # Filter and order the educational levels
-    educational_levels_list = [level for level in ORDERED_EDUCATIONAL_LEVELS 
-                             if any(level in assistant.get('educational_levels', []) 
-                                   for assistant in processed_assistants)]
+    # Niveles de todo el resultado filtrado (facetas), no solo de la primera página
+    level_values = {facet['value'] for facet in page['facets'][FACET_EDUCATIONAL_LEVEL]}
+    educational_levels_list = [level for level in ORDERED_EDUCATIONAL_LEVELS
+                               if normalize_facet_value(level) in level_values]
 
     return templates.TemplateResponse(
         "pages/explore/explore.html",
@@ -206,109 +223,193 @@ async def explore(
             "request": request,
             "assistants": processed_assistants,
             "educational_levels": educational_levels_list,
-            "search": search if search and search.lower() != "none" else "",
-            "language": language if language and language.lower() != "none" else None,
+            "facets": page['facets'],
+            "filters": filters,
+            "search": filters.search or "",
+            "language": filters.language,
+            "sort": page['sort'],
+            "next_cursor": page['next_cursor'],
             "current_user": current_user
         }
     )
 
+@router.get("/api/assistants")
+async def explore_api(
+    search: Optional[str] = None,
+    language: Optional[str] = None,
+    level: Optional[str] = None,
+    keyword: Optional[str] = None,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(EXPLORE_PAGE_SIZE, ge=1, le=EXPLORE_MAX_PAGE_SIZE),
+    facets: bool = False,
+    html: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[User] = Depends(get_current_user_optional_async)
+):
+    """
+    One page of public assistants as JSON, for infinite scroll.
+    With facets=true the facet counts are included; with html=true every
+    item also carries its rendered card.
+    """
+    filters = ExploreFilters.from_params(search, language, level, keyword)
+    try:
+        page = await run_in_session_thread(get_explore_page, filters, sort, cursor, limit, with_facets=facets)
+    except InvalidCursor as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    
+    if html:
+        card_template = templates.get_template("pages/explore/_mini_card.html")
+        for card in page['items']:
+            card['html'] = card_template.render(assistant=card, current_user=current_user)
+    
+    return JSONResponse(content=jsonable_encoder(page))
+
+class ViewerStateRequest(BaseModel):
+    ids: List[int]
+
+def get_viewer_state(db: Session, user_id: int, assistant_ids: List[int]) -> Dict[int, Dict[str, bool]]:
+    """Like and collection flags of a user for several assistants, one query per relation"""
+    assistant_ids = list(set(assistant_ids))
+    liked = {row.assistant_id for row in db.query(AssistantLike.assistant_id).filter(
+        AssistantLike.user_id == user_id,
+        AssistantLike.assistant_id.in_(assistant_ids)
+    )}
+    collected = {row.assistant_id for row in db.query(UserAssistantCollection.assistant_id).filter(
+        UserAssistantCollection.user_id == user_id,
+        UserAssistantCollection.assistant_id.in_(assistant_ids)
+    )}
+    return {
+        assistant_id: {
+            'has_liked': assistant_id in liked,
+            'in_collection': assistant_id in collected
+        }
+        for assistant_id in assistant_ids
+    }
+
+@router.post("/viewer-state")
+async def viewer_state(
+    payload: ViewerStateRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[User] = Depends(get_current_user_optional_async)
+):
+    """
+    has_liked / in_collection of the current user for the cards shown on the grid.
+    Anonymous visitors get every flag set to false.
+    """
+    if len(payload.ids) > VIEWER_STATE_MAX_IDS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"At most {VIEWER_STATE_MAX_IDS} assistants per request"}
+        )
+    
+    if current_user and payload.ids:
+        states = await db.run_sync(get_viewer_state, current_user.id, payload.ids)
+    else:
+        states = {
+            assistant_id: {'has_liked': False, 'in_collection': False}
+            for assistant_id in set(payload.ids)
+        }
+    return {"states": {str(assistant_id): state for assistant_id, state in states.items()}}
+
 @router.get("/assistant/{assistant_id}")
 async def get_assistant_details(
     assistant_id: int,
-    db: Session = Depends(get_db),
-    session: Optional[str] = Cookie(None)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[User] = Depends(get_current_user_optional_async)
 ):
     """
     Get detailed information about an assistant for the modal view
     """
-    current_user = get_current_user(db, session) if session else None
-    
-    assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
-    if not assistant:
+    # Una sola consulta: el asistente, su resumen y los indicadores del usuario
+    viewer_id = current_user.id if current_user else None
+    row = (await db.execute(
+        select(
+            Assistant,
+            select(AssistantLike.id).where(
+                AssistantLike.assistant_id == Assistant.id,
+                AssistantLike.user_id == viewer_id
+            ).exists().label('has_liked'),
+            select(UserAssistantCollection.id).where(
+                UserAssistantCollection.assistant_id == Assistant.id,
+                UserAssistantCollection.user_id == viewer_id
+            ).exists().label('in_collection')
+        ).options(joinedload(Assistant.summary)).where(Assistant.id == assistant_id)
+    )).first()
+    if not row:
         return JSONResponse(status_code=404, content={"error": "Assistant not found"})
+    assistant = row.Assistant
     
     # Verify the assistant is public or the user is the owner
     if not assistant.is_public and (not current_user or assistant.user_id != current_user.id):
         return JSONResponse(status_code=403, content={"error": "You don't have permission to view this assistant"})
     
     try:
-        yaml_data = yaml.safe_load(assistant.yaml_content)
-        metadata = yaml_data.get('metadata', {})
-        description = metadata.get('description', {})
-        author = metadata.get('author', {})
-        
-        # Extraer fechas del historial
-        history = metadata.get('history', [])
-        dates = extract_dates_from_history(history)
-        
-        # Get educational levels
-        raw_levels = description.get('educational_level', [])
-        if isinstance(raw_levels, str):
-            raw_levels = [raw_levels]
-        
-        # Map educational levels to standard format
-        educational_levels = []
-        for level in raw_levels:
-            standardized_level = EDUCATIONAL_LEVEL_MAPPING.get(level, level)
-            if standardized_level in ORDERED_EDUCATIONAL_LEVELS:
-                educational_levels.append(standardized_level)
-        
-        # Check if the user has this assistant in their collection
-        in_collection = False
-        if current_user:
-            collection_entry = db.query(UserAssistantCollection).filter(
-                UserAssistantCollection.user_id == current_user.id,
-                UserAssistantCollection.assistant_id == assistant_id
-            ).first()
-            in_collection = collection_entry is not None
-        
-        # Check if the user has liked this assistant
-        has_liked = False
-        if current_user:
-            like_entry = db.query(AssistantLike).filter(
-                AssistantLike.user_id == current_user.id,
-                AssistantLike.assistant_id == assistant_id
-            ).first()
-            has_liked = like_entry is not None
+        summary = assistant.summary
+        if summary is None:
+            return JSONResponse(status_code=500, content={"error": "Assistant summary not available"})
         
         return {
             'id': assistant.id,
-            'title': description.get('title', 'Untitled'),
-            'summary': description.get('summary', ''),
+            'title': summary.title,
+            'summary': summary.summary or '',
             'author': {
-                'name': author.get('name', 'Unknown'),
-                'role': author.get('role', ''),
-                'organization': author.get('organization', '')
+                'name': summary.author_name or 'Unknown',
+                'role': summary.author_role or '',
+                'organization': summary.author_organization or ''
             },
-            'educational_levels': educational_levels,
-            'keywords': description.get('keywords', []),
-            'coverage': description.get('coverage', ''),
-            'in_collection': in_collection,
-            'has_liked': has_liked,
+            'educational_levels': summary.educational_levels or [],
+            'keywords': summary.keywords or [],
+            'coverage': summary.coverage or '',
+            'in_collection': bool(row.in_collection),
+            'has_liked': bool(row.has_liked),
             'likes': assistant.likes,
             'created_at': assistant.created_at,
             'updated_at': assistant.updated_at,
-            'creation_date': dates['creation_date'],
-            'last_update': dates['last_update'],
-            'history': history,
-            'metadata': {
-                'rights': metadata.get('rights', 'Not specified')
-            },
-            'yaml_content': assistant.yaml_content
+            'creation_date': summary.creation_date,
+            'last_update': summary.last_update,
+            'history': summary.history or [],
+            'rights': summary.rights or 'Not specified'
         }
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": f"Error processing assistant: {str(e)}"})
 
+def _add_to_collection(db: Session, user_id: int, assistant_id: int) -> Optional[int]:
+    """
+    Write operation of the WriteQueue: add an assistant to a collection.
+    Returns the new in_collections counter, or None if it was already there.
+    """
+    assistant = db.get(Assistant, assistant_id)
+    if assistant is None:
+        raise LookupError("Assistant not found")
+    
+    # Verificar si ya está en la colección
+    existing = db.execute(text("""
+        SELECT 1 FROM user_assistant_collections 
+        WHERE user_id = :user_id AND assistant_id = :assistant_id
+    """), {"user_id": user_id, "assistant_id": assistant_id}).fetchone()
+    if existing:
+        return None
+    
+    # Añadir a la colección
+    db.execute(text("""
+        INSERT INTO user_assistant_collections (user_id, assistant_id)
+        VALUES (:user_id, :assistant_id)
+    """), {"user_id": user_id, "assistant_id": assistant_id})
+    
+    # Incrementar el contador de in_collections
+    assistant.in_collections = (assistant.in_collections or 0) + 1
+    return assistant.in_collections
+
 @router.post("/assistant/{assistant_id}/add")
 async def add_assistant_to_collection(
     assistant_id: int,
-    db: Session = Depends(get_db),
-    session: Optional[str] = Cookie(None)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[User] = Depends(get_current_user_optional_async)
 ):
     """
     Add an assistant to the user's collection
     """
-    current_user = get_current_user(db, session)
     if not current_user:
         return JSONResponse(
             status_code=401,
@@ -316,7 +417,7 @@ async def add_assistant_to_collection(
         )
     
     # Obtener el asistente
-    assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
+    assistant = await db.get(Assistant, assistant_id)
     if not assistant:
         return JSONResponse(
             status_code=404,
@@ -331,66 +432,70 @@ async def add_assistant_to_collection(
         )
     
     try:
-        # Verificar si ya está en la colección
-        check_sql = text("""
-            SELECT 1 FROM user_assistant_collections 
-            WHERE user_id = :user_id AND assistant_id = :assistant_id
-        """)
-        existing = db.execute(
-            check_sql,
-            {"user_id": current_user.id, "assistant_id": assistant_id}
-        ).fetchone()
-        
-        if existing:
+        # La escritura se agrupa con las de otras peticiones en el hilo escritor
+        in_collections = await get_write_queue().submit(_add_to_collection, current_user.id, assistant_id)
+        if in_collections is None:
             return JSONResponse(
                 status_code=400,
                 content={"detail": "Assistant is already in your collection"}
             )
         
-        # Añadir a la colección
-        insert_sql = text("""
-            INSERT INTO user_assistant_collections (user_id, assistant_id)
-            VALUES (:user_id, :assistant_id)
-        """)
-        db.execute(
-            insert_sql,
-            {"user_id": current_user.id, "assistant_id": assistant_id}
-        )
-        
-        # Incrementar el contador de in_collections
-        assistant.in_collections = (assistant.in_collections or 0) + 1
-        db.commit()
-        
         return JSONResponse(
             status_code=200,
             content={
                 "message": "Assistant added to your collection successfully!",
-                "in_collections": assistant.in_collections
+                "in_collections": in_collections
             }
         )
         
+    except LookupError:
+        # Borrado mientras la escritura esperaba en la cola
+        return JSONResponse(
+            status_code=404,
+            content={"detail": "Assistant not found"}
+        )
     except Exception as e:
-        db.rollback()
         return JSONResponse(
             status_code=500,
             content={"detail": f"Error adding assistant to collection: {str(e)}"}
         )
 
+def _toggle_like(db: Session, user_id: int, assistant_id: int) -> Dict[str, Any]:
+    """Write operation of the WriteQueue: add the like of a user or remove it if present"""
+    assistant = db.get(Assistant, assistant_id)
+    if assistant is None:
+        raise LookupError("Assistant not found")
+    existing_like = db.query(AssistantLike).filter(
+        AssistantLike.user_id == user_id,
+        AssistantLike.assistant_id == assistant_id
+    ).first()
+    
+    if existing_like:
+        # Remove like
+        db.delete(existing_like)
+        assistant.likes = max(0, (assistant.likes or 1) - 1)
+        action = "removed"
+    else:
+        # Add new like
+        db.add(AssistantLike(user_id=user_id, assistant_id=assistant_id))
+        assistant.likes = (assistant.likes or 0) + 1
+        action = "added"
+    return {"likes": assistant.likes, "action": action}
+
 @router.post("/like/{assistant_id}")
 async def like_assistant(
     assistant_id: int,
-    db: Session = Depends(get_db),
-    session: Optional[str] = Cookie(None)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[User] = Depends(get_current_user_optional_async)
 ):
     """
     Toggle like status for an assistant. If already liked, remove the like.
     If not liked, add a new like.
     """
-    current_user = get_current_user(db, session)
     if not current_user:
         return JSONResponse(status_code=401, content={"error": "Authentication required"})
 
-    assistant = db.query(Assistant).filter(Assistant.id == assistant_id).first()
+    assistant = await db.get(Assistant, assistant_id)
     if not assistant:
         return JSONResponse(status_code=404, content={"error": "Assistant not found"})
 
@@ -401,35 +506,12 @@ async def like_assistant(
             content={"error": "You cannot like your own assistant"}
         )
 
-    # Check if user has already liked this assistant
-    existing_like = db.query(AssistantLike).filter(
-        AssistantLike.user_id == current_user.id,
-        AssistantLike.assistant_id == assistant_id
-    ).first()
-
     try:
-        if existing_like:
-            # Remove like
-            db.delete(existing_like)
-            assistant.likes = max(0, (assistant.likes or 1) - 1)
-            action = "removed"
-        else:
-            # Add new like
-            new_like = AssistantLike(
-                user_id=current_user.id,
-                assistant_id=assistant_id
-            )
-            db.add(new_like)
-            assistant.likes = (assistant.likes or 0) + 1
-            action = "added"
-
-        db.commit()
-        return JSONResponse(content={
-            "likes": assistant.likes,
-            "action": action
-        })
+        # The like is written by the single writer, batched with concurrent ones
+        return JSONResponse(content=await get_write_queue().submit(_toggle_like, current_user.id, assistant_id))
+    except LookupError:
+        return JSONResponse(status_code=404, content={"error": "Assistant not found"})
     except Exception as e:
-        db.rollback()
         return JSONResponse(
             status_code=500,
             content={"error": f"Error updating like: {str(e)}"}
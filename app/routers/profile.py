@@ -3,9 +3,14 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from fastapi.templating import Jinja2Templates
 from ..database.database import get_db
-from ..database.models import User, Assistant
+from ..database.models import User, Assistant, AssistantRemix
 from ..schemas.profile import UserProfileUpdate, UserPasswordUpdate
-from .auth import get_current_user, verify_password, get_password_hash
+from .auth import get_request_user, verify_password_async, hash_password_async
+from ..utils.assistant_summary import remove_assistant_summaries
+from ..database.blob_store import release_contents
+from ..database.revisions import remove_revisions
+from ..utils.remixes import remove_remixes
+from ..utils.user_cache import get_user_cache
 
 router = APIRouter(prefix="/profile", tags=["profile"])
 templates = Jinja2Templates(directory="app/templates")
@@ -14,7 +19,7 @@ def get_current_user_or_401(
     db: Session,
     request: Request
 ) -> User:
-    user = get_current_user(db, request.cookies.get("session"))
+    user = get_request_user(request, db)
     if not user:
         raise HTTPException(status_code=401, detail="Not authenticated")
     return user
@@ -63,6 +68,7 @@ async def update_profile(
         setattr(current_user, field, value)
     
     db.commit()
+    get_user_cache().invalidate(user_id=current_user.id)
     return {"message": "Profile updated successfully"}
 
 @router.put("/update-password")
@@ -73,14 +79,15 @@ async def update_password(
 ):
     current_user = get_current_user_or_401(db, request)
     
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    if not await verify_password_async(password_data.current_password, current_user.password_hash):
         raise HTTPException(status_code=400, detail="Invalid current password")
     
     if password_data.new_password != password_data.password_confirm:
         raise HTTPException(status_code=400, detail="Passwords don't match")
     
-    current_user.password_hash = get_password_hash(password_data.new_password)
+    current_user.password_hash = await hash_password_async(password_data.new_password)
     db.commit()
+    get_user_cache().invalidate(user_id=current_user.id)
     
     return {"message": "Password updated successfully"}
 
@@ -93,10 +100,19 @@ async def delete_own_account(
     
     try:
         # Delete user's assistants that haven't been forked
-        assistants_deleted = db.query(Assistant).filter(
+        owned_assistants = db.query(Assistant).filter(
             Assistant.user_id == current_user.id,
             Assistant.forked_from.is_(None)
-        ).delete(synchronize_session=False)
+        )
+        owned_ids = [row.id for row in owned_assistants.with_entities(Assistant.id)]
+        remove_assistant_summaries(db, owned_ids)
+        release_contents(db, owned_ids)
+        remove_revisions(db, owned_ids)
+        remove_remixes(db, owned_ids)
+        db.query(AssistantRemix).filter(
+            AssistantRemix.user_id == current_user.id
+        ).update({AssistantRemix.user_id: None}, synchronize_session=False)
+        assistants_deleted = owned_assistants.delete(synchronize_session=False)
         
         # Delete user's collections (entries in user_assistant_collections)
         result = db.execute(
@@ -108,6 +124,7 @@ async def delete_own_account(
         # Delete the user
         db.delete(current_user)
         db.commit()
+        get_user_cache().invalidate(user_id=current_user.id)
         
         return {
             "message": "Account deleted successfully",
@@ -3,18 +3,19 @@ from sqlalchemy.orm import Session
 from fastapi.templating import Jinja2Templates
 from ..database.database import get_db
 from ..database.models import Setting, User
-from ..schemas.settings import SettingUpdate, DefaultsUpdate, DefaultsResponse
-from .auth import get_current_user
+from ..schemas.settings import SettingUpdate, SettingsBatchUpdate, DefaultsUpdate, DefaultsResponse
+from .auth import get_current_user_required, get_request_user
 from ..utils.email_sender import send_email
 from ..schemas.email import EmailSchema
 from typing import List, Dict
 import logging
 from pydantic import BaseModel
 from ..utils.defaults_manager import get_defaults_manager
+from ..utils.settings_cache import get_settings_cache
 import json
 import httpx
 import openai
-import yaml
+from ..utils import yaml_codec
 
 logger = logging.getLogger(__name__)
 
@@ -46,7 +47,7 @@ async def settings_page(
     request: Request,
     db: Session = Depends(get_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -101,7 +102,7 @@ async def update_setting(
     request: Request,
     db: Session = Depends(get_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -112,6 +113,7 @@ async def update_setting(
     setting.is_encrypted = setting_data.is_encrypted
     setting.set_value(setting_data.value)
     db.commit()
+    get_settings_cache().invalidate()
     
     return {
         "id": setting.id,
@@ -121,13 +123,82 @@ async def update_setting(
         "is_encrypted": setting.is_encrypted
     }
 
+@router.put("/batch")
+async def update_settings_batch(
+    batch: SettingsBatchUpdate,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Update several settings, each by id or by category and key, in one transaction"""
+    current_user = get_request_user(request, db)
+    if not current_user or not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    if not batch.settings:
+        raise HTTPException(status_code=400, detail="No settings to update")
+    
+    # La tabla de ajustes es pequeña: una sola consulta resuelve todas las entradas
+    all_settings = db.query(Setting).all()
+    by_id = {setting.id: setting for setting in all_settings}
+    by_key = {(setting.category, setting.key): setting for setting in all_settings}
+    
+    targets = []
+    errors = []
+    for index, entry in enumerate(batch.settings):
+        if entry.id is not None:
+            label = str(entry.id)
+            setting = by_id.get(entry.id)
+            if setting and (entry.category not in (None, setting.category) or entry.key not in (None, setting.key)):
+                errors.append(f"Entry {index}: setting {label} is {setting.category}/{setting.key}")
+                continue
+        elif entry.category and entry.key:
+            label = f"{entry.category}/{entry.key}"
+            setting = by_key.get((entry.category, entry.key))
+        else:
+            errors.append(f"Entry {index}: an id or a category and key are required")
+            continue
+    
+        if setting is None:
+            errors.append(f"Entry {index}: setting {label} not found")
+        elif any(target is setting for target, _ in targets):
+            errors.append(f"Entry {index}: setting {label} appears more than once")
+        else:
+            targets.append((setting, entry))
+    
+    if errors:
+        raise HTTPException(status_code=400, detail="; ".join(errors))
+    
+    updated = []
+    try:
+        for setting, entry in targets:
+            # Los ajustes que no cambian no se vuelven a cifrar ni a escribir
+            if bool(setting.is_encrypted) != entry.is_encrypted or setting.get_value() != entry.value:
+                setting.is_encrypted = entry.is_encrypted
+                setting.set_value(entry.value)
+            # Antes del commit: después, cada atributo volvería a leer su fila
+            updated.append({
+                "id": setting.id,
+                "category": setting.category,
+                "key": setting.key,
+                "value": entry.value,
+                "is_encrypted": entry.is_encrypted
+            })
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error updating settings batch: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error updating settings")
+    
+    get_settings_cache().invalidate()
+    return updated
+
 @router.get("/get-value/{setting_id}")
 async def get_setting_value(
     setting_id: int,
     request: Request,
     db: Session = Depends(get_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -139,23 +210,20 @@ async def get_setting_value(
 
 @router.post("/test-email")
 async def test_email(request: Request, db: Session = Depends(get_db)):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    owner_email = db.query(Setting).filter(
-        Setting.category == "general",
-        Setting.key == "owner_email"
-    ).first()
+    owner_email = get_settings_cache().value(db, "general", "owner_email")
     
-    if not owner_email or not owner_email.get_value():
+    if not owner_email:
         raise HTTPException(
             status_code=400, 
             detail="Owner email not configured in settings"
         )
     
     email_data = EmailSchema(
-        to_email=owner_email.get_value(),
+        to_email=owner_email,
         subject="Test Email from ScolaIA Lounge",
         body_text="This is a test email to verify your email configuration."
     )
@@ -171,26 +239,21 @@ async def test_email(request: Request, db: Session = Depends(get_db)):
 
 @router.get("/theme")
 async def get_theme_settings(db: Session = Depends(get_db)):
-    theme_settings = db.query(Setting).filter(Setting.category == "theme").all()
+    theme_settings = get_settings_cache().category(db, "theme")
     return [
         {
-            "key": setting.key,
-            "value": setting.get_value()
+            "key": key,
+            "value": value
         }
-        for setting in theme_settings
+        for key, value in theme_settings.items()
     ]
 
 @router.get("/defaults")
 async def get_defaults(
-    request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
     """Get all default values for assistant creation"""
-    # Verificar autenticación
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
     # Obtener el defaults manager
     defaults_manager = get_defaults_manager()
     defaults = defaults_manager.load_defaults()
@@ -238,7 +301,7 @@ async def update_default(
     db: Session = Depends(get_db)
 ):
     """Update a specific default value"""
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -317,15 +380,9 @@ async def get_settings(db: Session = Depends(get_db)):
 async def get_ollama_url(db: Session = Depends(get_db)):
     """Get the complete Ollama URL with protocol"""
     try:
-        url = db.query(Setting).filter(
-            Setting.category == "ollama",
-            Setting.key == "ollama_url"
-        ).first()
-        
-        port = db.query(Setting).filter(
-            Setting.category == "ollama",
-            Setting.key == "ollama_port"
-        ).first()
+        settings = get_settings_cache()
+        url = settings.get(db, "ollama", "ollama_url")
+        port = settings.get(db, "ollama", "ollama_port")
         
         if not url or not port:
             raise HTTPException(status_code=404, detail="Ollama settings not found")
@@ -346,25 +403,15 @@ async def test_ollama(request: Request, db: Session = Depends(get_db)):
     """Test Ollama connection and functionality using native Ollama API"""
     try:
         # Verificar autenticación
-        current_user = get_current_user(db, request.cookies.get("session"))
+        current_user = get_request_user(request, db)
         if not current_user or not current_user.is_admin:
             raise HTTPException(status_code=403, detail="Not authorized")
         
         # Obtener configuración de Ollama
-        url = db.query(Setting).filter(
-            Setting.category == "ollama",
-            Setting.key == "ollama_url"
-        ).first()
-        
-        port = db.query(Setting).filter(
-            Setting.category == "ollama",
-            Setting.key == "ollama_port"
-        ).first()
-        
-        model = db.query(Setting).filter(
-            Setting.category == "ollama",
-            Setting.key == "ollama_model"
-        ).first()
+        settings = get_settings_cache()
+        url = settings.get(db, "ollama", "ollama_url")
+        port = settings.get(db, "ollama", "ollama_port")
+        model = settings.get(db, "ollama", "ollama_model")
         
         if not url or not port:
             raise HTTPException(status_code=404, detail="Ollama settings not found")
@@ -458,27 +505,19 @@ async def test_ollama(request: Request, db: Session = Depends(get_db)):
 
 @router.get("/general/default_ip_license")
 async def get_default_ip_license(
-    request: Request,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_required)
 ):
     """Get default IP license from settings"""
-    # Verificar autenticación
-    current_user = get_current_user(db, request.cookies.get("session"))
-    if not current_user:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    
     # Obtener la licencia por defecto de la base de datos
-    license_setting = db.query(Setting).filter(
-        Setting.category == "general",
-        Setting.key == "default_ip_license"
-    ).first()
+    license_setting = get_settings_cache().get(db, "general", "default_ip_license")
     
     if not license_setting:
         # Si no existe, usar valor por defecto
         return {"value": "CC By-Sa 4.0"}
     
     # Devolver el valor sin encriptar
-    return {"value": license_setting.get_value() if license_setting.is_encrypted else license_setting.value}
+    return {"value": license_setting.value}
 
 @router.post("/test-openai")
 async def test_openai(request: Request, db: Session = Depends(get_db)):
@@ -486,23 +525,20 @@ async def test_openai(request: Request, db: Session = Depends(get_db)):
     logger = logging.getLogger(__name__)
     try:
         # Verificar autenticación
-        current_user = get_current_user(db, request.cookies.get("session"))
+        current_user = get_request_user(request, db)
         if not current_user or not current_user.is_admin:
             logger.warning(f"Unauthorized test-openai attempt from user {current_user.username if current_user else 'anonymous'}")
             raise HTTPException(status_code=403, detail="Not authorized")
         
         # Obtener configuración de OpenAI
-        api_key = db.query(Setting).filter(
-            Setting.category == "openapi",
-            Setting.key == "openapi_apikey"
-        ).first()
+        api_key = get_settings_cache().get(db, "openapi", "openapi_apikey")
         
         if not api_key:
             logger.error("OpenAI API key setting not found in database")
             raise HTTPException(status_code=404, detail="OpenAI API key not found in settings")
             
         # Obtener el valor desencriptado de la API key
-        decrypted_key = api_key.get_value()
+        decrypted_key = api_key.value
         
         if not decrypted_key or decrypted_key == "<encrypted>" or decrypted_key == "enter here your 164 char OpenAI Project API key":
             logger.error("OpenAI API key not properly configured")
@@ -592,14 +628,14 @@ async def get_defaults_yaml(
     db: Session = Depends(get_db)
 ):
     """Get the defaults extracted from schema.yaml (for compatibility with existing code)"""
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
     try:
         defaults_manager = get_defaults_manager()
         defaults = defaults_manager.load_defaults()
-        content = yaml.safe_dump(defaults, default_flow_style=False, sort_keys=False)
+        content = yaml_codec.dump(defaults)
         return Response(content=content, media_type="text/plain")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -611,7 +647,7 @@ async def update_defaults_yaml(
     db: Session = Depends(get_db)
 ):
     """This endpoint is deprecated. Schema.yaml should be edited directly."""
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -626,27 +662,19 @@ async def get_default_llm(
     """Get the default LLM model and its specific model name from settings"""
     try:
         # Get default LLM setting
-        default_llm = db.query(Setting).filter(
-            Setting.category == "general",
-            Setting.key == "default_LLM"
-        ).first()
+        settings = get_settings_cache()
+        default_llm = settings.get(db, "general", "default_LLM")
         
         if not default_llm:
             raise HTTPException(status_code=404, detail="Default LLM setting not found")
             
         if default_llm.value.lower() == "local":
             # Get Ollama model
-            model = db.query(Setting).filter(
-                Setting.category == "ollama",
-                Setting.key == "ollama_model"
-            ).first()
+            model = settings.get(db, "ollama", "ollama_model")
             model_name = model.value if model else "Ollama"
         else:
             # Get OpenAI model
-            model = db.query(Setting).filter(
-                Setting.category == "openapi",
-                Setting.key == "openapi_model"
-            ).first()
+            model = settings.get(db, "openapi", "openapi_model")
             model_name = model.value if model else "OpenAI"
             
         return {
@@ -663,21 +691,18 @@ async def get_test_openai_command(request: Request, db: Session = Depends(get_db
     """Get a curl command to test OpenAI connection with current API key"""
     try:
         # Verificar autenticación
-        current_user = get_current_user(db, request.cookies.get("session"))
+        current_user = get_request_user(request, db)
         if not current_user or not current_user.is_admin:
             raise HTTPException(status_code=403, detail="Not authorized")
         
         # Obtener configuración de OpenAI
-        api_key = db.query(Setting).filter(
-            Setting.category == "openapi",
-            Setting.key == "openapi_apikey"
-        ).first()
+        api_key = get_settings_cache().get(db, "openapi", "openapi_apikey")
         
         if not api_key:
             raise HTTPException(status_code=404, detail="OpenAI API key not found in settings")
             
         # Obtener el valor desencriptado de la API key
-        decrypted_key = api_key.get_value()
+        decrypted_key = api_key.value
         
         if not decrypted_key or decrypted_key == "<encrypted>" or decrypted_key == "enter here your 164 char OpenAI Project API key":
             raise HTTPException(status_code=400, detail="Please configure your OpenAI API key first")
@@ -3,11 +3,12 @@ from fastapi.templating import Jinja2Templates
 from typing import Optional
 from sqlalchemy.orm import Session
 from ..database.database import get_db
-from ..database.models import User, Setting
+from ..database.models import User
 from ..schemas.users import UserList, UserAdminUpdate
 from ..schemas.email import EmailSchema
-from .auth import get_current_user, get_password_hash, verify_password
-from ..utils.email_sender import send_email
+from .auth import get_request_user, hash_password_async
+from ..utils.email_sender import send_email, get_mail_settings
+from ..utils.user_cache import get_user_cache
 from secrets import token_urlsafe
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -24,7 +25,7 @@ async def users_page(
     filter_by: str = None,
     db: Session = Depends(get_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -81,7 +82,7 @@ async def users_page(
 
 @router.get("/{user_id}")
 async def get_user(user_id: int, request: Request, db: Session = Depends(get_db)):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -93,8 +94,9 @@ async def get_user(user_id: int, request: Request, db: Session = Depends(get_db)
     temp_password = None
     if not user.password_hash:
         temp_password = token_urlsafe(12)  # 12 caracteres para mayor seguridad
-        user.password_hash = get_password_hash(temp_password)
+        user.password_hash = await hash_password_async(temp_password)
         db.commit()
+        get_user_cache().invalidate(user_id=user.id)
     
     user_data = UserList.from_orm(user)
     user_data_dict = user_data.dict()
@@ -110,7 +112,7 @@ async def update_user(
     request: Request,
     db: Session = Depends(get_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -124,7 +126,7 @@ async def update_user(
     
     # Update password if provided
     if user_data.password:
-        user.password_hash = get_password_hash(user_data.password)
+        user.password_hash = await hash_password_async(user_data.password)
     
     # Update other fields
     update_data = user_data.dict(exclude={'password'}, exclude_unset=True)
@@ -132,6 +134,7 @@ async def update_user(
         setattr(user, field, value)
     
     db.commit()
+    get_user_cache().invalidate(user_id=user.id)
     return UserList.from_orm(user)
 
 @router.post("/{user_id}/generate-password")
@@ -144,7 +147,7 @@ async def generate_new_password(
     Genera una nueva contraseña para el usuario y la envía por email.
     Requiere ser administrador.
     """
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -155,12 +158,12 @@ async def generate_new_password(
     
     # Generar nueva contraseña
     new_password = token_urlsafe(12)
-    user.password_hash = get_password_hash(new_password)
+    user.password_hash = await hash_password_async(new_password)
     db.commit()
+    get_user_cache().invalidate(user_id=user.id)
     
     # Enviar email con la nueva contraseña
-    settings = db.query(Setting).filter(Setting.category == "mail").all()
-    settings_dict = {s.key: s.get_value() for s in settings}
+    settings_dict = get_mail_settings(db)
     
     email = EmailSchema(
         to_email=user.email,
@@ -202,7 +205,7 @@ async def delete_user(
     request: Request,
     db: Session = Depends(get_db)
 ):
-    current_user = get_current_user(db, request.cookies.get("session"))
+    current_user = get_request_user(request, db)
     if not current_user or not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
     
@@ -215,4 +218,5 @@ async def delete_user(
     
     db.delete(user)
     db.commit()
+    get_user_cache().invalidate(user_id=user_id)
     return {"message": "User deleted successfully"}
@@ -1,10 +1,21 @@
 from pydantic import BaseModel, EmailStr, constr, Field
-from typing import Optional
+from typing import List, Optional
 
 class SettingUpdate(BaseModel):
     value: str
     is_encrypted: bool = False
 
+class SettingBatchEntry(BaseModel):
+    # Se identifica por id o por category + key
+    id: Optional[int] = None
+    category: Optional[str] = None
+    key: Optional[str] = None
+    value: str
+    is_encrypted: bool = False
+
+class SettingsBatchUpdate(BaseModel):
+    settings: List[SettingBatchEntry]
+
 class SettingResponse(BaseModel):
     id: int
     category: str
@@ -96,7 +96,7 @@ async function showAssistantDetails(assistantId) {
         if (data.updated_at) {
             safeSetText('modalLastUpdate', new Date(data.updated_at).toLocaleDateString());
         }
-        safeSetText('modalRights', data.metadata?.rights || 'Not specified');
+        safeSetText('modalRights', data.rights || 'Not specified');
 
         // Mostrar el modal
         const modal = new bootstrap.Modal(document.getElementById('assistantDetailsModal'));
@@ -145,6 +145,7 @@ async function addAssistantToCollection(assistantId, currentUserId) {
             }
         });
 
+        applyViewerState({ [assistantId]: { in_collection: true } });
         showNotification(data.message || "Assistant added to your collection! You can find it in 'My Collection'", 'success', 5000);
     } catch (error) {
         console.error('Error:', error);
@@ -181,6 +182,8 @@ async function likeAssistant(assistantId) {
             }
         });
 
+        applyViewerState({ [assistantId]: { has_liked: data.action === 'added' } });
+
         // Show success message
         const message = data.action === 'added' ? 'Like added successfully!' : 'Like removed successfully!';
         showNotification(message, 'success');
@@ -392,6 +395,122 @@ function initializeScrollButtons() {
     });
 }
 
+// Marca en las tarjetas si al usuario ya le gusta el asistente o lo tiene en su colección
+function applyViewerState(states) {
+    Object.entries(states).forEach(([assistantId, state]) => {
+        if ('has_liked' in state) {
+            document.querySelectorAll(`.like-btn[data-assistant-id="${assistantId}"]`).forEach(button => {
+                button.classList.toggle('active', state.has_liked);
+                button.innerHTML = `<i class="bi bi-heart-fill heart-icon me-1"></i>${state.has_liked ? 'Liked' : 'Like'}`;
+                button.dataset.viewerState = 'loaded';
+            });
+        }
+        if ('in_collection' in state) {
+            document.querySelectorAll(`.btn-add[data-assistant-id="${assistantId}"]`).forEach(button => {
+                button.classList.toggle('active', state.in_collection);
+                button.innerHTML = `<i class="bi bi-bookmark-star-fill me-1"></i>${state.in_collection ? 'Added' : 'Add'}`;
+            });
+        }
+    });
+}
+
+// Pide en una sola llamada el estado de todas las tarjetas que aún no lo tienen
+async function loadViewerState() {
+    const pending = document.querySelectorAll('.like-btn[data-assistant-id]:not([data-viewer-state])');
+    const ids = [...new Set(Array.from(pending).map(button => parseInt(button.dataset.assistantId, 10)))];
+    if (ids.length === 0) {
+        return;
+    }
+    pending.forEach(button => button.dataset.viewerState = 'loading');
+
+    try {
+        const response = await fetch('/explore/viewer-state', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ ids: ids })
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const data = await response.json();
+        applyViewerState(data.states);
+    } catch (error) {
+        console.error('Error loading like/collection state:', error);
+    }
+}
+
+// Carga la siguiente página de /explore y la añade a las secciones actuales
+async function loadMoreAssistants() {
+    const loadMore = document.getElementById('exploreLoadMore');
+    const assistantsContainer = document.getElementById('assistantsContainer');
+    if (!loadMore || !assistantsContainer || loadMore.dataset.loading === 'true') {
+        return;
+    }
+    loadMore.dataset.loading = 'true';
+
+    try {
+        // Mismos filtros (búsqueda y facetas) que la primera página
+        const params = new URLSearchParams(loadMore.dataset.filters || '');
+        params.set('cursor', loadMore.dataset.nextCursor);
+        params.set('sort', loadMore.dataset.sort);
+        params.set('html', 'true');
+
+        const response = await fetch(`/explore/api/assistants?${params.toString()}`);
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || `HTTP error! status: ${response.status}`);
+        }
+
+        // Las tarjetas nuevas se dejan en un contenedor temporal y se reagrupan
+        // todas según el campo de clasificación seleccionado
+        const staging = document.createElement('div');
+        staging.className = 'd-none';
+        data.items.forEach(item => {
+            const wrapper = document.createElement('div');
+            wrapper.className = 'col-md-6 col-lg-4';
+            wrapper.innerHTML = item.html;
+            staging.appendChild(wrapper);
+        });
+        assistantsContainer.appendChild(staging);
+        reclassifyAssistants();
+        loadViewerState();
+
+        if (data.next_cursor) {
+            loadMore.dataset.nextCursor = data.next_cursor;
+        } else {
+            loadMore.remove();
+        }
+    } catch (error) {
+        console.error('Error loading more assistants:', error);
+        showNotification(error.message, 'error');
+    } finally {
+        loadMore.dataset.loading = 'false';
+    }
+}
+
+// Scroll infinito: pide la siguiente página cuando el botón "Load more" se hace visible
+function initializeInfiniteScroll() {
+    const loadMore = document.getElementById('exploreLoadMore');
+    // explore.js se carga dos veces en la página de explorar
+    if (!loadMore || loadMore.dataset.observed === 'true' || !('IntersectionObserver' in window)) {
+        return;
+    }
+    loadMore.dataset.observed = 'true';
+
+    const observer = new IntersectionObserver(entries => {
+        if (!document.getElementById('exploreLoadMore')) {
+            observer.disconnect();
+            return;
+        }
+        if (entries.some(entry => entry.isIntersecting)) {
+            loadMoreAssistants();
+        }
+    }, { rootMargin: '400px' });
+    observer.observe(loadMore);
+}
+
 // Initialize all functionality when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
     // Add classification field change listener
@@ -402,4 +521,10 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Initialize scroll buttons
     initializeScrollButtons();
+    
+    // Initialize infinite scroll
+    initializeInfiniteScroll();
+    
+    // Like/collection state of the cards on the grid
+    loadViewerState();
 });
\ No newline at end of file
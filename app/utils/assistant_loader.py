@@ -1,9 +1,10 @@
 from pathlib import Path
 from typing import Optional
 from sqlalchemy.orm import Session
-import yaml
+from . import yaml_codec
 import jsonschema
 from ..database.models import Assistant, User
+from .assistant_summary import build_summary
 from datetime import datetime
 import logging
 
@@ -71,16 +72,10 @@ def create_assistant_from_yaml(
             if yaml_content.startswith('\ufeff'):
                 yaml_content = yaml_content[1:]
                 
-            try:
-                from ruamel.yaml import YAML
-                yaml_parser = YAML(typ='safe')
-                yaml_parser.preserve_quotes = True
-                assistant_data = yaml_parser.load(yaml_content)
-            except ImportError:
-                assistant_data = yaml.safe_load(yaml_content)
+            assistant_data = yaml_codec.load(yaml_content)
                 
             if not isinstance(assistant_data, dict):
-                raise yaml.YAMLError("YAML content must be a dictionary")
+                raise yaml_codec.YAMLError("YAML content must be a dictionary")
                 
             # Check for missing display_names before schema validation
             missing_display_names = validate_tools_structure(assistant_data)
@@ -90,7 +85,7 @@ def create_assistant_from_yaml(
                     logger.error(f"  - {msg}")
                 raise ValueError("Some commands/options are missing display_name field")
                 
-        except yaml.YAMLError as e:
+        except yaml_codec.YAMLError as e:
             if hasattr(e, 'problem_mark'):
                 mark = e.problem_mark
                 context = yaml_content.split('\n')
@@ -111,17 +106,7 @@ def create_assistant_from_yaml(
             assistant_data['metadata']['visibility']['is_public'] = True
             
         # Convert back to YAML with the added fields
-        try:
-            from ruamel.yaml import YAML
-            yaml_parser = YAML()
-            yaml_parser.preserve_quotes = True
-            yaml_parser.allow_unicode = True
-            from io import StringIO
-            stream = StringIO()
-            yaml_parser.dump(assistant_data, stream)
-            yaml_content = stream.getvalue()
-        except ImportError:
-            yaml_content = yaml.dump(assistant_data, default_flow_style=False, allow_unicode=True)
+        yaml_content = yaml_codec.dump(assistant_data)
             
         # Load and validate against schema
         schema_path = Path("schema.yaml")
@@ -129,7 +114,7 @@ def create_assistant_from_yaml(
             raise FileNotFoundError("Schema file not found")
             
         with schema_path.open() as f:
-            schema = yaml.safe_load(f)
+            schema = yaml_codec.load(f)
             
         # Validate against schema with detailed error handling
         try:
@@ -160,12 +145,13 @@ def create_assistant_from_yaml(
             downloads=0,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow(),
-            is_public=is_public
+            is_public=is_public,
+            summary=build_summary(assistant_data)
         )
         
         return assistant
         
-    except (yaml.YAMLError, jsonschema.exceptions.ValidationError) as e:
+    except (yaml_codec.YAMLError, jsonschema.exceptions.ValidationError) as e:
         logger.error(f"Validation error: {str(e)}")
         raise
     except Exception as e:
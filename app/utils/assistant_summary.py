@@ -0,0 +1,211 @@
+from typing import Dict, Any, Iterable, List, Optional
+from sqlalchemy.orm import Session, selectinload
+import argparse
+from . import yaml_codec
+import logging
+
+from ..constants import ORDERED_EDUCATIONAL_LEVELS, EDUCATIONAL_LEVEL_MAPPING
+from ..database.models import Assistant, AssistantSummary
+from .history_utils import extract_dates_from_history
+from .search_index import index_assistant, remove_from_index, rebuild_search_index
+from .facets import refresh_facets, remove_facets
+from .yaml_cache import get_yaml_cache
+
+logger = logging.getLogger(__name__)
+
+
+def as_text(value, default: Optional[str] = '') -> Optional[str]:
+    """
+    Text of a scalar YAML value. Unquoted dates and numbers load as date or int,
+    and a null as None, which the text columns must not store as such.
+    """
+    if value is None:
+        return default
+    return value if isinstance(value, str) else str(value)
+
+
+def as_json(value):
+    """Copy of a YAML value with every leaf that JSON cannot store turned into text"""
+    if isinstance(value, dict):
+        return {as_text(key): as_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [as_json(item) for item in value]
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+def as_dict(value) -> dict:
+    return value if isinstance(value, dict) else {}
+
+
+def as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def normalize_educational_levels(raw_levels) -> List[str]:
+    """Map educational levels to the standard names, dropping unknown ones"""
+    levels = []
+    for level in as_list(raw_levels):
+        if level is None:
+            continue
+        level = as_text(level)
+        standardized_level = EDUCATIONAL_LEVEL_MAPPING.get(level, level)
+        if standardized_level in ORDERED_EDUCATIONAL_LEVELS and standardized_level not in levels:
+            levels.append(standardized_level)
+    return levels
+
+
+def extract_tools(yaml_data: dict) -> List[Dict[str, str]]:
+    """Extract the display names of commands, options and decorators"""
+    tools = []
+    tools_data = as_dict(as_dict(yaml_data.get('assistant_instructions')).get('tools'))
+    for tool_type, type_name in (('commands', 'command'), ('options', 'option'), ('decorators', 'decorator')):
+        for tool_data in as_dict(tools_data.get(tool_type)).values():
+            if isinstance(tool_data, dict) and 'display_name' in tool_data:
+                tools.append({
+                    'name': as_text(tool_data['display_name']),
+                    'type': type_name
+                })
+    return tools
+
+
+def build_summary_fields(yaml_data: dict) -> Dict[str, Any]:
+    """Compute the summary columns of an assistant from its parsed YAML"""
+    if not isinstance(yaml_data, dict):
+        yaml_data = {}
+    metadata = as_dict(yaml_data.get('metadata'))
+    description = as_dict(metadata.get('description'))
+    author = as_dict(metadata.get('author'))
+
+    keywords = [as_text(keyword) for keyword in as_list(description.get('keywords')) if keyword is not None]
+
+    history = metadata.get('history') or []
+    if not isinstance(history, list):
+        history = []
+    history = as_json(history)
+    dates = extract_dates_from_history(history)
+
+    return {
+        'title': as_text(description.get('title'), 'Untitled'),
+        'summary': as_text(description.get('summary')),
+        'author_name': as_text(author.get('name'), 'Unknown'),
+        'author_role': as_text(author.get('role')),
+        'author_organization': as_text(author.get('organization')),
+        'coverage': as_text(description.get('coverage')),
+        'language': as_text(description.get('language') or metadata.get('language'), None),
+        'rights': as_text(metadata.get('rights'), None),
+        'keywords': keywords,
+        'educational_levels': normalize_educational_levels(description.get('educational_level')),
+        'tools': extract_tools(yaml_data),
+        'history': history,
+        'creation_date': dates['creation_date'],
+        'last_update': dates['last_update']
+    }
+
+
+def build_summary(yaml_data: dict) -> AssistantSummary:
+    """Create the summary row, with its facets, of a new assistant"""
+    summary = AssistantSummary(**build_summary_fields(yaml_data))
+    refresh_facets(summary)
+    return summary
+
+
+def sync_assistant_summary(db: Session, assistant: Assistant, yaml_data: Optional[dict] = None) -> AssistantSummary:
+    """
+    Refresh the summary row and the search index entry of an assistant.
+    Must be called on every write of yaml_content, before the commit.
+    """
+    if yaml_data is None:
+        try:
+            yaml_data = get_yaml_cache().get_document(assistant)
+        except yaml_codec.YAMLError as e:
+            logger.error(f"Error building summary for assistant {assistant.id}: {str(e)}")
+            yaml_data = {}
+
+    fields = build_summary_fields(yaml_data)
+    if assistant.summary is None:
+        assistant.summary = AssistantSummary(**fields)
+    else:
+        for field, value in fields.items():
+            setattr(assistant.summary, field, value)
+    refresh_facets(assistant.summary)
+
+    db.flush()
+    index_assistant(db, assistant)
+    get_yaml_cache().invalidate(assistant.id)
+    return assistant.summary
+
+
+def remove_assistant_summaries(db: Session, assistant_ids: Iterable[int]) -> None:
+    """Remove the summary, facet and index rows of assistants deleted in bulk"""
+    assistant_ids = list(assistant_ids)
+    if not assistant_ids:
+        return
+    remove_facets(db, assistant_ids)
+    db.query(AssistantSummary).filter(
+        AssistantSummary.assistant_id.in_(assistant_ids)
+    ).delete(synchronize_session=False)
+    remove_from_index(db, assistant_ids)
+    for assistant_id in assistant_ids:
+        get_yaml_cache().invalidate(assistant_id)
+
+
+def backfill_summaries(db: Session, rebuild: bool = False) -> int:
+    """
+    Compute the summary of every assistant that does not have one yet,
+    or of all of them when rebuild is True. Returns the number of rows written.
+    """
+    query = db.query(Assistant).options(selectinload(Assistant.blob))
+    if not rebuild:
+        query = query.outerjoin(AssistantSummary).filter(AssistantSummary.assistant_id.is_(None))
+
+    count = 0
+    for assistant in query.all():
+        sync_assistant_summary(db, assistant)
+        count += 1
+        if count % 200 == 0:
+            db.commit()
+    db.commit()
+    return count
+
+
+def summary_card(summary: AssistantSummary) -> Dict[str, Any]:
+    """Fields shared by every assistant card, taken from the summary row"""
+    return {
+        'title': summary.title,
+        'summary': summary.summary or '',
+        'author': {
+            'name': summary.author_name or 'Unknown',
+            'role': summary.author_role or '',
+            'organization': summary.author_organization or ''
+        },
+        'educational_levels': summary.educational_levels or [],
+        'keywords': summary.keywords or [],
+        'coverage': summary.coverage or '',
+        'tools': summary.tools or [],
+        'creation_date': summary.creation_date,
+        'last_update': summary.last_update,
+        'rights': summary.rights
+    }
+
+
+if __name__ == "__main__":
+    from ..database.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description='Backfill assistant summaries')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Recompute every summary and the search index, not only the missing ones')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        written = backfill_summaries(db, rebuild=args.rebuild)
+        print(f"✓ {written} assistant summaries written")
+        if args.rebuild:
+            indexed = rebuild_search_index(db)
+            print(f"✓ {indexed} assistants indexed for search")
+    finally:
+        db.close()
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from typing import Dict, Hashable, Optional, Set, Tuple
+from sqlalchemy import bindparam, func, update
+import asyncio
+import os
+import threading
+import logging
+
+from ..database.models import Assistant
+
+logger = logging.getLogger(__name__)
+
+# Contadores de Assistant que se acumulan en memoria antes de escribirse
+COUNTER_COLUMNS = ("downloads", "views")
+
+# Segundos entre dos escrituras y número de contadores pendientes que fuerza una escritura
+COUNTER_FLUSH_INTERVAL = float(os.getenv("COUNTER_FLUSH_INTERVAL", "5"))
+COUNTER_MAX_PENDING = int(os.getenv("COUNTER_MAX_PENDING", "1000"))
+
+
+class CounterBuffer:
+    """
+    Write-behind aggregator for the download and view counters of assistants.
+
+    Increments are added up in memory and written periodically, one
+    UPDATE ... SET column = column + :n per counter column, so a burst of
+    clicks on a popular assistant costs one write instead of one transaction each.
+    When max_pending counters pile up, run() is woken to write them early; the
+    routes that count never write themselves. Increments still pending when
+    the process dies are lost.
+
+    An increment made with counted_by (e.g. the user id) is counted once per
+    counter, assistant and counted_by until the next flush, so repeating a
+    request in a loop does not inflate the counter.
+    """
+
+    def __init__(self, max_pending: int = COUNTER_MAX_PENDING):
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[str, int], int] = defaultdict(int)
+        # Incrementos con counted_by ya contados desde el último volcado
+        self._counted: Set[Tuple[str, int, Hashable]] = set()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Bucle y evento de run(), para despertarlo desde cualquier hilo
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def increment(self, column: str, assistant_id: int, amount: int = 1,
+                  counted_by: Optional[Hashable] = None) -> bool:
+        """Add to a counter. Returns False if counted_by already counted it in this flush window"""
+        if column not in COUNTER_COLUMNS:
+            raise ValueError(f"Unknown counter: {column}")
+        with self._lock:
+            if counted_by is not None:
+                key = (column, assistant_id, counted_by)
+                if key in self._counted:
+                    return False
+                self._counted.add(key)
+            self._pending[(column, assistant_id)] += amount
+            full = max(len(self._pending), len(self._counted)) >= self.max_pending
+        if full:
+            self._request_flush()
+        return True
+
+    def _request_flush(self) -> None:
+        """Wake run() to write now; without run() (scripts) write here"""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            self.flush()
+            return
+        loop.call_soon_threadsafe(wakeup.set)
+
+    def pending(self, column: str, assistant_id: int) -> int:
+        """Increments not yet written, to add to the value read from the database"""
+        with self._lock:
+            return self._pending.get((column, assistant_id), 0)
+
+    def flush(self, bind=None) -> int:
+        """Write the pending increments. Returns the number of counters updated"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(int)
+                self._counted = set()
+            if not pending:
+                return 0
+
+            by_column = defaultdict(list)
+            for (column, assistant_id), amount in pending.items():
+                by_column[column].append({"row_id": assistant_id, "amount": amount})
+
+            if bind is None:
+                from ..database.database import engine
+                bind = engine
+            try:
+                with bind.begin() as connection:
+                    for column, params in by_column.items():
+                        counter = getattr(Assistant, column)
+                        # updated_at se conserva: identifica la versión del documento
+                        statement = update(Assistant.__table__).where(
+                            Assistant.id == bindparam("row_id")
+                        ).values({
+                            column: func.coalesce(counter, 0) + bindparam("amount"),
+                            "updated_at": Assistant.updated_at
+                        })
+                        connection.execute(statement, params)
+            except Exception as e:
+                # Devolver los incrementos al buffer para el siguiente intento
+                logger.error(f"Error flushing assistant counters: {str(e)}")
+                with self._lock:
+                    for key, amount in pending.items():
+                        self._pending[key] += amount
+                return 0
+            return len(pending)
+
+    async def run(self, interval: float = COUNTER_FLUSH_INTERVAL) -> None:
+        """Flush periodically, or early when too many counters are pending, until cancelled"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await asyncio.to_thread(self.flush)
+        finally:
+            self._loop = None
+            self._wakeup = None
+            self.flush()
+
+
+_counter_buffer: Optional[CounterBuffer] = None
+
+
+def get_counter_buffer() -> CounterBuffer:
+    """Get or create the CounterBuffer singleton"""
+    global _counter_buffer
+    if _counter_buffer is None:
+        _counter_buffer = CounterBuffer()
+    return _counter_buffer
@@ -0,0 +1,118 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+import argparse
+import asyncio
+import os
+import logging
+
+from ..database.models import Assistant, AssistantLike, AssistantRemix, UserAssistantCollection
+from ..database.write_queue import WriteQueue
+
+logger = logging.getLogger(__name__)
+
+# Contador de Assistant -> columna de la relación que lo define
+RECONCILED_COUNTERS = {
+    "likes": AssistantLike.assistant_id,
+    "in_collections": UserAssistantCollection.assistant_id,
+    "remix_count": AssistantRemix.source_id,
+}
+
+# Filas por lote de escritura y horas entre dos reconciliaciones automáticas (0 las desactiva)
+RECONCILE_BATCH_SIZE = 500
+COUNTER_RECONCILE_INTERVAL_HOURS = float(os.getenv("COUNTER_RECONCILE_INTERVAL_HOURS", "24"))
+
+
+def _reconcile_batch(db: Session, assistant_ids: List[int]) -> Dict[str, Tuple[int, int]]:
+    """
+    Recompute the counters of some assistants. Each UPDATE counts the relation
+    itself, so a like or collection change committed meanwhile is not
+    overwritten by a value read earlier. Returns, per counter, (rows fixed, drift).
+    """
+    table = Assistant.__table__
+    in_batch = table.c.id.in_(assistant_ids)
+    report = {}
+    for column, relation_id in RECONCILED_COUNTERS.items():
+        counter = table.c[column]
+        actual = select(func.count(relation_id)).where(relation_id == table.c.id).scalar_subquery()
+        differs = counter.is_distinct_from(actual)
+        drift = db.execute(
+            select(func.coalesce(func.sum(func.abs(actual - func.coalesce(counter, 0))), 0))
+            .where(in_batch, differs)
+        ).scalar()
+        # Sin tocar updated_at: un contador no cambia el documento
+        result = db.execute(
+            update(table).where(in_batch, differs).values({column: actual, "updated_at": table.c.updated_at})
+        )
+        report[column] = (result.rowcount, drift)
+    # Las operaciones siguientes de la misma sesión deben leer los valores corregidos
+    db.expire_all()
+    return report
+
+
+def reconcile_counters(db: Session, batch_size: int = RECONCILE_BATCH_SIZE,
+                       write_queue: Optional[WriteQueue] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Recompute the likes, in_collections and remix_count of every assistant from
+    their relations, batch_size assistants per transaction, and write only the
+    rows that differ. With a write_queue every batch runs on its writer thread,
+    serialized with the likes and collection changes of the routes.
+    Returns, per counter, the rows fixed and the total drift.
+    """
+    assistant_ids = [assistant_id for (assistant_id,) in db.query(Assistant.id).order_by(Assistant.id)]
+
+    report = {column: {"rows_fixed": 0, "drift": 0} for column in RECONCILED_COUNTERS}
+    for start in range(0, len(assistant_ids), batch_size):
+        batch = assistant_ids[start:start + batch_size]
+        if write_queue is not None:
+            batch_report = write_queue.submit_nowait(_reconcile_batch, batch).result()
+        else:
+            batch_report = _reconcile_batch(db, batch)
+            db.commit()
+        for column, (rows_fixed, drift) in batch_report.items():
+            report[column]["rows_fixed"] += rows_fixed
+            report[column]["drift"] += drift
+
+    for column, result in report.items():
+        if result["rows_fixed"]:
+            logger.info(f"Reconciled {column}: {result['rows_fixed']} assistants fixed, total drift {result['drift']}")
+    return report
+
+
+async def run_reconciliation(interval_hours: float = COUNTER_RECONCILE_INTERVAL_HOURS) -> None:
+    """Reconcile the counters periodically until cancelled"""
+    if interval_hours <= 0:
+        return
+    from ..database.database import SessionLocal
+    from ..database.write_queue import get_write_queue
+
+    def reconcile_once():
+        db = SessionLocal()
+        try:
+            return reconcile_counters(db, write_queue=get_write_queue())
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            await asyncio.to_thread(reconcile_once)
+        except Exception as e:
+            logger.error(f"Error reconciling assistant counters: {str(e)}")
+
+
+if __name__ == "__main__":
+    from ..database.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description='Recompute the likes, collections and remix counters of every assistant')
+    parser.add_argument('--batch-size', type=int, default=RECONCILE_BATCH_SIZE,
+                        help='Rows written per transaction')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = reconcile_counters(db, batch_size=args.batch_size)
+        for column, result in report.items():
+            print(f"✓ {column}: {result['rows_fixed']} assistants fixed, total drift {result['drift']}")
+    finally:
+        db.close()
@@ -1,5 +1,5 @@
 from pathlib import Path
-import yaml
+from . import yaml_codec
 from typing import Dict, Any, Optional
 from functools import lru_cache
 import os
@@ -20,7 +20,7 @@ class DefaultsManager:
         if not self._schema:
             try:
                 with self.schema_path.open('r') as f:
-                    self._schema = yaml.safe_load(f)
+                    self._schema = yaml_codec.load(f)
             except Exception as e:
                 print(f"Error loading schema from {self.schema_path}: {str(e)}")
                 raise
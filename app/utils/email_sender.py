@@ -3,13 +3,11 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from sqlalchemy.orm import Session
-from ..database.models import Setting
 from ..schemas.email import EmailSchema
+from .settings_cache import get_settings_cache
 
 def get_mail_settings(db: Session) -> Dict[str, str]:
-    settings = {}
-    mail_settings = db.query(Setting).filter(Setting.category == "mail").all()
-    return {setting.key: setting.get_value() for setting in mail_settings}
+    return get_settings_cache().category(db, "mail")
 
 async def send_email(db: Session, email_data: EmailSchema) -> Tuple[bool, str]:
     try:
@@ -25,12 +23,9 @@ async def send_email(db: Session, email_data: EmailSchema) -> Tuple[bool, str]:
         if not settings.get('smtp_password'):
             return False, "SMTP password not configured in settings"
             
-        owner_email = db.query(Setting).filter(
-            Setting.category == "general",
-            Setting.key == "owner_email"
-        ).first()
+        owner_email = get_settings_cache().value(db, "general", "owner_email")
         
-        if not owner_email or not owner_email.get_value():
+        if not owner_email:
             return False, "Owner email not configured in settings"
 
         msg = MIMEMultipart()
@@ -0,0 +1,111 @@
+from typing import Dict, List
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+import logging
+
+from ..constants import ORDERED_EDUCATIONAL_LEVELS
+from ..database.models import AssistantFacet, AssistantSummary
+
+logger = logging.getLogger(__name__)
+
+FACET_EDUCATIONAL_LEVEL = "educational_level"
+FACET_LANGUAGE = "language"
+FACET_KEYWORD = "keyword"
+
+# Número de palabras clave que se muestran como facetas
+KEYWORD_FACET_LIMIT = 20
+
+
+def normalize_facet_value(value) -> str:
+    """Values are compared case-insensitively and without surrounding spaces"""
+    return str(value).strip().lower()
+
+
+def build_facets(summary: AssistantSummary) -> List[AssistantFacet]:
+    """Compute the facet rows of an assistant from its summary"""
+    pairs = [(FACET_EDUCATIONAL_LEVEL, level) for level in summary.educational_levels or []]
+    if summary.language:
+        pairs.append((FACET_LANGUAGE, summary.language))
+    pairs.extend((FACET_KEYWORD, keyword) for keyword in summary.keywords or [])
+
+    facets = {}
+    for facet, label in pairs:
+        value = normalize_facet_value(label)
+        if value and (facet, value) not in facets:
+            facets[(facet, value)] = AssistantFacet(facet=facet, value=value, label=str(label).strip())
+    return list(facets.values())
+
+
+def refresh_facets(summary: AssistantSummary) -> None:
+    """
+    Bring the facet rows of a summary in line with its current fields.
+    Rows are updated in place so the unique (assistant, facet, value) constraint
+    never sees a delete and an insert of the same value in one flush.
+    """
+    wanted = {(f.facet, f.value): f for f in build_facets(summary)}
+    current = {(f.facet, f.value): f for f in summary.facets}
+    for key, facet in current.items():
+        if key in wanted:
+            facet.label = wanted[key].label
+        else:
+            summary.facets.remove(facet)
+    for key, facet in wanted.items():
+        if key not in current:
+            summary.facets.append(facet)
+
+
+def remove_facets(db: Session, assistant_ids: List[int]) -> None:
+    """Remove the facet rows of assistants deleted in bulk"""
+    db.query(AssistantFacet).filter(
+        AssistantFacet.assistant_id.in_(assistant_ids)
+    ).delete(synchronize_session=False)
+
+
+def rebuild_facets(db: Session) -> int:
+    """Recompute the facet rows of every summary. Returns the number of summaries processed"""
+    count = 0
+    for summary in db.query(AssistantSummary).all():
+        refresh_facets(summary)
+        count += 1
+        if count % 200 == 0:
+            db.commit()
+    db.commit()
+    return count
+
+
+def facet_filter(facet: str, value: str):
+    """Subquery of the assistant ids that have the given facet value, for Assistant.id.in_()"""
+    return select(AssistantFacet.assistant_id).where(
+        AssistantFacet.facet == facet,
+        AssistantFacet.value == normalize_facet_value(value)
+    )
+
+
+def facet_counts(db: Session, assistant_ids, keyword_limit: int = KEYWORD_FACET_LIMIT) -> Dict[str, List[dict]]:
+    """
+    Count the assistants of each facet value within a set of assistants, given
+    as a select of ids, with a single grouped query.
+    Levels follow the standard order; languages and keywords go by count.
+    """
+    rows = db.query(
+        AssistantFacet.facet,
+        AssistantFacet.value,
+        func.min(AssistantFacet.label).label('label'),
+        func.count(AssistantFacet.assistant_id).label('count')
+    ).filter(
+        AssistantFacet.assistant_id.in_(assistant_ids)
+    ).group_by(
+        AssistantFacet.facet, AssistantFacet.value
+    ).all()
+
+    counts = {FACET_EDUCATIONAL_LEVEL: [], FACET_LANGUAGE: [], FACET_KEYWORD: []}
+    for row in rows:
+        if row.facet in counts:
+            counts[row.facet].append({'value': row.value, 'label': row.label, 'count': row.count})
+
+    level_order = {normalize_facet_value(level): i for i, level in enumerate(ORDERED_EDUCATIONAL_LEVELS)}
+    counts[FACET_EDUCATIONAL_LEVEL].sort(key=lambda f: level_order.get(f['value'], len(level_order)))
+    counts[FACET_LANGUAGE].sort(key=lambda f: (-f['count'], f['value']))
+    counts[FACET_KEYWORD].sort(key=lambda f: (-f['count'], f['value']))
+    counts[FACET_KEYWORD] = counts[FACET_KEYWORD][:keyword_limit]
+    return counts
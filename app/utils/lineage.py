@@ -0,0 +1,99 @@
+"""
+Fork lineage of assistants.
+
+Assistant.forked_from makes a tree. Ancestors and descendants are read with a
+single recursive CTE over the indexed forked_from column, whatever the depth
+or width of the tree. forked_from can come from imported YAML, so the walk
+skips assistants already on the current path (cycles) and stops at LINEAGE_MAX_DEPTH.
+"""
+from typing import Dict, List, Optional
+from sqlalchemy import String, cast, func, literal, select
+from sqlalchemy.orm import Session, aliased
+import logging
+
+from ..database.models import Assistant, AssistantSummary, User
+
+logger = logging.getLogger(__name__)
+
+# Profundidad máxima recorrida en cualquiera de los dos sentidos
+LINEAGE_MAX_DEPTH = 100
+
+
+def _lineage_cte(assistant_id: int, ancestors: bool, max_depth: int):
+    start = select(
+        Assistant.id.label('id'),
+        Assistant.forked_from.label('parent_id'),
+        literal(0).label('depth'),
+        literal(f",{assistant_id},").label('path')
+    ).where(Assistant.id == assistant_id).cte('lineage', recursive=True)
+
+    step = aliased(Assistant)
+    if ancestors:
+        join_condition = step.id == start.c.parent_id
+    else:
+        join_condition = step.forked_from == start.c.id
+    step_key = ',' + cast(step.id, String) + ','
+    return start.union_all(
+        select(step.id, step.forked_from, start.c.depth + 1, start.c.path + cast(step.id, String) + ',')
+        .join(start, join_condition)
+        .where(start.c.depth < max_depth, func.instr(start.c.path, step_key) == 0)
+    )
+
+
+def _walk(db: Session, assistant_id: int, ancestors: bool, viewer_id: Optional[int],
+          max_depth: int) -> List[Dict]:
+    lineage = _lineage_cte(assistant_id, ancestors, max_depth)
+    rows = db.query(
+        lineage.c.id,
+        lineage.c.parent_id,
+        lineage.c.depth,
+        Assistant.is_public,
+        Assistant.user_id,
+        Assistant.created_at,
+        AssistantSummary.title,
+        User.username
+    ).join(
+        Assistant, Assistant.id == lineage.c.id
+    ).outerjoin(
+        AssistantSummary, AssistantSummary.assistant_id == Assistant.id
+    ).outerjoin(
+        User, User.id == Assistant.user_id
+    ).filter(
+        lineage.c.depth > 0
+    ).order_by(lineage.c.depth, lineage.c.id).all()
+
+    nodes = []
+    seen = set()
+    for row in rows:
+        # Un asistente puede llegar por varios caminos si los datos tienen un ciclo
+        if row.id in seen:
+            continue
+        seen.add(row.id)
+        visible = row.is_public or (viewer_id is not None and row.user_id == viewer_id)
+        nodes.append({
+            'id': row.id,
+            'parent_id': row.parent_id,
+            'depth': row.depth,
+            'title': row.title if visible else None,
+            'owner': row.username if visible else None,
+            'created_at': row.created_at.isoformat() if visible and row.created_at else None,
+            'is_public': bool(row.is_public)
+        })
+    if rows and rows[-1].depth >= max_depth:
+        logger.warning(f"Lineage of assistant {assistant_id} truncated at depth {max_depth}")
+    return nodes
+
+
+def get_ancestors(db: Session, assistant_id: int, viewer_id: Optional[int] = None,
+                  max_depth: int = LINEAGE_MAX_DEPTH) -> List[Dict]:
+    """Chain of assistants this one was forked from, nearest first"""
+    return _walk(db, assistant_id, True, viewer_id, max_depth)
+
+
+def get_descendants(db: Session, assistant_id: int, viewer_id: Optional[int] = None,
+                    max_depth: int = LINEAGE_MAX_DEPTH) -> List[Dict]:
+    """
+    Every assistant forked, directly or not, from this one, by depth.
+    Private assistants of other users keep their place in the tree without details.
+    """
+    return _walk(db, assistant_id, False, viewer_id, max_depth)
@@ -0,0 +1,53 @@
+from typing import Any, List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+import base64
+import binascii
+import json
+
+
+class InvalidCursor(ValueError):
+    """The cursor received from the client cannot be decoded"""
+
+
+def encode_cursor(sort_value: Any, row_id: int) -> str:
+    """Encode the (sort value, id) of the last row of a page as an opaque string"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, is_datetime: bool = False) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor()"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if is_datetime and sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError, binascii.Error) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_page(query: Query, sort_column, id_column, after: Optional[Tuple[Any, int]] = None,
+                limit: int = 24, descending: bool = True) -> Tuple[List[Any], bool]:
+    """
+    Fetch one page ordered by (sort_column, id_column), descending unless
+    descending=False, starting after the given (sort value, id). Returns the
+    rows and whether there are more.
+
+    Rows whose sort value is NULL are skipped: they cannot be compared against
+    a cursor (counters default to 0 and created_at to the insert time anyway).
+    """
+    query = query.filter(sort_column.isnot(None))
+    if after is not None:
+        key, last = tuple_(sort_column, id_column), tuple_(*after)
+        query = query.filter(key < last if descending else key > last)
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+    rows = query.limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
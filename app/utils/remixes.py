@@ -0,0 +1,101 @@
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+import logging
+
+from ..database.models import Assistant, AssistantRemix, User
+
+logger = logging.getLogger(__name__)
+
+# Número de usuarios que se muestran en la ficha de un asistente
+REMIXERS_LIMIT = 20
+
+
+def record_remix(db: Session, source_id: int, user_id: Optional[int], derived_id: Optional[int] = None) -> AssistantRemix:
+    """Record that a user derived an assistant from another one and bump its remix_count"""
+    remix = AssistantRemix(source_id=source_id, user_id=user_id, derived_id=derived_id)
+    db.add(remix)
+    # Incremento en SQL: no hace falta cargar el original ni reescribir nada más
+    db.execute(
+        update(Assistant).where(Assistant.id == source_id)
+        .values(remix_count=Assistant.remix_count + 1, updated_at=Assistant.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return remix
+
+
+def get_remixers(db: Session, source_id: int, limit: int = REMIXERS_LIMIT) -> List[str]:
+    """Usernames of the latest remixes of an assistant, newest first"""
+    rows = db.query(User.username).join(
+        AssistantRemix, AssistantRemix.user_id == User.id
+    ).filter(
+        AssistantRemix.source_id == source_id
+    ).order_by(AssistantRemix.created_at.desc(), AssistantRemix.id.desc()).limit(limit).all()
+    return [row.username for row in rows]
+
+
+def remove_remixes(db: Session, assistant_ids: Iterable[int]) -> None:
+    """Update the remix rows of assistants deleted in bulk"""
+    assistant_ids = list(assistant_ids)
+    if not assistant_ids:
+        return
+    db.query(AssistantRemix).filter(
+        AssistantRemix.source_id.in_(assistant_ids)
+    ).delete(synchronize_session=False)
+    db.query(AssistantRemix).filter(
+        AssistantRemix.derived_id.in_(assistant_ids)
+    ).update({AssistantRemix.derived_id: None}, synchronize_session=False)
+
+
+def parse_remixed_by(remixed_by: Optional[str]) -> List[str]:
+    """Usernames of a legacy remixed_by string ("alice, bob, alice, ")"""
+    return [name.strip() for name in (remixed_by or '').split(',') if name.strip()]
+
+
+def migrate_remixed_by(db: Session) -> int:
+    """
+    Move the legacy remixed_by strings into assistant_remixes. Each name is
+    matched, in order, with the assistants that user derived from the source.
+    Returns the number of assistants migrated.
+    """
+    sources = db.query(Assistant.id, Assistant.remixed_by, Assistant.created_at).filter(
+        Assistant.remixed_by.isnot(None)
+    ).all()
+    if not sources:
+        return 0
+
+    names = {name for source in sources for name in parse_remixed_by(source.remixed_by)}
+    users: Dict[str, int] = dict(db.query(User.username, User.id).filter(User.username.in_(names)).all()) if names else {}
+
+    for source in sources:
+        derived = db.query(Assistant.id, Assistant.user_id, Assistant.created_at).filter(
+            Assistant.forked_from == source.id
+        ).order_by(Assistant.created_at, Assistant.id).all()
+        unmatched = {}
+        for row in derived:
+            unmatched.setdefault(row.user_id, []).append(row)
+
+        count = 0
+        for name in parse_remixed_by(source.remixed_by):
+            user_id = users.get(name)
+            matches = unmatched.get(user_id, []) if user_id is not None else []
+            match = matches.pop(0) if matches else None
+            db.add(AssistantRemix(
+                source_id=source.id,
+                user_id=user_id,
+                derived_id=match.id if match else None,
+                created_at=match.created_at if match else source.created_at
+            ))
+            count += 1
+            if user_id is None:
+                logger.warning(f"Remix of assistant {source.id} by unknown user '{name}' kept without user")
+
+        db.execute(
+            update(Assistant).where(Assistant.id == source.id)
+            .values(remixed_by=None, remix_count=Assistant.remix_count + count,
+                    updated_at=Assistant.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return len(sources)
+
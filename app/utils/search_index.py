@@ -0,0 +1,151 @@
+from typing import Dict, List, Optional, Iterable
+from markupsafe import Markup, escape
+from sqlalchemy import Float, Integer, bindparam, column, text
+from sqlalchemy.orm import Session
+import logging
+
+from ..database.models import Assistant, AssistantSummary
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "assistants_fts"
+
+# Peso de cada columna en el ranking bm25: title, summary, keywords, author, tools
+COLUMN_WEIGHTS = (10.0, 4.0, 6.0, 2.0, 1.0)
+
+# Marcadores internos para el resaltado; se sustituyen por <mark> tras escapar el HTML
+_HIGHLIGHT_OPEN = "\x02"
+_HIGHLIGHT_CLOSE = "\x03"
+
+
+def create_search_index(connection) -> bool:
+    """Create the FTS5 table if needed. Returns True if it was just created"""
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": SEARCH_TABLE}
+    ).fetchone()
+    if exists:
+        return False
+
+    # remove_diacritics hace la búsqueda insensible a acentos, como normalize_text()
+    connection.execute(text(f"""
+        CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+            title, summary, keywords, author, tools,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """))
+    return True
+
+
+def extract_search_fields(summary: AssistantSummary) -> Dict[str, str]:
+    """Build the searchable text columns from the summary row of an assistant"""
+    author_parts = (summary.author_name, summary.author_organization, summary.author_role)
+    return {
+        "title": summary.title or '',
+        "summary": summary.summary or '',
+        "keywords": ' '.join(str(k) for k in summary.keywords or []),
+        "author": ' '.join(str(part) for part in author_parts if part),
+        "tools": ' '.join(str(tool['name']) for tool in summary.tools or [])
+    }
+
+
+def _write_index_row(db: Session, assistant_id: int, summary: AssistantSummary) -> None:
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": assistant_id})
+    db.execute(
+        text(f"""
+            INSERT INTO {SEARCH_TABLE} (rowid, title, summary, keywords, author, tools)
+            VALUES (:id, :title, :summary, :keywords, :author, :tools)
+        """),
+        {"id": assistant_id, **extract_search_fields(summary)}
+    )
+
+
+def index_assistant(db: Session, assistant: Assistant) -> None:
+    """Insert or replace the index row of an assistant from its summary"""
+    if assistant.summary is None:
+        logger.warning(f"Assistant {assistant.id} has no summary, skipping search index")
+        return
+    _write_index_row(db, assistant.id, assistant.summary)
+
+
+def remove_from_index(db: Session, assistant_ids: Iterable[int]) -> None:
+    """Remove one or more assistants from the index"""
+    for assistant_id in assistant_ids:
+        db.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": assistant_id})
+
+
+def rebuild_search_index(db: Session) -> int:
+    """Rebuild the whole index from the summaries table. Returns the number of rows indexed"""
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    count = 0
+    for summary in db.query(AssistantSummary).yield_per(200):
+        _write_index_row(db, summary.assistant_id, summary)
+        count += 1
+    db.commit()
+    return count
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """Convert free text into an FTS5 query: every term must match, as a prefix"""
+    terms = []
+    for term in search.split():
+        term = term.replace('"', '').strip()
+        if term:
+            terms.append(f'"{term}"*')
+    return ' '.join(terms) if terms else None
+
+
+def highlight_snippet(raw_snippet: Optional[str]) -> Markup:
+    """Escape a raw FTS snippet and turn the highlight markers into <mark> tags"""
+    if not raw_snippet:
+        return Markup('')
+    escaped = str(escape(raw_snippet))
+    return Markup(escaped.replace(_HIGHLIGHT_OPEN, '<mark>').replace(_HIGHLIGHT_CLOSE, '</mark>'))
+
+
+def search_filter(search: str):
+    """
+    Subquery of the ids of every assistant matching a search, for Assistant.id.in_(),
+    or None if the search has no terms.
+    """
+    match_query = build_match_query(search)
+    if not match_query:
+        return None
+    return text(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match_query"
+    ).bindparams(match_query=match_query).columns(column("rowid", Integer))
+
+
+def search_snippets(db: Session, search: str, assistant_ids: List[int]) -> Dict[int, Markup]:
+    """Highlighted snippets of a search for some assistants, e.g. one page of results"""
+    match_query = build_match_query(search)
+    if not match_query or not assistant_ids:
+        return {}
+    rows = db.execute(
+        text(f"""
+            SELECT rowid, snippet({SEARCH_TABLE}, -1, :open, :close, '…', 16)
+            FROM {SEARCH_TABLE}
+            WHERE {SEARCH_TABLE} MATCH :query AND rowid IN :ids
+        """).bindparams(bindparam("ids", expanding=True)),
+        {"query": match_query, "open": _HIGHLIGHT_OPEN, "close": _HIGHLIGHT_CLOSE, "ids": list(assistant_ids)}
+    ).fetchall()
+    return {row[0]: highlight_snippet(row[1]) for row in rows}
+
+
+def search_ranking(search: str):
+    """
+    Subquery of every assistant matching a search with its bm25 rank (lower is
+    better), to join on Assistant.id and page by (rank, id) in SQL. None if the
+    search has no terms.
+    """
+    match_query = build_match_query(search)
+    if not match_query:
+        return None
+    weights = ', '.join(str(w) for w in COLUMN_WEIGHTS)
+    return text(f"""
+        SELECT rowid, bm25({SEARCH_TABLE}, {weights}) AS rank
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH :match_query
+    """).bindparams(match_query=match_query).columns(
+        column("rowid", Integer), column("rank", Float)
+    ).subquery("search_ranking")
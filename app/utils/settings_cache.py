@@ -0,0 +1,116 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+import os
+import threading
+import time
+import logging
+
+from ..database.models import Setting
+
+logger = logging.getLogger(__name__)
+
+# Segundos que se reutilizan los ajustes leídos (los cambios de otros workers tardan como mucho esto)
+SETTINGS_CACHE_TTL = float(os.getenv("SETTINGS_CACHE_TTL", "60"))
+
+
+@dataclass(frozen=True)
+class SettingValue:
+    """Read-only copy of a Setting row with the value already decrypted"""
+    id: int
+    category: str
+    key: str
+    value: str
+    is_encrypted: bool
+
+
+class SettingsCache:
+    """
+    In-process cache of the settings table.
+
+    The first lookup reads every Setting row in one query and decrypts the
+    encrypted ones; later lookups are served from memory until the entry
+    expires or invalidate() is called. Routes that change a setting must call
+    invalidate() after the commit. Values that cannot be decrypted read as
+    "<encrypted>", as with Setting.get_value().
+    """
+
+    def __init__(self, ttl: float = SETTINGS_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: Optional[Dict[Tuple[str, str], SettingValue]] = None
+        self._expires_at = 0.0
+        # Una invalidación durante una carga descarta el resultado de esa carga
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def _load(self, db: Session) -> Dict[Tuple[str, str], SettingValue]:
+        now = time.monotonic()
+        with self._lock:
+            if self._entries is not None and self._expires_at > now:
+                self.hits += 1
+                return self._entries
+            self.loads += 1
+            generation = self._generation
+
+        entries = {
+            (setting.category, setting.key): SettingValue(
+                id=setting.id,
+                category=setting.category,
+                key=setting.key,
+                value=setting.get_value(),
+                is_encrypted=bool(setting.is_encrypted)
+            )
+            for setting in db.query(Setting).all()
+        }
+        with self._lock:
+            if generation == self._generation:
+                self._entries = entries
+                self._expires_at = now + self.ttl
+        return entries
+
+    def get(self, db: Session, category: str, key: str) -> Optional[SettingValue]:
+        """Return the setting category.key, or None if it does not exist"""
+        return self._load(db).get((category, key))
+
+    def value(self, db: Session, category: str, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Return the decrypted value of category.key, or default if it does not exist"""
+        setting = self.get(db, category, key)
+        return setting.value if setting is not None else default
+
+    def category(self, db: Session, category: str) -> Dict[str, str]:
+        """Return the decrypted values of a category by key"""
+        return {
+            setting.key: setting.value
+            for (setting_category, _), setting in self._load(db).items()
+            if setting_category == category
+        }
+
+    def invalidate(self) -> None:
+        """Drop the cached settings so the next lookup reads them again"""
+        with self._lock:
+            self._entries = None
+            self._generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries) if self._entries is not None else 0,
+                "hits": self.hits,
+                "loads": self.loads,
+                "invalidations": self.invalidations
+            }
+
+
+# Singleton instance
+_settings_cache = None
+
+def get_settings_cache() -> SettingsCache:
+    """Get or create the SettingsCache singleton"""
+    global _settings_cache
+    if _settings_cache is None:
+        _settings_cache = SettingsCache()
+    return _settings_cache
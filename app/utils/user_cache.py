@@ -0,0 +1,113 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.orm import Session, make_transient_to_detached
+import os
+import threading
+import time
+import logging
+
+from ..database.models import User
+
+logger = logging.getLogger(__name__)
+
+# Segundos que un usuario resuelto se reutiliza y número máximo de usuarios en memoria
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024"))
+
+
+class UserCache:
+    """
+    Bounded TTL cache of the user records behind session tokens, keyed by the
+    token subject (the username).
+
+    Entries are detached copies of the row; each lookup merges the copy into the
+    caller's session without a query, so the returned User can be modified or
+    deleted as usual. Routes that change or delete a user must call invalidate().
+    The cache is per process: with several workers a change is seen everywhere
+    after at most USER_CACHE_TTL seconds.
+    """
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _snapshot(user: User) -> User:
+        copy = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(copy)
+        return copy
+
+    def get(self, db: Session, username: str) -> Optional[User]:
+        """Return the user with this username, attached to db, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] <= now:
+                del self._entries[username]
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(username)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is not None:
+            return db.merge(entry[1], load=False)
+
+        user = db.query(User).filter(User.username == username).first()
+        if user is not None:
+            snapshot = self._snapshot(user)
+            with self._lock:
+                self._entries[username] = (now + self.ttl, snapshot)
+                self._entries.move_to_end(username)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return user
+
+    def invalidate(self, user_id: Optional[int] = None, username: Optional[str] = None) -> None:
+        """Drop a user, by id or by username, so the next request reads it again"""
+        with self._lock:
+            keys = [
+                key for key, (_, snapshot) in self._entries.items()
+                if key == username or (user_id is not None and snapshot.id == user_id)
+            ]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Singleton instance
+_user_cache = None
+
+def get_user_cache() -> UserCache:
+    """Get or create the UserCache singleton"""
+    global _user_cache
+    if _user_cache is None:
+        _user_cache = UserCache()
+    return _user_cache
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+from sqlalchemy import inspect
+import copy
+import os
+import threading
+from . import yaml_codec
+import logging
+
+from ..database.models import Assistant
+
+logger = logging.getLogger(__name__)
+
+# Límites de la caché: número de documentos y tamaño aproximado (bytes de YAML fuente)
+YAML_CACHE_MAX_ENTRIES = int(os.getenv("YAML_CACHE_MAX_ENTRIES", "1024"))
+YAML_CACHE_MAX_BYTES = int(os.getenv("YAML_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+class _Entry:
+    __slots__ = ("document", "derived", "size")
+
+    def __init__(self, document: dict, size: int):
+        self.document = document
+        self.derived: Dict[Hashable, Any] = {}
+        self.size = size
+
+
+class ParsedYamlCache:
+    """
+    Bounded LRU cache of parsed assistant documents and the views derived from them.
+
+    Entries are keyed by (assistant id, updated_at), so any save of an assistant
+    produces a new key and the old entry simply ages out. Memory is bounded by
+    the number of entries and by the total size of the source YAML.
+    """
+
+    def __init__(self, max_entries: int = YAML_CACHE_MAX_ENTRIES, max_bytes: int = YAML_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[int, Any], _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _cacheable(assistant: Assistant) -> bool:
+        # Solo objetos persistidos y sin un yaml_content pendiente de guardar:
+        # si no, (id, updated_at) todavía no identifica el contenido
+        if assistant.id is None or assistant.updated_at is None:
+            return False
+        state = inspect(assistant)
+        if state.transient or state.pending:
+            return False
+        return '_pending_content' not in assistant.__dict__
+
+    def _get_entry(self, assistant: Assistant) -> Optional[_Entry]:
+        key = (assistant.id, assistant.updated_at)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        content = assistant.yaml_content or ''
+        entry = _Entry(yaml_codec.load(content) or {}, len(content))
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._bytes += entry.size
+                self._evict()
+            return self._entries[key]
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.size
+            self.evictions += 1
+
+    def get_document(self, assistant: Assistant) -> dict:
+        """Return a private copy of the parsed YAML of an assistant, safe to modify"""
+        if not self._cacheable(assistant):
+            return yaml_codec.load(assistant.yaml_content or '') or {}
+        return copy.deepcopy(self._get_entry(assistant).document)
+
+    def get_derived(self, assistant: Assistant, name: Hashable, builder: Callable[[dict], Any]) -> Any:
+        """
+        Return a value computed from the parsed document, building it once per
+        document version. Callers must treat the result as read-only.
+        """
+        if not self._cacheable(assistant):
+            return builder(yaml_codec.load(assistant.yaml_content or '') or {})
+        entry = self._get_entry(assistant)
+        with self._lock:
+            if name in entry.derived:
+                return entry.derived[name]
+        value = builder(entry.document)
+        with self._lock:
+            entry.derived.setdefault(name, value)
+            return entry.derived[name]
+
+    def invalidate(self, assistant_id: int) -> None:
+        """Drop every cached version of an assistant"""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == assistant_id]:
+                self._bytes -= self._entries.pop(key).size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# Singleton instance
+_yaml_cache = None
+
+def get_yaml_cache() -> ParsedYamlCache:
+    """Get or create the ParsedYamlCache singleton"""
+    global _yaml_cache
+    if _yaml_cache is None:
+        _yaml_cache = ParsedYamlCache()
+    return _yaml_cache
@@ -0,0 +1,39 @@
+"""
+Single entry point for reading and writing YAML.
+
+Uses the libyaml C loader/dumper when PyYAML was built with it and falls back
+to the pure-Python classes otherwise. Every document written by the application
+goes through dump(), so assistants are always serialized with the same style.
+"""
+from typing import Any, Optional, IO, Union
+import yaml
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+    LIBYAML_AVAILABLE = True
+except ImportError:  # PyYAML sin libyaml
+    from yaml import SafeLoader, SafeDumper
+    LIBYAML_AVAILABLE = False
+    logger.info("libyaml not available, using the pure-Python YAML loader")
+
+YAMLError = yaml.YAMLError
+
+# Estilo canónico: bloques, unicode sin escapar y el orden de claves del documento
+DUMP_OPTIONS = {
+    "default_flow_style": False,
+    "allow_unicode": True,
+    "sort_keys": False,
+}
+
+
+def load(stream: Union[str, bytes, IO]) -> Any:
+    """Parse a YAML document with the safe loader"""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def dump(data: Any, stream: Optional[IO] = None) -> Optional[str]:
+    """Serialize data with the canonical style. Returns a str when no stream is given"""
+    return yaml.dump(data, stream, Dumper=SafeDumper, **DUMP_OPTIONS)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Load test of the explore API on the blocking and on the async database layer.
+
+Concurrent clients page through /explore/api/assistants, a share of them with
+a full text search and facet counts (the heavy queries), the rest asking for
+the plain first page. The app runs in-process (httpx ASGI transport,
+temporary SQLite database) and each client measures its own latency.
+
+"before" is the route as it was written on the blocking Session: the same
+get_explore_page() called on the event loop, mounted by this script as
+/bench/sync-explore. "after" is the real route, which resolves the user on the
+async session and runs get_explore_page() in a worker thread
+(run_in_session_thread()).
+
+With more clients than pooled connections the blocking variant deadlocks: a
+request waits for a connection on the event loop while the sessions holding
+them need the loop to close. Run --variants after alone to load it further.
+
+    python3 -m benchmarks.async_db_load_test [--clients 12] [--requests 25] [--variants before after]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import Depends
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import async_database, database
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_PATH = BASE_DIR / "sample_assistant.yaml.copy"
+HEAVY_QUERY = "?search=analysis&facets=true&limit=24"
+LIGHT_QUERY = "?limit=6"
+
+
+def setup_database(path: Path, assistants: int) -> None:
+    """Point both engines of the app at a temporary database and fill it"""
+    database.engine = create_engine(f"sqlite:///{path}")
+    database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=database.engine)
+    async_database.async_engine = async_database.create_async_db_engine(f"sqlite+aiosqlite:///{path}")
+    async_database.AsyncSessionLocal = async_database.async_sessionmaker(
+        async_database.async_engine, autoflush=False, expire_on_commit=False
+    )
+    database.init_db()
+
+    from app.database.models import Assistant, User
+    from app.utils.assistant_summary import sync_assistant_summary
+
+    db = database.SessionLocal()
+    try:
+        db.add(User(username="owner", email="owner@example.org", password_hash="-"))
+        db.flush()
+        sample = SAMPLE_PATH.read_text(encoding='utf-8')
+        for i in range(assistants):
+            # Documentos distintos: cada uno con su blob y su entrada en el índice
+            content = sample.replace("Minimal Text", f"Minimal Text {i}", 1)
+            assistant = Assistant(user_id=1, title=f"Assistant {i}", yaml_content=content, is_public=True)
+            db.add(assistant)
+            sync_assistant_summary(db, assistant)
+        db.commit()
+    finally:
+        db.close()
+
+
+def mount_sync_route(app) -> None:
+    """The pre-async route: get_explore_page() on a blocking Session, on the event loop"""
+    from app.routers.explore import ExploreFilters, get_explore_page
+
+    def get_sync_db():
+        db = database.SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/bench/sync-explore")
+    async def sync_explore(search: str = None, facets: bool = False, limit: int = 24,
+                           db: Session = Depends(get_sync_db)):
+        filters = ExploreFilters.from_params(search, None, None, None)
+        return jsonable_encoder(get_explore_page(db, filters, None, None, limit, with_facets=facets))
+
+
+def percentile(ordered, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def describe(latencies) -> str:
+    ordered = sorted(latencies)
+    return (f"p50 {statistics.median(ordered) * 1000:7.1f} ms   p95 {percentile(ordered, 0.95) * 1000:7.1f} ms   "
+            f"p99 {percentile(ordered, 0.99) * 1000:7.1f} ms")
+
+
+async def client_loop(client: httpx.AsyncClient, path: str, query: str, requests: int) -> list:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(path + query)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return latencies
+
+
+async def run_scenario(app, path: str, args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await client_loop(client, path, HEAVY_QUERY, 2)  # calentar cachés de SQLite y plantillas
+        heavy_clients = max(1, int(args.clients * args.heavy_share))
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            client_loop(client, path, HEAVY_QUERY if i < heavy_clients else LIGHT_QUERY, args.requests)
+            for i in range(args.clients)
+        ))
+        elapsed = time.perf_counter() - started
+    heavy = [latency for latencies in results[:heavy_clients] for latency in latencies]
+    light = [latency for latencies in results[heavy_clients:] for latency in latencies]
+    return heavy, light, elapsed
+
+
+async def main_async(args) -> None:
+    from app.main import app
+
+    mount_sync_route(app)
+    scenarios = {
+        "before": ("before: blocking Session", "/bench/sync-explore"),
+        "after": ("after: AsyncSession", "/explore/api/assistants"),
+    }
+    for label, path in (scenarios[variant] for variant in args.variants):
+        heavy, light, elapsed = await run_scenario(app, path, args)
+        total = len(heavy) + len(light)
+        print(f"\n=== {label} ({args.clients} clients, {total} requests) ===")
+        print(f"{'all':10} {describe(heavy + light)}")
+        print(f"{'search':10} {describe(heavy)}")
+        if light:
+            print(f"{'first page':10} {describe(light)}")
+        print(f"{'throughput':10} {total / elapsed:7.1f} req/s")
+    await async_database.async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the explore API before and after the async database layer')
+    parser.add_argument('--clients', type=int, default=12,
+                        help='Concurrent clients (the blocking variant stalls above the 15 pooled connections)')
+    parser.add_argument('--requests', type=int, default=25, help='Sequential requests per client')
+    parser.add_argument('--heavy-share', type=float, default=0.25,
+                        help='Share of clients running search with facets')
+    parser.add_argument('--assistants', type=int, default=600, help='Public assistants in the catalog')
+    parser.add_argument('--variants', nargs='+', choices=["before", "after"], default=["before", "after"],
+                        help='Variants to run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_database(Path(tmp) / "bench.db", args.assistants)
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark of /explore latency while logins are being processed.
+
+bcrypt takes hundreds of milliseconds per login; computed on the event loop
+it stalls every other request of the worker. This runs the app in-process
+(httpx ASGI transport, temporary SQLite database) and measures /explore
+latency alone, then with concurrent logins, hashing inline on the event loop
+and in the password thread pool.
+
+    python3 -m benchmarks.login_concurrency_bench [--logins 16] [--explore 40] [--workers 4]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import database
+from app.routers import auth
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_PATH = BASE_DIR / "sample_assistant.yaml.copy"
+PASSWORD = "benchmark-password"
+
+
+def setup_database(path: Path, users: int, assistants: int) -> None:
+    """Point the app at a temporary database and fill it"""
+    database.engine = create_engine(f"sqlite:///{path}")
+    database.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=database.engine)
+    database.init_db()
+
+    from app.database.models import Assistant, User
+    from app.utils.assistant_summary import sync_assistant_summary
+
+    db = database.SessionLocal()
+    try:
+        password_hash = auth.get_password_hash(PASSWORD)
+        for i in range(users):
+            db.add(User(username=f"user{i}", email=f"user{i}@example.org", password_hash=password_hash))
+        db.flush()
+        sample = SAMPLE_PATH.read_text(encoding='utf-8')
+        for i in range(assistants):
+            assistant = Assistant(user_id=1, title=f"Assistant {i}", yaml_content=sample, is_public=True)
+            db.add(assistant)
+            sync_assistant_summary(db, assistant)
+        db.commit()
+    finally:
+        db.close()
+
+
+def describe(latencies) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (f"p50 {statistics.median(ordered) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms   "
+            f"max {ordered[-1] * 1000:7.1f} ms")
+
+
+async def explore_loop(client: httpx.AsyncClient, requests: int) -> list:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get("/explore")
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return latencies
+
+
+async def login(client: httpx.AsyncClient, i: int) -> float:
+    start = time.perf_counter()
+    response = await client.post("/auth/login", json={"username": f"user{i}", "password": PASSWORD})
+    if not response.json().get("success"):
+        raise RuntimeError(f"Login failed for user{i}")
+    return time.perf_counter() - start
+
+
+async def run_scenario(app, logins: int, explore_requests: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            explore_loop(client, explore_requests),
+            *(login(client, i) for i in range(logins))
+        )
+        return results[0], list(results[1:]), time.perf_counter() - started
+
+
+async def main_async(args) -> None:
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await explore_loop(client, 3)  # calentar plantillas y cachés
+        baseline = await explore_loop(client, args.explore)
+    print(f"{'explore alone':28} {describe(baseline)}")
+
+    scenarios = [
+        ("inline on the event loop", None),
+        (f"thread pool ({args.workers} workers)", ThreadPoolExecutor(max_workers=args.workers)),
+    ]
+    for label, executor in scenarios:
+        auth._password_executor = executor
+        explore, logins, elapsed = await run_scenario(app, args.logins, args.explore)
+        print(f"\n=== {args.logins} concurrent logins, hashing {label} ===")
+        print(f"{'explore':28} {describe(explore)}")
+        print(f"{'login':28} {describe(logins)}")
+        print(f"{'wall time':28} {elapsed:7.2f} s")
+        if executor is not None:
+            executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /explore latency under concurrent logins')
+    parser.add_argument('--logins', type=int, default=16, help='Concurrent logins per scenario')
+    parser.add_argument('--explore', type=int, default=40, help='Sequential /explore requests per scenario')
+    parser.add_argument('--workers', type=int, default=auth.PASSWORD_HASH_WORKERS or 4,
+                        help='Threads of the password pool')
+    parser.add_argument('--assistants', type=int, default=48, help='Public assistants in the catalog')
+    args = parser.parse_args()
+
+    print(f"bcrypt rounds: {auth.BCRYPT_ROUNDS}")
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_database(Path(tmp) / "bench.db", args.logins, args.assistants)
+        asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark of the SQLite tuning profiles.
+
+Writer threads increment assistant counters, one short transaction each (like
+likes and downloads), while reader threads run catalog queries. Every profile
+of app.database.sqlite_tuning, plus the bare engine the app used before, runs
+on a fresh temporary database and reports throughput, p95 latency and the
+number of "database is locked" errors.
+
+    python3 -m benchmarks.sqlite_concurrency_bench [--writers 8] [--readers 4] [--seconds 5]
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.exc import OperationalError
+
+from app.database.models import Assistant, Base
+from app.database.sqlite_tuning import SQLITE_PROFILES, configure_sqlite_engine
+
+ASSISTANTS = 200
+
+
+def build_engine(path: Path, profile: str):
+    # "none" es el motor sin PRAGMAs que usaba la aplicación (solo el timeout de 5 s de sqlite3)
+    engine = create_engine(f"sqlite:///{path}")
+    if profile == "none":
+        return engine
+    configure_sqlite_engine(engine, SQLITE_PROFILES[profile])
+    return engine
+
+
+def seed(engine) -> None:
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Assistant.__table__.insert(), [
+            {"id": i, "title": f"Assistant {i}", "is_public": True, "likes": 0, "downloads": 0}
+            for i in range(1, ASSISTANTS + 1)
+        ])
+
+
+def writer(engine, stop: threading.Event, worker: int, results: dict) -> None:
+    i = worker
+    while not stop.is_set():
+        assistant_id = (i % ASSISTANTS) + 1
+        i += 7
+        start = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                connection.execute(
+                    update(Assistant.__table__).where(Assistant.id == assistant_id)
+                    .values(likes=Assistant.likes + 1)
+                )
+            results["write_latencies"].append(time.perf_counter() - start)
+        except OperationalError:
+            results["write_errors"] += 1
+
+
+def reader(engine, stop: threading.Event, results: dict) -> None:
+    query = select(Assistant.id, Assistant.title, Assistant.likes).where(
+        Assistant.is_public.is_(True)
+    ).order_by(Assistant.likes.desc(), Assistant.id.desc()).limit(24)
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                connection.execute(query).fetchall()
+                connection.execute(select(func.sum(Assistant.likes))).scalar()
+            results["read_latencies"].append(time.perf_counter() - start)
+        except OperationalError:
+            results["read_errors"] += 1
+
+
+def p95(latencies) -> float:
+    if not latencies:
+        return 0.0
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def run_profile(profile: str, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(Path(tmp) / "bench.db", profile)
+        seed(engine)
+        results = {"write_latencies": [], "read_latencies": [], "write_errors": 0, "read_errors": 0}
+        stop = threading.Event()
+        threads = [threading.Thread(target=writer, args=(engine, stop, w, results)) for w in range(args.writers)]
+        threads += [threading.Thread(target=reader, args=(engine, stop, results)) for _ in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        with engine.connect() as connection:
+            total_likes = connection.execute(select(func.sum(Assistant.likes))).scalar()
+        engine.dispose()
+
+    writes, reads = results["write_latencies"], results["read_latencies"]
+    print(f"{profile:11} writes {len(writes) / args.seconds:8.0f}/s  p95 {p95(writes) * 1000:7.1f} ms  "
+          f"errors {results['write_errors']:5}   reads {len(reads) / args.seconds:8.0f}/s  "
+          f"p95 {p95(reads) * 1000:7.1f} ms  errors {results['read_errors']:5}   "
+          f"likes written {total_likes}")
+    if writes:
+        print(f"{'':11} median write {statistics.median(writes) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent counter writes under each SQLite profile')
+    parser.add_argument('--writers', type=int, default=8, help='Writer threads')
+    parser.add_argument('--readers', type=int, default=4, help='Reader threads')
+    parser.add_argument('--seconds', type=float, default=5, help='Duration of each run')
+    parser.add_argument('--profiles', nargs='+', default=["none", *SQLITE_PROFILES],
+                        help='Profiles to compare ("none" is the engine without PRAGMAs)')
+    args = parser.parse_args()
+
+    for profile in args.profiles:
+        run_profile(profile, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark of like toggles written directly and through the single writer.
+
+Caller threads toggle likes, the write of POST /explore/like/{id}, as fast as
+they can on a fresh temporary database. "direct" runs each toggle in its own
+transaction, as the routes did; "queue" submits it to a WriteQueue and waits
+for the result, so concurrent toggles share one transaction. Reports
+throughput, p95 latency, "database is locked" errors and the average batch.
+
+    python3 -m benchmarks.write_queue_bench [--callers 16] [--seconds 5] [--profile production]
+"""
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Assistant, AssistantLike, Base, User
+from app.database.sqlite_tuning import SQLITE_PROFILES, configure_sqlite_engine
+from app.database.write_queue import WriteQueue
+from app.routers.explore import _toggle_like
+
+ASSISTANTS = 50
+
+
+def build_sessionmaker(path: Path, profile: str, callers: int):
+    engine = create_engine(f"sqlite:///{path}", pool_size=callers + 1)
+    configure_sqlite_engine(engine, SQLITE_PROFILES[profile])
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        # El usuario 1 es el autor; los que dan like son 2..callers+1
+        connection.execute(User.__table__.insert(), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.org", "password_hash": "-"}
+            for i in range(1, callers + 2)
+        ])
+        connection.execute(Assistant.__table__.insert(), [
+            {"id": i, "user_id": 1, "title": f"Assistant {i}", "is_public": True, "likes": 0}
+            for i in range(1, ASSISTANTS + 1)
+        ])
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def toggle_direct(session_factory, user_id: int, assistant_id: int):
+    db = session_factory()
+    try:
+        result = _toggle_like(db, user_id, assistant_id)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def caller(mode: str, session_factory, write_queue, stop: threading.Event, user_id: int, results: dict) -> None:
+    i = user_id
+    while not stop.is_set():
+        assistant_id = (i % ASSISTANTS) + 1
+        i += 3
+        start = time.perf_counter()
+        try:
+            if mode == "queue":
+                write_queue.submit_nowait(_toggle_like, user_id, assistant_id).result()
+            else:
+                toggle_direct(session_factory, user_id, assistant_id)
+            results["latencies"].append(time.perf_counter() - start)
+        except OperationalError:
+            results["errors"] += 1
+
+
+def p95(latencies) -> float:
+    if not latencies:
+        return 0.0
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def run_mode(mode: str, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, session_factory = build_sessionmaker(Path(tmp) / "bench.db", args.profile, args.callers)
+        write_queue = WriteQueue(session_factory=session_factory)
+        results = {"latencies": [], "errors": 0}
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=caller, args=(mode, session_factory, write_queue, stop, user_id, results))
+            for user_id in range(2, args.callers + 2)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        write_queue.stop()
+
+        # Los contadores deben coincidir con las filas de assistant_likes
+        with engine.connect() as connection:
+            counted = connection.execute(select(func.sum(Assistant.likes))).scalar()
+            rows = connection.execute(select(func.count(AssistantLike.id))).scalar()
+        engine.dispose()
+
+    latencies = results["latencies"]
+    batch = f"   average batch {write_queue.stats()['average_batch']:5.1f}" if mode == "queue" else ""
+    print(f"{mode:7} toggles {len(latencies) / args.seconds:8.0f}/s  p95 {p95(latencies) * 1000:7.1f} ms  "
+          f"errors {results['errors']:5}   counters {'match' if counted == rows else 'DRIFT'}{batch}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark like toggles with and without the single writer')
+    parser.add_argument('--callers', type=int, default=16, help='Concurrent caller threads')
+    parser.add_argument('--seconds', type=float, default=5, help='Duration of each run')
+    parser.add_argument('--profile', default="production", choices=list(SQLITE_PROFILES),
+                        help='SQLite profile of the engine')
+    args = parser.parse_args()
+
+    for mode in ("direct", "queue"):
+        run_mode(mode, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the YAML codec: parse and dump throughput of the libyaml
+classes used by app.utils.yaml_codec against the pure-Python ones.
+
+    python3 -m benchmarks.yaml_codec_bench [--repeat 5] [--commands 400]
+"""
+import argparse
+import copy
+import time
+from pathlib import Path
+
+import yaml
+
+from app.utils import yaml_codec
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SAMPLE_PATH = BASE_DIR / "sample_assistant.yaml.copy"
+
+
+def build_large_document(sample: dict, commands: int) -> dict:
+    """Grow the sample assistant with synthetic commands, options and history entries"""
+    document = copy.deepcopy(sample)
+    tools = document.setdefault('assistant_instructions', {}).setdefault('tools', {})
+    for i in range(commands):
+        tools.setdefault('commands', {})[f"/command_{i}"] = {
+            'display_name': f"Command {i}",
+            'description': f"Synthetic command number {i} with some descriptive text áéíóú.",
+            'internal_description': "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+        }
+        tools.setdefault('options', {})[f"/option_{i}"] = {
+            'display_name': f"Option {i}",
+            'description': f"Synthetic option number {i}.",
+            'internal_description': "Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua."
+        }
+    history = document.setdefault('metadata', {}).setdefault('history', [])
+    history.extend(f"2025-01-{(i % 28) + 1:02d} 10:00:00 - Update {i}" for i in range(commands))
+    return document
+
+
+def measure(func, repeat: int) -> float:
+    """Best wall time of repeat runs, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_document(name: str, document: dict, repeat: int) -> None:
+    text = yaml_codec.dump(document)
+    size_kb = len(text.encode('utf-8')) / 1024
+    print(f"\n=== {name} ({size_kb:.1f} KB) ===")
+
+    variants = [("pure-Python", yaml.SafeLoader, yaml.SafeDumper)]
+    if yaml_codec.LIBYAML_AVAILABLE:
+        variants.append(("libyaml", yaml.CSafeLoader, yaml.CSafeDumper))
+
+    results = {}
+    for label, loader, dumper in variants:
+        load_time = measure(lambda: yaml.load(text, Loader=loader), repeat)
+        dump_time = measure(lambda: yaml.dump(document, Dumper=dumper, **yaml_codec.DUMP_OPTIONS), repeat)
+        results[label] = (load_time, dump_time)
+        print(f"{label:12} parse: {load_time * 1000:8.2f} ms ({size_kb / load_time / 1024:6.2f} MB/s)"
+              f"   dump: {dump_time * 1000:8.2f} ms ({size_kb / dump_time / 1024:6.2f} MB/s)")
+
+    if len(results) == 2:
+        py_load, py_dump = results["pure-Python"]
+        c_load, c_dump = results["libyaml"]
+        print(f"{'speedup':12} parse: {py_load / c_load:7.1f}x{'':19}dump: {py_dump / c_dump:7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the YAML codec')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+    parser.add_argument('--commands', type=int, default=400, help='Synthetic commands in the large document')
+    args = parser.parse_args()
+
+    print(f"libyaml available: {yaml_codec.LIBYAML_AVAILABLE}")
+    sample = yaml_codec.load(SAMPLE_PATH.read_text(encoding='utf-8'))
+    bench_document("Sample assistant", sample, args.repeat)
+    bench_document("Large synthetic assistant", build_large_document(sample, args.commands), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Summary rows built from the YAML of an assistant.
+
+YAML turns unquoted dates and numbers into date and int objects and an empty
+value into null; the summary must store them as text, and its JSON columns
+must stay serialisable.
+"""
+import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Assistant, AssistantSummary, Base
+from app.utils import yaml_codec
+from app.utils.assistant_summary import build_summary, build_summary_fields
+
+DOCUMENT = """
+metadata:
+  description:
+    title:
+    summary: 2024
+    coverage: 2024-05-17
+    keywords: [algebra, 2024-05-17, 3, null]
+    educational_level: Primary
+  author:
+    name:
+    organization: 1984
+  rights: 2024-01-01
+  history:
+    - "Created by alice on 2024-05-17"
+    - revised: 2024-06-01
+      version: 2
+"""
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'summaries.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine, autoflush=False)() as session:
+        yield session
+    engine.dispose()
+
+
+def test_yaml_scalars_are_stored_as_text():
+    yaml_data = yaml_codec.load(DOCUMENT)
+    assert isinstance(yaml_data['metadata']['description']['coverage'], datetime.date)
+
+    fields = build_summary_fields(yaml_data)
+    assert fields['title'] == 'Untitled'
+    assert fields['author_name'] == 'Unknown'
+    assert (fields['summary'], fields['coverage'], fields['rights']) == ('2024', '2024-05-17', '2024-01-01')
+    assert fields['author_organization'] == '1984'
+    assert fields['author_role'] == ''
+    assert fields['language'] is None
+    assert fields['keywords'] == ['algebra', '2024-05-17', '3']
+    assert fields['history'] == ["Created by alice on 2024-05-17", {'revised': '2024-06-01', 'version': 2}]
+    assert fields['creation_date'] == '2024-05-17'
+
+
+def test_summary_with_dates_is_saved(db):
+    assistant = Assistant(user_id=1, title="Tutor")
+    assistant.summary = build_summary(yaml_codec.load(DOCUMENT))
+    db.add(assistant)
+    db.commit()
+    db.expire_all()
+
+    summary = db.get(AssistantSummary, assistant.id)
+    assert summary.coverage == '2024-05-17'
+    assert summary.history[1] == {'revised': '2024-06-01', 'version': 2}
+
+
+@pytest.mark.parametrize("document", ["", "just text", "metadata: [1, 2]", "metadata: {description: text}"])
+def test_malformed_documents_get_the_defaults(document):
+    fields = build_summary_fields(yaml_codec.load(document))
+    assert (fields['title'], fields['summary'], fields['keywords'], fields['tools']) == ('Untitled', '', [], [])
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Reference counts of the assistant blob store.
+
+Every assistant holds one reference to the blob of its content; a blob is
+deleted as soon as no assistant references it.
+"""
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database.blob_store import content_hash, release_contents
+from app.database.models import Assistant, AssistantBlob, Base, compress_content
+
+DOCUMENT = "metadata:\n  title: Tutor\n"
+EDITED = "metadata:\n  title: Tutor de física\n"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with sessionmaker(bind=engine, autoflush=False)() as session:
+        yield session
+
+
+def ref_counts(engine):
+    """ref_count of every stored blob, read outside the session"""
+    with engine.connect() as connection:
+        return dict(connection.execute(select(AssistantBlob.hash, AssistantBlob.ref_count)).all())
+
+
+def test_clone_update_and_delete(engine, db):
+    original = Assistant(user_id=1, title="Tutor", yaml_content=DOCUMENT)
+    db.add(original)
+    db.commit()
+    assert ref_counts(engine) == {content_hash(DOCUMENT): 1}
+
+    # Un clon sin cambios comparte el blob del original
+    clone = Assistant(user_id=2, title="Tutor", yaml_content=original.yaml_content, forked_from=original.id)
+    db.add(clone)
+    db.commit()
+    assert ref_counts(engine) == {content_hash(DOCUMENT): 2}
+
+    clone.yaml_content = EDITED
+    db.commit()
+    assert ref_counts(engine) == {content_hash(DOCUMENT): 1, content_hash(EDITED): 1}
+
+    # Guardar el mismo contenido otra vez no cambia nada
+    clone.yaml_content = EDITED
+    db.commit()
+    assert ref_counts(engine) == {content_hash(DOCUMENT): 1, content_hash(EDITED): 1}
+
+    db.delete(original)
+    db.commit()
+    assert ref_counts(engine) == {content_hash(EDITED): 1}
+    assert clone.yaml_content == EDITED
+
+
+def test_release_contents_in_bulk(engine, db):
+    assistants = [Assistant(user_id=1, title=str(i), yaml_content=DOCUMENT) for i in range(3)]
+    assistants.append(Assistant(user_id=1, title="other", yaml_content=EDITED))
+    db.add_all(assistants)
+    db.commit()
+    assert ref_counts(engine) == {content_hash(DOCUMENT): 3, content_hash(EDITED): 1}
+
+    # Como en el borrado de cuenta: se liberan las referencias y se borran las filas sin cargarlas
+    doomed = [assistants[0].id, assistants[1].id, assistants[3].id]
+    release_contents(db, doomed)
+    db.query(Assistant).filter(Assistant.id.in_(doomed)).delete(synchronize_session=False)
+    db.commit()
+    assert ref_counts(engine) == {content_hash(DOCUMENT): 1}
+
+    release_contents(db, [assistants[2].id])
+    db.query(Assistant).filter(Assistant.id == assistants[2].id).delete(synchronize_session=False)
+    db.commit()
+    assert ref_counts(engine) == {}
+
+
+def test_blob_inserted_by_another_writer(engine, db):
+    # Otro proceso guardó el mismo contenido justo antes: la fila ya existe
+    with engine.begin() as connection:
+        connection.execute(AssistantBlob.__table__.insert(), [{
+            "hash": content_hash(DOCUMENT),
+            "data": compress_content(DOCUMENT),
+            "size": len(DOCUMENT.encode('utf-8')),
+            "ref_count": 1
+        }])
+
+    assistant = Assistant(user_id=1, title="Tutor", yaml_content=DOCUMENT)
+    db.add(assistant)
+    db.commit()
+    assert ref_counts(engine) == {content_hash(DOCUMENT): 2}
+    assert assistant.yaml_content == DOCUMENT
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Write-behind download and view counters.
+
+A full buffer must not write on the caller, which is usually an async route:
+it wakes the background flush instead. A user downloading the same assistant
+again within one flush window counts once.
+"""
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database import async_database, database
+from app.database.models import Assistant, Base
+from app.database.write_queue import get_write_queue
+from app.main import app
+from app.utils.counter_buffer import CounterBuffer, get_counter_buffer
+from app.utils.settings_cache import get_settings_cache
+from app.utils.user_cache import get_user_cache
+
+PASSWORD = "password123"
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'counters.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Assistant.__table__.insert(), [{"id": 1, "user_id": 1}, {"id": 2, "user_id": 1}])
+    # run() escribe con el engine de la aplicación
+    monkeypatch.setattr(database, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def counters(engine, assistant_id):
+    with engine.connect() as connection:
+        return tuple(connection.execute(
+            select(Assistant.downloads, Assistant.views).where(Assistant.id == assistant_id)
+        ).one())
+
+
+def test_full_buffer_wakes_the_background_flush(engine):
+    buffer = CounterBuffer(max_pending=2)
+    flush_threads = []
+    flush = buffer.flush
+
+    def recording_flush(bind=None):
+        flush_threads.append(threading.current_thread())
+        return flush(bind)
+
+    buffer.flush = recording_flush
+
+    async def scenario():
+        task = asyncio.create_task(buffer.run(interval=60))
+        await asyncio.sleep(0)
+        buffer.increment("downloads", 1)
+        buffer.increment("views", 2)
+        # Lleno: el llamante no escribe, solo despierta a run()
+        assert buffer.pending("downloads", 1) == 1
+        for _ in range(200):
+            await asyncio.sleep(0.01)
+            if flush_threads:
+                break
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert flush_threads and flush_threads[0] is not threading.main_thread()
+    assert counters(engine, 1) == (1, 0)
+    assert counters(engine, 2) == (0, 1)
+
+
+def test_full_buffer_without_background_flush_writes_at_once(engine):
+    buffer = CounterBuffer(max_pending=2)
+    buffer.increment("downloads", 1)
+    assert counters(engine, 1) == (0, 0)
+    buffer.increment("downloads", 2)
+    assert counters(engine, 1) == (1, 0)
+    assert counters(engine, 2) == (1, 0)
+
+
+def test_counted_by_counts_once_per_flush_window(engine):
+    buffer = CounterBuffer(max_pending=100)
+    assert buffer.increment("downloads", 1, counted_by=7)
+    assert not buffer.increment("downloads", 1, counted_by=7)
+    assert buffer.increment("downloads", 1, counted_by=8)
+    assert buffer.increment("downloads", 2, counted_by=7)
+    assert buffer.increment("views", 1, counted_by=7)
+    assert buffer.pending("downloads", 1) == 2
+    buffer.flush()
+    assert counters(engine, 1) == (2, 1)
+    assert counters(engine, 2) == (1, 0)
+
+    # Tras el volcado empieza otra ventana
+    assert buffer.increment("downloads", 1, counted_by=7)
+    buffer.flush()
+    assert counters(engine, 1) == (3, 1)
+
+
+@pytest.fixture
+def clients(tmp_path):
+    """Clients of alice, bob and an anonymous one, and a public and a private assistant of alice"""
+    path = tmp_path / "app.db"
+    patch = pytest.MonkeyPatch()
+    engine = create_engine(f"sqlite:///{path}")
+    patch.setattr(database, "engine", engine)
+    patch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    async_engine = async_database.create_async_db_engine(f"sqlite+aiosqlite:///{path}")
+    patch.setattr(async_database, "async_engine", async_engine)
+    patch.setattr(async_database, "AsyncSessionLocal", async_database.async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    ))
+    database.init_db()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+
+    def login(username):
+        client = TestClient(app)
+        client.post("/auth/register", json={
+            "username": username, "email": f"{username}@example.org", "full_name": username,
+            "password": PASSWORD, "password_confirm": PASSWORD
+        })
+        assert client.post("/auth/login", json={"username": username, "password": PASSWORD}).json()["success"]
+        return client
+
+    alice, bob = login("alice"), login("bob")
+    with open("sample_assistant.yaml.copy", encoding="utf-8") as f:
+        sample = f.read()
+    public, private = (
+        alice.post("/assistants/create-from-template", json={"yaml_content": sample}).json()["assistant_id"]
+        for _ in range(2)
+    )
+    with engine.begin() as connection:
+        connection.execute(Assistant.__table__.update().where(Assistant.id == public).values(is_public=True))
+        connection.execute(Assistant.__table__.update().where(Assistant.id == private).values(is_public=False))
+    yield {"alice": alice, "bob": bob, "anonymous": TestClient(app), "public": public, "private": private}
+
+    get_write_queue().stop()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+    patch.undo()
+    async_engine.sync_engine.dispose()
+    engine.dispose()
+
+
+def test_downloads_count_once_per_user(clients):
+    buffer, public, private = get_counter_buffer(), clients["public"], clients["private"]
+    before = buffer.pending("downloads", public)
+
+    for _ in range(3):
+        assert clients["bob"].get(f"/assistants/assistant/{public}/download").status_code == 200
+        assert clients["bob"].post(f"/assistants/{public}/increment-downloads").status_code == 200
+    assert buffer.pending("downloads", public) == before + 1
+    assert clients["alice"].post(f"/assistants/{public}/increment-downloads").status_code == 200
+    assert buffer.pending("downloads", public) == before + 2
+
+    assert clients["anonymous"].post(f"/assistants/{public}/increment-downloads").status_code == 401
+    assert clients["anonymous"].get(f"/assistants/assistant/{public}/download").status_code == 401
+    assert clients["bob"].post(f"/assistants/{private}/increment-downloads").status_code == 403
+    assert clients["bob"].get(f"/assistants/assistant/{private}/download").status_code == 403
+    assert buffer.pending("downloads", public) == before + 2
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Counter reconciliation running while likes are toggled.
+
+The reconciler must never write back a count read before a like that was
+committed meanwhile.
+"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Assistant, AssistantLike, Base
+from app.database.write_queue import WriteQueue
+from app.routers.explore import _toggle_like
+from app.utils.counter_reconcile import reconcile_counters
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reconcile.db'}")
+    Base.metadata.create_all(engine)
+    # Asistente 1 de usuario 1, con 5 likes anotados y ninguno real
+    with engine.begin() as connection:
+        connection.execute(Assistant.__table__.insert(), [{"id": 1, "user_id": 1, "likes": 5}])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def SessionFactory(engine):
+    return sessionmaker(bind=engine, autoflush=False)
+
+
+def likes(engine):
+    with engine.connect() as connection:
+        stored = connection.execute(select(Assistant.likes).where(Assistant.id == 1)).scalar()
+        actual = connection.execute(select(func.count()).select_from(AssistantLike.__table__)).scalar()
+    return stored, actual
+
+
+def test_like_committed_during_reconcile_is_kept(engine, SessionFactory):
+    toggled = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def toggle_meanwhile(conn, cursor, statement, parameters, context, executemany):
+        # Justo antes de que el reconciliador escriba los likes, otro escritor confirma uno
+        if not toggled and statement.startswith("UPDATE assistants") and " likes=" in statement:
+            toggled.append(True)
+            with SessionFactory() as other:
+                _toggle_like(other, 2, 1)
+                other.commit()
+
+    with SessionFactory() as db:
+        report = reconcile_counters(db)
+    event.remove(engine, "before_cursor_execute", toggle_meanwhile)
+
+    assert toggled
+    assert likes(engine) == (1, 1)
+    assert report["likes"]["rows_fixed"] == 1
+
+
+def test_reconcile_through_write_queue_with_concurrent_toggles(engine, SessionFactory):
+    write_queue = WriteQueue(session_factory=SessionFactory)
+    reconciled = threading.Event()
+
+    def reconcile():
+        with SessionFactory() as db:
+            for _ in range(5):
+                reconcile_counters(db, batch_size=1, write_queue=write_queue)
+        reconciled.set()
+
+    thread = threading.Thread(target=reconcile)
+    thread.start()
+    toggles = [write_queue.submit_nowait(_toggle_like, user_id, 1) for user_id in range(2, 40)]
+    toggles += [write_queue.submit_nowait(_toggle_like, user_id, 1) for user_id in range(2, 40, 3)]
+    for toggle in toggles:
+        toggle.result(timeout=10)
+    thread.join(timeout=30)
+    write_queue.stop()
+
+    assert reconciled.is_set()
+    stored, actual = likes(engine)
+    assert actual == 38 - 13
+    assert stored == actual
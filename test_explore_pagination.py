@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Cursor pagination of /explore/api/assistants.
+
+Walking the pages of any sort mode must return every matching assistant
+exactly once, in order, also when many of them share the same sort value.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from app.database import async_database, database
+from app.database.models import Assistant, AssistantSummary, Base, User
+from app.database.write_queue import get_write_queue
+from app.main import app
+from app.routers.explore import ExploreFilters, get_explore_page
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.utils.search_index import create_search_index, rebuild_search_index
+from app.utils.settings_cache import get_settings_cache
+from app.utils.user_cache import get_user_cache
+
+PASSWORD = "password123"
+ASSISTANTS = 11
+PAGE_SIZE = 3
+
+
+@pytest.fixture(scope="module")
+def explore(tmp_path_factory):
+    """Anonymous client and the counters of eleven public assistants with repeated values"""
+    path = tmp_path_factory.mktemp("explore") / "explore.db"
+    patch = pytest.MonkeyPatch()
+    engine = create_engine(f"sqlite:///{path}")
+    patch.setattr(database, "engine", engine)
+    patch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    async_engine = async_database.create_async_db_engine(f"sqlite+aiosqlite:///{path}")
+    patch.setattr(async_database, "async_engine", async_engine)
+    patch.setattr(async_database, "AsyncSessionLocal", async_database.async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    ))
+    database.init_db()
+    get_settings_cache().invalidate()
+
+    author = TestClient(app)
+    author.post("/auth/register", json={
+        "username": "alice", "email": "alice@example.org", "full_name": "alice",
+        "password": PASSWORD, "password_confirm": PASSWORD
+    })
+    assert author.post("/auth/login", json={"username": "alice", "password": PASSWORD}).json()["success"]
+    with open("sample_assistant.yaml.copy", encoding="utf-8") as f:
+        sample = f.read()
+    ids = [
+        author.post("/assistants/create-from-template", json={"yaml_content": sample}).json()["assistant_id"]
+        for _ in range(ASSISTANTS)
+    ]
+
+    # Pocos valores distintos: casi todas las páginas cortan dentro de un empate
+    counters = {}
+    with engine.begin() as connection:
+        for i, assistant_id in enumerate(ids):
+            counters[assistant_id] = {
+                "created_at": datetime(2024, 1, 1 + i % 3),
+                "likes": i % 2,
+                "in_collections": i % 4,
+                "downloads": 7
+            }
+            connection.execute(
+                update(Assistant).where(Assistant.id == assistant_id).values(**counters[assistant_id])
+            )
+    yield {"client": TestClient(app), "counters": counters}
+
+    get_write_queue().stop()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+    patch.undo()
+    async_engine.sync_engine.dispose()
+    engine.dispose()
+
+
+def walk(client, **params):
+    """Ids of every page of a listing, following next_cursor"""
+    ids, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, limit=PAGE_SIZE, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/explore/api/assistants", params=query)
+        assert response.status_code == 200
+        page = response.json()
+        ids.extend(item["id"] for item in page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize("sort, column", [
+    ("newest", "created_at"),
+    ("liked", "likes"),
+    ("collected", "in_collections"),
+    ("downloaded", "downloads"),
+])
+def test_pages_cover_every_assistant_once(explore, sort, column):
+    counters = explore["counters"]
+    ids, pages = walk(explore["client"], sort=sort)
+    expected = sorted(counters, key=lambda assistant_id: (counters[assistant_id][column], assistant_id), reverse=True)
+    assert ids == expected
+    assert pages == -(-ASSISTANTS // PAGE_SIZE)
+
+
+@pytest.mark.parametrize("sort", ["relevance", "newest", "liked"])
+def test_search_pages_cover_every_match_once(explore, sort):
+    # Todos comparten el mismo documento, así que empatan también en relevancia
+    ids, _ = walk(explore["client"], search="analysis", sort=sort)
+    assert len(ids) == len(set(ids)) == ASSISTANTS
+    assert set(ids) == set(explore["counters"])
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 17, 10, 30, 12, 5000)
+    assert decode_cursor(encode_cursor(created_at, 42), is_datetime=True) == (created_at, 42)
+    assert decode_cursor(encode_cursor(3, 7)) == (3, 7)
+    assert decode_cursor(encode_cursor(-1.25, 9)) == (-1.25, 9)
+    assert decode_cursor(encode_cursor(None, 1)) == (None, 1)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzEsMl0x", encode_cursor("x", "y"), encode_cursor(1, 2)[:-2]])
+def test_tampered_cursor_is_rejected(explore, cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, is_datetime=True)
+    response = explore["client"].get("/explore/api/assistants", params={"cursor": cursor, "sort": "newest"})
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["error"]
+
+
+def test_relevance_pages_past_500_matches(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ranking.db'}")
+    Base.metadata.create_all(engine)
+    matches = 600
+    with engine.begin() as connection:
+        create_search_index(connection)
+        connection.execute(insert(User), [{"id": 1, "username": "alice", "email": "a@example.org", "password_hash": "x"}])
+        connection.execute(insert(Assistant), [{"id": i, "user_id": 1, "is_public": True} for i in range(1, matches + 1)])
+        # El término se repite más o menos veces: rangos bm25 distintos, con muchos empates
+        connection.execute(insert(AssistantSummary), [
+            {"assistant_id": i, "title": f"Tutor {i}", "summary": " ".join(["geometry"] * (1 + i % 5))}
+            for i in range(1, matches + 1)
+        ])
+    with sessionmaker(bind=engine)() as db:
+        rebuild_search_index(db)
+        filters = ExploreFilters(search="geometry")
+        ids, cursor = [], None
+        while True:
+            page = get_explore_page(db, filters, cursor=cursor, limit=100)
+            assert page["sort"] == "relevance"
+            ids.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    engine.dispose()
+
+    # Primero los que más repiten el término; en cada empate, por id
+    assert len(ids) == len(set(ids)) == matches
+    assert ids == sorted(ids, key=lambda assistant_id: (-(assistant_id % 5), assistant_id))
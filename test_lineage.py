@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Fork lineage of assistants: /assistants/{id}/lineage and /descendants.
+
+The recursive walk must stop at cycles and at the depth limit, and private
+assistants of other users keep their place in the tree without their details.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import async_database, database
+from app.database.models import Assistant, AssistantSummary, User
+from app.database.write_queue import get_write_queue
+from app.main import app
+from app.utils.lineage import LINEAGE_MAX_DEPTH, get_ancestors, get_descendants
+from app.utils.settings_cache import get_settings_cache
+from app.utils.user_cache import get_user_cache
+
+PASSWORD = "password123"
+
+
+@pytest.fixture(scope="module")
+def lineage(tmp_path_factory):
+    """
+    Clients of alice and bob, an anonymous one, and the fork tree
+
+        1 (alice) <- 2 (alice, private) <- 3 (bob) <- 4 (bob)
+                                          ^- 5 (alice)
+        10 forked from itself; 11 <-> 12 forked from each other
+        100 <- 101 <- ... <- 100 + LINEAGE_MAX_DEPTH + 10
+    """
+    path = tmp_path_factory.mktemp("lineage") / "lineage.db"
+    patch = pytest.MonkeyPatch()
+    engine = create_engine(f"sqlite:///{path}")
+    patch.setattr(database, "engine", engine)
+    patch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    async_engine = async_database.create_async_db_engine(f"sqlite+aiosqlite:///{path}")
+    patch.setattr(async_database, "async_engine", async_engine)
+    patch.setattr(async_database, "AsyncSessionLocal", async_database.async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    ))
+    database.init_db()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+
+    def login(username):
+        client = TestClient(app)
+        client.post("/auth/register", json={
+            "username": username, "email": f"{username}@example.org", "full_name": username,
+            "password": PASSWORD, "password_confirm": PASSWORD
+        })
+        assert client.post("/auth/login", json={"username": username, "password": PASSWORD}).json()["success"]
+        return client
+
+    alice, bob = login("alice"), login("bob")
+    with database.SessionLocal() as db:
+        users = dict(db.query(User.username, User.id).all())
+
+    chain_end = 100 + LINEAGE_MAX_DEPTH + 10
+    tree = [
+        (1, "alice", None, True), (2, "alice", 1, False), (3, "bob", 2, True),
+        (4, "bob", 3, True), (5, "alice", 3, True),
+        (10, "alice", 10, True), (11, "alice", 12, True), (12, "alice", 11, True),
+    ] + [(i, "bob", i - 1 if i > 100 else None, True) for i in range(100, chain_end + 1)]
+    with engine.begin() as connection:
+        connection.execute(insert(Assistant), [
+            {"id": i, "user_id": users[owner], "forked_from": parent, "is_public": public, "title": f"Assistant {i}"}
+            for i, owner, parent, public in tree
+        ])
+        connection.execute(insert(AssistantSummary), [
+            {"assistant_id": i, "title": f"Assistant {i}"} for i, *_ in tree
+        ])
+    yield {"alice": alice, "bob": bob, "anonymous": TestClient(app), "chain_end": chain_end}
+
+    get_write_queue().stop()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+    patch.undo()
+    async_engine.sync_engine.dispose()
+    engine.dispose()
+
+
+def ancestors(client, assistant_id):
+    response = client.get(f"/assistants/{assistant_id}/lineage")
+    assert response.status_code == 200
+    return [(node["id"], node["depth"], node["title"]) for node in response.json()["ancestors"]]
+
+
+def descendants(client, assistant_id):
+    response = client.get(f"/assistants/{assistant_id}/descendants")
+    assert response.status_code == 200
+    return [(node["id"], node["depth"], node["title"]) for node in response.json()["descendants"]]
+
+
+@pytest.mark.parametrize("viewer", ["bob", "anonymous"])
+def test_private_ancestor_is_hidden_from_other_users(lineage, viewer):
+    assert ancestors(lineage[viewer], 4) == [(3, 1, "Assistant 3"), (2, 2, None), (1, 3, "Assistant 1")]
+    assert descendants(lineage[viewer], 1) == [
+        (2, 1, None), (3, 2, "Assistant 3"), (4, 3, "Assistant 4"), (5, 3, "Assistant 5")
+    ]
+
+
+def test_private_ancestor_is_shown_to_its_owner(lineage):
+    assert ancestors(lineage["alice"], 4) == [(3, 1, "Assistant 3"), (2, 2, "Assistant 2"), (1, 3, "Assistant 1")]
+    assert ancestors(lineage["alice"], 2) == [(1, 1, "Assistant 1")]
+
+
+def test_private_assistant_lineage_needs_its_owner(lineage):
+    for viewer, status in (("anonymous", 403), ("bob", 403), ("alice", 200)):
+        assert lineage[viewer].get("/assistants/2/lineage").status_code == status
+        assert lineage[viewer].get("/assistants/2/descendants").status_code == status
+    assert lineage["anonymous"].get("/assistants/999/lineage").status_code == 404
+
+
+def test_cycles_stop_the_walk(lineage):
+    client = lineage["anonymous"]
+    # Un asistente que se remezcla a sí mismo no es su propio antecesor ni descendiente
+    assert ancestors(client, 10) == []
+    assert descendants(client, 10) == []
+    assert ancestors(client, 11) == [(12, 1, "Assistant 12")]
+    assert descendants(client, 11) == [(12, 1, "Assistant 12")]
+
+
+def test_walk_stops_at_the_depth_limit(lineage):
+    client, chain_end = lineage["anonymous"], lineage["chain_end"]
+    nodes = ancestors(client, chain_end)
+    assert len(nodes) == LINEAGE_MAX_DEPTH
+    assert nodes[0] == (chain_end - 1, 1, f"Assistant {chain_end - 1}")
+    assert nodes[-1][:2] == (chain_end - LINEAGE_MAX_DEPTH, LINEAGE_MAX_DEPTH)
+    assert len(descendants(client, 100)) == LINEAGE_MAX_DEPTH
+
+    with database.SessionLocal() as db:
+        assert [node['id'] for node in get_ancestors(db, 4, max_depth=2)] == [3, 2]
+        assert [node['depth'] for node in get_descendants(db, 100, max_depth=3)] == [1, 2, 3]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+SQL query budgets of the main endpoints.
+
+The app runs against a temporary database; every request is made with the
+user cache empty, so the budgets include the lookup of the session user.
+A request that runs more statements than its budget fails and lists them,
+which is how an N+1 shows up.
+"""
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import async_database, database, slow_query_log
+from app.database.models import Setting
+from app.database.query_counter import QueryCounterMiddleware, capture_queries, install_query_counter, query_budget
+from app.database.slow_query_log import install_slow_query_log
+from app.database.write_queue import get_write_queue
+from app.main import app
+from app.utils.settings_cache import get_settings_cache
+from app.utils.user_cache import get_user_cache
+
+PASSWORD = "password123"
+
+
+@pytest.fixture(scope="module")
+def clients(tmp_path_factory):
+    """Clients of alice, the admin, who owns three assistants, bob and an anonymous visitor"""
+    path = tmp_path_factory.mktemp("budgets") / "budgets.db"
+    patch = pytest.MonkeyPatch()
+    engine = create_engine(f"sqlite:///{path}")
+    install_query_counter(engine)
+    patch.setattr(database, "engine", engine)
+    patch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    async_engine = async_database.create_async_db_engine(f"sqlite+aiosqlite:///{path}")
+    patch.setattr(async_database, "async_engine", async_engine)
+    patch.setattr(async_database, "AsyncSessionLocal", async_database.async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    ))
+    database.init_db()
+    get_settings_cache().invalidate()
+
+    def login(username):
+        client = TestClient(app)
+        client.post("/auth/register", json={
+            "username": username, "email": f"{username}@example.org", "full_name": username,
+            "password": PASSWORD, "password_confirm": PASSWORD
+        })
+        assert client.post("/auth/login", json={"username": username, "password": PASSWORD}).json()["success"]
+        return client
+
+    alice, bob = login("alice"), login("bob")
+    with open("sample_assistant.yaml.copy", encoding="utf-8") as f:
+        sample = f.read()
+    ids = [
+        alice.post("/assistants/create-from-template", json={"yaml_content": sample}).json()["assistant_id"]
+        for _ in range(3)
+    ]
+    yield {"alice": alice, "bob": bob, "anonymous": TestClient(app), "ids": ids}
+
+    get_write_queue().stop()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+    patch.undo()
+    async_engine.sync_engine.dispose()
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def empty_user_cache():
+    get_user_cache().clear()
+
+
+@pytest.mark.parametrize("client_name, path, budget", [
+    ("anonymous", "/explore", 2),                  # página + facetas
+    ("anonymous", "/explore/api/assistants", 1),
+    ("bob", "/explore", 3),                        # + usuario de la sesión
+    ("bob", "/collection", 2),
+    ("alice", "/assistants/", 2),
+])
+def test_page_budgets(clients, client_name, path, budget):
+    with query_budget(budget, f"GET {path}"):
+        response = clients[client_name].get(path)
+    assert response.status_code == 200
+
+
+def test_viewer_state_budget(clients):
+    with query_budget(3, "POST /explore/viewer-state"):
+        response = clients["bob"].post("/explore/viewer-state", json={"ids": clients["ids"]})
+    assert response.status_code == 200
+
+
+def test_details_budget(clients):
+    assistant_id = clients["ids"][2]
+    clients["bob"].post(f"/explore/like/{assistant_id}")
+    get_user_cache().clear()
+    # Asistente, resumen y los indicadores del usuario en una sola consulta
+    with query_budget(2, "GET /explore/assistant/{id}"):
+        response = clients["bob"].get(f"/explore/assistant/{assistant_id}")
+    assert response.json()["has_liked"] is True
+    assert response.json()["in_collection"] is False
+
+
+def test_like_budget(clients):
+    # Comprobación en la ruta y lectura, UPDATE e INSERT en el hilo escritor;
+    # el validador de AssistantLike no vuelve a consultar el asistente
+    with query_budget(6, "POST /explore/like/{id}"):
+        response = clients["bob"].post(f"/explore/like/{clients['ids'][0]}")
+    assert response.json()["action"] == "added"
+
+
+def test_settings_cache_budget(clients):
+    get_settings_cache().invalidate()
+    # Todos los ajustes en una consulta; después, ninguna hasta que se cambie uno
+    with query_budget(1, "GET /settings/get_default_llm"):
+        assert clients["anonymous"].get("/settings/get_default_llm").json() == {"model": "none"}
+    with query_budget(0, "GET /settings/get_default_llm"):
+        clients["anonymous"].get("/settings/get_default_llm")
+
+    with database.SessionLocal() as db:
+        setting_id = db.query(Setting).filter(Setting.key == "openapi_model").one().id
+    response = clients["alice"].put(f"/settings/update/{setting_id}", json={"value": "gpt-4o", "is_encrypted": False})
+    assert response.status_code == 200
+    assert clients["anonymous"].get("/settings/get_default_llm").json() == {"model": "gpt-4o"}
+
+
+def test_settings_batch_update(clients):
+    with database.SessionLocal() as db:
+        smtp_server_id = db.query(Setting).filter(Setting.key == "smtp_server").one().id
+    entries = [
+        {"id": smtp_server_id, "value": "smtp.example.org"},
+        {"category": "mail", "key": "smtp_password", "value": "s3cret", "is_encrypted": True},
+        {"category": "ollama", "key": "ollama_model", "value": "llama3"},
+    ]
+    # Usuario, ajustes y un UPDATE agrupado, sean cuantos sean los ajustes
+    with query_budget(3, "PUT /settings/batch"):
+        response = clients["alice"].put("/settings/batch", json={"settings": entries})
+    assert response.status_code == 200
+    assert [setting["value"] for setting in response.json()] == ["smtp.example.org", "s3cret", "llama3"]
+
+    with database.SessionLocal() as db:
+        password = db.query(Setting).filter(Setting.key == "smtp_password").one()
+        assert password.value != "s3cret" and password.get_value() == "s3cret"
+        assert get_settings_cache().value(db, "ollama", "ollama_model") == "llama3"
+
+    # Una entrada no válida rechaza todo el lote
+    response = clients["alice"].put("/settings/batch", json={"settings": [
+        {"category": "ollama", "key": "ollama_model", "value": "mistral"},
+        {"category": "mail", "key": "missing", "value": "x"},
+    ]})
+    assert response.status_code == 400
+    assert "mail/missing not found" in response.json()["detail"]
+    assert clients["bob"].put("/settings/batch", json={"settings": entries}).status_code == 403
+    with database.SessionLocal() as db:
+        assert get_settings_cache().value(db, "ollama", "ollama_model") == "llama3"
+
+
+def test_query_budget_reports_statements():
+    engine = create_engine("sqlite://")
+    install_query_counter(engine)
+    with pytest.raises(AssertionError, match="ran 2 queries, budget is 1") as error:
+        with query_budget(1):
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                connection.execute(text("SELECT 2"))
+    assert "SELECT 2" in str(error.value)
+
+
+def test_failing_statement_leaves_no_start_time_behind():
+    engine = create_engine("sqlite://")
+    install_query_counter(engine)
+    with capture_queries() as stats:
+        with engine.connect() as connection:
+            with pytest.raises(Exception):
+                connection.execute(text("SELECT * FROM missing_table"))
+            connection.execute(text("SELECT 1"))
+            # La conexión vuelve al pool sin restos de la sentencia fallida
+            assert "query_start_time" not in connection.info
+    assert stats.statements == ["SELECT 1"]
+    assert stats.duration < 1
+
+def test_slow_query_log_after_a_failing_statement(monkeypatch):
+    engine = create_engine("sqlite://")
+    install_slow_query_log(engine, threshold_ms=0)
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    # Solo el handler del test recibe los registros: nada se escribe en logs/slow_queries.log
+    monkeypatch.setattr(slow_query_log.logger, "handlers", [handler])
+    monkeypatch.setattr(slow_query_log.logger, "propagate", False)
+    with engine.connect() as connection:
+        with pytest.raises(Exception):
+            connection.execute(text("SELECT * FROM missing_table"))
+        connection.execute(text("SELECT 1"))
+        assert "slow_query_start" not in connection.info
+    assert len(records) == 1
+    assert "SQL: SELECT 1" in records[0].getMessage()
+
+
+def test_debug_headers_count_sync_and_async_routes():
+    engine = create_engine("sqlite://")
+    install_query_counter(engine)
+    debug_app = FastAPI()
+    debug_app.add_middleware(QueryCounterMiddleware, headers=True)
+
+    def run_queries(count):
+        with engine.connect() as connection:
+            for _ in range(count):
+                connection.execute(text("SELECT 1"))
+
+    @debug_app.get("/async")
+    async def async_route():
+        run_queries(2)
+
+    # Las rutas síncronas se ejecutan en el pool de hilos: el contexto de la petición las sigue
+    @debug_app.get("/sync")
+    def sync_route():
+        run_queries(3)
+
+    client = TestClient(debug_app)
+    assert client.get("/async").headers["X-Query-Count"] == "2"
+    assert client.get("/sync").headers["X-Query-Count"] == "3"
+    assert client.get("/sync").headers["X-Query-Time"].endswith("ms")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Query plans of the hot query paths.
+
+Each query runs under EXPLAIN QUERY PLAN on an empty database built from the
+models (without statistics SQLite plans for large tables). A plan that scans a
+whole table instead of searching an index, or that sorts in a temporary B-tree
+where an index should give the order, fails.
+"""
+import re
+
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Assistant, AssistantLike, AssistantSummary, Base, UserAssistantCollection
+from app.routers.explore import SORT_MODES, ExploreFilters, get_explore_page, get_viewer_state
+from app.utils.lineage import get_ancestors, get_descendants
+
+# SCAN recorre la tabla entera, o un índice entero con USING INDEX; SEARCH usa el índice
+FULL_SCAN = re.compile(r"^SCAN (\w+)")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def captured(engine):
+    """Statements run on the engine, with their parameters"""
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    return statements
+
+
+def query_plan(engine, statement, parameters=()):
+    """Detail lines of EXPLAIN QUERY PLAN for a SQL string or a SQLAlchemy statement"""
+    if not isinstance(statement, str):
+        compiled = statement.compile(dialect=engine.dialect)
+        statement = str(compiled)
+        parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [row[3] for row in rows]
+
+
+def assert_indexed(plan, allowed_scans=(), ordered=False):
+    scans = [line for line in plan
+             if FULL_SCAN.match(line) and FULL_SCAN.match(line).group(1) not in allowed_scans]
+    assert not scans, f"Full table scan in plan: {plan}"
+    if ordered:
+        assert TEMP_SORT not in plan, f"Sort without index in plan: {plan}"
+
+
+@pytest.mark.parametrize("sort", list(SORT_MODES))
+def test_explore_page_uses_sort_index(engine, captured, sort):
+    db = sessionmaker(bind=engine)()
+    try:
+        get_explore_page(db, ExploreFilters(), sort)
+    finally:
+        db.close()
+    assert captured, "get_explore_page ran no query"
+    for statement, parameters in captured:
+        assert_indexed(query_plan(engine, statement, parameters), ordered=True)
+
+
+def test_user_assistants_by_updated_at(engine):
+    # list_assistants: los asistentes del usuario, los más recientes primero
+    statement = select(Assistant.id, Assistant.title, AssistantSummary).join(
+        AssistantSummary, AssistantSummary.assistant_id == Assistant.id
+    ).where(Assistant.user_id == 1).order_by(Assistant.updated_at.desc())
+    assert_indexed(query_plan(engine, statement), ordered=True)
+
+
+def test_user_collection(engine):
+    # list_collection: la colección se recorre desde user_assistant_collections
+    statement = select(Assistant.id, AssistantSummary).join(
+        UserAssistantCollection, UserAssistantCollection.assistant_id == Assistant.id
+    ).join(
+        AssistantSummary, AssistantSummary.assistant_id == Assistant.id
+    ).where(UserAssistantCollection.user_id == 1).order_by(Assistant.updated_at.desc())
+    assert_indexed(query_plan(engine, statement))
+
+
+def test_viewer_state(engine, captured):
+    db = sessionmaker(bind=engine)()
+    try:
+        get_viewer_state(db, 1, [1, 2, 3])
+    finally:
+        db.close()
+    assert len(captured) == 2
+    for statement, parameters in captured:
+        assert_indexed(query_plan(engine, statement, parameters))
+
+
+@pytest.mark.parametrize("relation", [AssistantLike, UserAssistantCollection])
+def test_relations_by_assistant(engine, relation):
+    # Recuento de likes y colecciones de un asistente y borrado en cascada
+    statement = select(func.count()).select_from(relation).where(relation.assistant_id == 1)
+    assert_indexed(query_plan(engine, statement))
+
+
+def test_forks_of_an_assistant(engine, captured):
+    statement = select(Assistant.id).where(Assistant.forked_from == 1)
+    assert_indexed(query_plan(engine, statement))
+
+    db = sessionmaker(bind=engine)()
+    try:
+        get_descendants(db, 1)
+        get_ancestors(db, 1)
+    finally:
+        db.close()
+    for statement, parameters in captured:
+        # Las CTE recursivas se recorren enteras por definición
+        assert_indexed(query_plan(engine, statement, parameters), allowed_scans=("lineage",))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Revision history of assistant documents.
+
+Every revision must rebuild to exactly the content that was saved, whether it
+is a snapshot or a chain of deltas after one, and its HTTP cache key must be
+that content, not the URL.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import async_database, blob_store, database  # blob_store registra los listeners de flush
+from app.database.models import Assistant, Base
+from app.database.revisions import (
+    REVISION_SNAPSHOT_INTERVAL, apply_delta, encode_delta, get_revision_content, list_revisions
+)
+from app.database.write_queue import get_write_queue
+from app.main import app
+from app.utils.settings_cache import get_settings_cache
+from app.utils.user_cache import get_user_cache
+
+PASSWORD = "password123"
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'revisions.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine, autoflush=False)() as session:
+        yield session
+    engine.dispose()
+
+
+def version(number: int) -> str:
+    lines = [f"line {i}: {'edited ' * (i == number % 7)}text\n" for i in range(7)]
+    lines.append(f"version: {number}\n")
+    return ''.join(lines)
+
+
+def test_rebuild_across_snapshot_boundary(db):
+    saved = [version(n) for n in range(2 * REVISION_SNAPSHOT_INTERVAL + 3)]
+    assistant = Assistant(user_id=1, title="Tutor", yaml_content=saved[0])
+    db.add(assistant)
+    db.commit()
+    for content in saved[1:]:
+        assistant.yaml_content = content
+        db.commit()
+
+    revisions = {row['number']: row for row in list_revisions(db, assistant.id)}
+    assert len(revisions) == len(saved)
+    snapshots = sorted(number for number, row in revisions.items() if row['is_snapshot'])
+    assert snapshots == [1, REVISION_SNAPSHOT_INTERVAL + 1, 2 * REVISION_SNAPSHOT_INTERVAL + 1]
+
+    for number, content in enumerate(saved, 1):
+        assert get_revision_content(db, assistant.id, number) == content
+    assert get_revision_content(db, assistant.id, len(saved) + 1) is None
+
+
+def test_content_without_trailing_newline(db):
+    saved = ["title: Tutor", "title: Tutor\nlevel: 1", "title: Tutor\nlevel: 2\n", "level: 2", ""]
+    assistant = Assistant(user_id=1, title="Tutor", yaml_content=saved[0])
+    db.add(assistant)
+    db.commit()
+    for content in saved[1:]:
+        assistant.yaml_content = content
+        db.commit()
+
+    for number, content in enumerate(saved, 1):
+        assert get_revision_content(db, assistant.id, number) == content
+
+
+@pytest.mark.parametrize("base, content", [
+    ("a\nb", "a\nb\nc"),
+    ("a\nb\nc", "a\nb"),
+    ("a\nb", "a\nb\n"),
+    ("a\nb\n", "a\nb"),
+    ("", "a"),
+])
+def test_delta_round_trip(base, content):
+    assert apply_delta(base, encode_delta(base, content)) == content
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Client of alice, logged in on an app running against a temporary database"""
+    path = tmp_path / "app.db"
+    patch = pytest.MonkeyPatch()
+    engine = create_engine(f"sqlite:///{path}")
+    patch.setattr(database, "engine", engine)
+    patch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    async_engine = async_database.create_async_db_engine(f"sqlite+aiosqlite:///{path}")
+    patch.setattr(async_database, "async_engine", async_engine)
+    patch.setattr(async_database, "AsyncSessionLocal", async_database.async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    ))
+    database.init_db()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+
+    client = TestClient(app)
+    client.post("/auth/register", json={
+        "username": "alice", "email": "alice@example.org", "full_name": "alice",
+        "password": PASSWORD, "password_confirm": PASSWORD
+    })
+    assert client.post("/auth/login", json={"username": "alice", "password": PASSWORD}).json()["success"]
+    yield client
+
+    get_write_queue().stop()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+    patch.undo()
+    async_engine.sync_engine.dispose()
+    engine.dispose()
+
+
+def test_revision_etag_follows_the_content_of_a_reused_id(client):
+    with open("sample_assistant.yaml.copy", encoding="utf-8") as f:
+        sample = f.read()
+
+    def create(content):
+        return client.post("/assistants/create-from-template", json={"yaml_content": content}).json()["assistant_id"]
+
+    assistant_id = create(sample)
+    response = client.get(f"/assistants/assistant/{assistant_id}/revisions/1")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "immutable" not in response.headers["Cache-Control"]
+    revalidated = client.get(f"/assistants/assistant/{assistant_id}/revisions/1", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+
+    # Sin AUTOINCREMENT, SQLite da el id del último asistente borrado al siguiente
+    assert client.delete(f"/assistants/{assistant_id}").status_code == 200
+    assert create(sample.replace("Minimal Text", "Another Text", 1)) == assistant_id
+    response = client.get(f"/assistants/assistant/{assistant_id}/revisions/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert "Another Text" in response.json()["yaml_content"]
+    assert client.get(f"/assistants/assistant/{assistant_id}/revisions/2").status_code == 404
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Invalidation of the session user cache.
+
+Every route that changes or deletes a user must drop its cached copy, or the
+next requests of that user would still see the old record.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import async_database, database
+from app.database.models import User
+from app.database.write_queue import get_write_queue
+from app.main import app
+from app.utils.settings_cache import get_settings_cache
+from app.utils.user_cache import get_user_cache
+
+PASSWORD = "password123"
+
+
+@pytest.fixture
+def clients(tmp_path):
+    """Clients of alice, the admin, and bob, with both users in the cache"""
+    path = tmp_path / "users.db"
+    patch = pytest.MonkeyPatch()
+    engine = create_engine(f"sqlite:///{path}")
+    patch.setattr(database, "engine", engine)
+    patch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    async_engine = async_database.create_async_db_engine(f"sqlite+aiosqlite:///{path}")
+    patch.setattr(async_database, "async_engine", async_engine)
+    patch.setattr(async_database, "AsyncSessionLocal", async_database.async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    ))
+    database.init_db()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+
+    def login(username):
+        client = TestClient(app)
+        client.post("/auth/register", json={
+            "username": username, "email": f"{username}@example.org", "full_name": username,
+            "password": PASSWORD, "password_confirm": PASSWORD
+        })
+        assert client.post("/auth/login", json={"username": username, "password": PASSWORD}).json()["success"]
+        assert client.get("/profile/current").status_code == 200
+        return client
+
+    alice, bob = login("alice"), login("bob")
+    assert get_user_cache().stats()["entries"] == 2
+    yield {"alice": alice, "bob": bob}
+
+    get_write_queue().stop()
+    get_user_cache().clear()
+    get_settings_cache().invalidate()
+    patch.undo()
+    async_engine.sync_engine.dispose()
+    engine.dispose()
+
+
+def user_id(username):
+    with database.SessionLocal() as db:
+        return db.query(User.id).filter(User.username == username).scalar()
+
+
+def test_profile_update(clients):
+    bob = clients["bob"]
+    response = bob.put("/profile/update", json={
+        "email": "bob@example.org", "full_name": "Bob Builder", "organization": "ScolaIA"
+    })
+    assert response.status_code == 200
+    profile = bob.get("/profile/current").json()
+    assert (profile["full_name"], profile["organization"]) == ("Bob Builder", "ScolaIA")
+
+
+def test_password_change(clients):
+    bob = clients["bob"]
+    new_password = "another-password"
+    response = bob.put("/profile/update-password", json={
+        "current_password": PASSWORD, "new_password": new_password, "password_confirm": new_password
+    })
+    assert response.status_code == 200
+    # Con el hash antiguo en caché la contraseña anterior seguiría valiendo
+    response = bob.put("/profile/update-password", json={
+        "current_password": PASSWORD, "new_password": PASSWORD, "password_confirm": PASSWORD
+    })
+    assert response.status_code == 400
+    response = bob.put("/profile/update-password", json={
+        "current_password": new_password, "new_password": PASSWORD, "password_confirm": PASSWORD
+    })
+    assert response.status_code == 200
+
+
+def test_user_delete(clients):
+    bob = clients["bob"]
+    response = clients["alice"].delete(f"/users/{user_id('bob')}")
+    assert response.status_code == 200
+    # La cookie de bob sigue siendo válida, pero su usuario ya no existe
+    assert bob.get("/profile/current").status_code == 401
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Batched writes of the WriteQueue.
+
+A batch runs in one transaction; when one of its operations fails, the others
+must still be committed and get their own results.
+"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models import Assistant, Base
+from app.database.write_queue import WriteQueue
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'writes.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def write_queue(engine):
+    write_queue = WriteQueue(session_factory=sessionmaker(bind=engine, autoflush=False))
+    yield write_queue
+    write_queue.stop(timeout=10)
+
+
+def add_assistant(db, assistant_id):
+    db.add(Assistant(id=assistant_id, user_id=1, title=f"Assistant {assistant_id}"))
+    return assistant_id
+
+
+def fail(db):
+    raise ValueError("invalid write")
+
+
+def stored_ids(engine):
+    with engine.connect() as connection:
+        return sorted(connection.execute(select(Assistant.id)).scalars())
+
+
+def submit_batch(write_queue, operations):
+    """Queue the operations while the writer is busy, so they are taken as one batch"""
+    started, release = threading.Event(), threading.Event()
+
+    def block(db):
+        started.set()
+        return release.wait(10)
+
+    blocker = write_queue.submit_nowait(block)
+    started.wait(10)
+    futures = [write_queue.submit_nowait(operation, *args) for operation, *args in operations]
+    release.set()
+    blocker.result(timeout=10)
+    return futures
+
+
+def test_failing_operation_does_not_roll_back_the_batch(engine, write_queue):
+    futures = submit_batch(write_queue, [
+        (add_assistant, 1),
+        (fail,),
+        (add_assistant, 2),
+        # Clave duplicada: falla en el flush, no en la propia operación
+        (add_assistant, 1),
+        (add_assistant, 3),
+    ])
+
+    assert futures[0].result(timeout=10) == 1
+    with pytest.raises(ValueError, match="invalid write"):
+        futures[1].result(timeout=10)
+    assert futures[2].result(timeout=10) == 2
+    with pytest.raises(IntegrityError):
+        futures[3].result(timeout=10)
+    assert futures[4].result(timeout=10) == 3
+
+    assert stored_ids(engine) == [1, 2, 3]
+    assert write_queue.stats()["retried_batches"] == 1
+
+
+def test_batch_commits_once(engine, write_queue):
+    futures = submit_batch(write_queue, [(add_assistant, i) for i in range(1, 11)])
+
+    assert [future.result(timeout=10) for future in futures] == list(range(1, 11))
+    assert stored_ids(engine) == list(range(1, 11))
+    stats = write_queue.stats()
+    assert (stats["batches"], stats["operations"], stats["retried_batches"]) == (2, 11, 0)